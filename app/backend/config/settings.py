@@ -81,6 +81,41 @@ else:
 
 DATABASE_ROUTERS = ['panel.routers.TenantRouter']
 
+# Conexiones a BDs de tenants registradas en tiempo de ejecución (panel/tenant_databases.py)
+TENANT_DB_MAX_CONNECTIONS = config('TENANT_DB_MAX_CONNECTIONS', default=20, cast=int)
+TENANT_DB_CONN_MAX_AGE = config('TENANT_DB_CONN_MAX_AGE', default=300, cast=int)
+
+# Migración en paralelo de los tenants (python manage.py migrate_tenants)
+FLEET_MIGRATE_WORKERS = config('FLEET_MIGRATE_WORKERS', default=4, cast=int)
+FLEET_MIGRATE_PER_HOST = config('FLEET_MIGRATE_PER_HOST', default=2, cast=int)
+
+# Cache compartido entre workers (Redis si está configurado)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Resolución subdominio -> tenant en TenantMiddleware
+TENANT_CACHE_TTL = config('TENANT_CACHE_TTL', default=60, cast=int)
+TENANT_CACHE_MAX_ENTRIES = config('TENANT_CACHE_MAX_ENTRIES', default=1000, cast=int)
+TENANT_CACHE_SYNC_INTERVAL = config('TENANT_CACHE_SYNC_INTERVAL', default=2, cast=float)
+
+# Snapshot de estadísticas del dashboard (segundos)
+DASHBOARD_STATS_TTL = config('DASHBOARD_STATS_TTL', default=30, cast=int)
+# Actividad reciente: al vencer se recarga desde la base (también al borrar registros)
+DASHBOARD_ACTIVITY_TTL = config('DASHBOARD_ACTIVITY_TTL', default=3600, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -134,6 +169,34 @@ PORTAINER_BASE = config('PORTAINER_BASE', default='')
 PORTAINER_API_KEY = config('PORTAINER_API_KEY', default='')
 PORTAINER_ENDPOINT_ID = config('PORTAINER_ENDPOINT_ID', default=1, cast=int)
 
+# Sincronización de stacks en segundo plano (python manage.py sync_portainer)
+PORTAINER_TIMEOUT = config('PORTAINER_TIMEOUT', default=10, cast=int)
+PORTAINER_SYNC_INTERVAL = config('PORTAINER_SYNC_INTERVAL', default=60, cast=int)
+
+# Rollout de imágenes a workspaces dedicados (panel/rollout.py)
+ROLLOUT_CONCURRENCY = config('ROLLOUT_CONCURRENCY', default=5, cast=int)
+ROLLOUT_PER_HOST = config('ROLLOUT_PER_HOST', default=2, cast=int)
+ROLLOUT_CANARY_COUNT = config('ROLLOUT_CANARY_COUNT', default=1, cast=int)
+ROLLOUT_MAX_ERROR_RATE = config('ROLLOUT_MAX_ERROR_RATE', default=0.2, cast=float)
+# Un rollout 'running' sin latido en este tiempo se considera abandonado por un worker caído
+ROLLOUT_TIMEOUT = config('ROLLOUT_TIMEOUT', default=900, cast=int)
+
+# Aprovisionamiento de workspaces (python manage.py provisioning_worker)
+PROVISIONING_ASYNC = config('PROVISIONING_ASYNC', default=True, cast=bool)
+PROVISIONING_JOB_TIMEOUT = config('PROVISIONING_JOB_TIMEOUT', default=900, cast=int)
+
+# Pool de conexiones administrativas para DDL de tenants (panel/db_admin.py)
+ADMIN_DB_POOL_SIZE = config('ADMIN_DB_POOL_SIZE', default=4, cast=int)
+ADMIN_DB_POOL_TIMEOUT = config('ADMIN_DB_POOL_TIMEOUT', default=30, cast=int)
+ADMIN_DB_HEALTH_CHECK_INTERVAL = config('ADMIN_DB_HEALTH_CHECK_INTERVAL', default=30, cast=int)
+
+# Pool de BDs pre-migradas por producto (panel/database_pool.py). 0 lo desactiva
+DATABASE_POOL_SIZE = config('DATABASE_POOL_SIZE', default=2, cast=int)
+# Vacío: migra la plantilla en la imagen del producto (docker run en esta red)
+DATABASE_POOL_MIGRATE_COMMAND = config('DATABASE_POOL_MIGRATE_COMMAND', default='')
+DATABASE_POOL_MIGRATE_NETWORK = config('DATABASE_POOL_MIGRATE_NETWORK', default='tenant-network')
+DATABASE_POOL_REFILL_INTERVAL = config('DATABASE_POOL_REFILL_INTERVAL', default=300, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
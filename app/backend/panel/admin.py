@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Tenant, TenantUser, ActivityLog
+from .models import Product, Tenant, TenantUser, ActivityLog, ProvisioningJob, PortainerStack, Rollout, RolloutTarget
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -26,3 +26,29 @@ class ActivityLogAdmin(admin.ModelAdmin):
     list_filter = ['action', 'created_at']
     search_fields = ['description']
     readonly_fields = ['created_at']
+
+@admin.register(ProvisioningJob)
+class ProvisioningJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tenant', 'status', 'current_step', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['tenant__subdomain', 'tenant__company_name']
+    readonly_fields = ['created_at', 'updated_at', 'started_at', 'finished_at']
+
+@admin.register(PortainerStack)
+class PortainerStackAdmin(admin.ModelAdmin):
+    list_display = ['stack_id', 'name', 'status', 'endpoint_id', 'tenant', 'synced_at']
+    list_filter = ['status', 'endpoint_id']
+    search_fields = ['name', 'tenant__subdomain']
+    readonly_fields = ['data', 'data_hash', 'portainer_updated_at', 'synced_at']
+
+class RolloutTargetInline(admin.TabularInline):
+    model = RolloutTarget
+    extra = 0
+    readonly_fields = ['tenant', 'position', 'is_canary', 'status', 'previous_image', 'error', 'started_at', 'finished_at']
+
+@admin.register(Rollout)
+class RolloutAdmin(admin.ModelAdmin):
+    list_display = ['id', 'product', 'image', 'status', 'concurrency', 'created_at', 'finished_at']
+    list_filter = ['status', 'product']
+    readonly_fields = ['created_at', 'updated_at', 'started_at', 'finished_at']
+    inlines = [RolloutTargetInline]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from ..models import Tenant, Product
+from ..models import Tenant, Product, PortainerStack
 from django.contrib.auth.models import User
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -22,3 +22,15 @@ class TenantSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['db_name', 'created_at', 'updated_at', 'url']
+
+class PortainerStackSerializer(serializers.ModelSerializer):
+    tenant_subdomain = serializers.CharField(source='tenant.subdomain', read_only=True, default=None)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = PortainerStack
+        fields = [
+            'id', 'stack_id', 'name', 'endpoint_id', 'stack_type',
+            'status', 'status_display', 'tenant', 'tenant_subdomain',
+            'portainer_updated_at', 'synced_at'
+        ]
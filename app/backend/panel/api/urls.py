@@ -7,4 +7,7 @@ urlpatterns = [
     path('tenants/<int:pk>/convert/', views.ConvertTenantView.as_view(), name='api_convert_tenant'),
     path('products/', views.ProductListView.as_view(), name='api_products'),
     path('deployments/sync/', views.SyncDeploymentsView.as_view(), name='api_sync_deployments'),
+    path('rollouts/', views.RolloutListCreateView.as_view(), name='api_rollouts'),
+    path('rollouts/<int:pk>/', views.RolloutDetailView.as_view(), name='api_rollout_detail'),
+    path('rollouts/<int:pk>/retry/', views.RolloutRetryView.as_view(), name='api_rollout_retry'),
 ]
@@ -1,13 +1,13 @@
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.conf import settings
-from ..models import Tenant, Product, ActivityLog
-from .serializers import TenantSerializer, ProductSerializer
-import requests
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from ..models import Tenant, Product, ActivityLog, PortainerStack, Rollout
+from .. import portainer
+from ..deployment import ProductImageBuilder
+from ..rollout import RolloutError, create_rollout, is_stale, retry_rollout, serialize_rollout
+from ..db_admin import create_tenant_database
+from .serializers import TenantSerializer, ProductSerializer, PortainerStackSerializer
 
 class TenantListCreateView(generics.ListCreateAPIView):
     queryset = Tenant.objects.select_related('product', 'owner').all()
@@ -33,24 +33,7 @@ class TenantListCreateView(generics.ListCreateAPIView):
         )
     
     def create_database(self, db_name):
-        conn = psycopg2.connect(
-            host=settings.DATABASES['default']['HOST'],
-            port=settings.DATABASES['default']['PORT'],
-            user=settings.DATABASES['default']['USER'],
-            password=settings.DATABASES['default']['PASSWORD'],
-            database='postgres'
-        )
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        cursor = conn.cursor()
-        
-        cursor.execute(f"SELECT 1 FROM pg_database WHERE datname = '{db_name}'")
-        exists = cursor.fetchone()
-        
-        if not exists:
-            cursor.execute(f"CREATE DATABASE {db_name}")
-        
-        cursor.close()
-        conn.close()
+        create_tenant_database(db_name)
 
 class TenantDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Tenant.objects.select_related('product', 'owner').all()
@@ -98,35 +81,122 @@ class ProductListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
 class SyncDeploymentsView(APIView):
+    """GET lista los stacks de la tabla local; POST fuerza una sincronización con Portainer"""
     permission_classes = [IsAuthenticated]
     
+    def get(self, request):
+        stacks = PortainerStack.objects.select_related('tenant')
+        last_sync = portainer.last_sync()
+        return Response({
+            'last_sync': last_sync.isoformat() if last_sync else None,
+            'stacks': PortainerStackSerializer(stacks, many=True).data
+        })
+    
     def post(self, request):
-        if not settings.PORTAINER_BASE or not settings.PORTAINER_API_KEY:
+        if not portainer.is_configured():
             return Response(
                 {'error': 'Portainer no configurado'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         try:
-            url = f"{settings.PORTAINER_BASE}/api/stacks"
-            headers = {'X-API-Key': settings.PORTAINER_API_KEY}
-            
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 200:
-                stacks = response.json()
-                return Response({
-                    'message': f'{len(stacks)} stacks sincronizados',
-                    'stacks': stacks
-                })
-            else:
-                return Response(
-                    {'error': 'Error al conectar con Portainer'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-                
-        except Exception as e:
+            summary = portainer.sync_stacks()
+        except portainer.PortainerError as e:
             return Response(
                 {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                status=status.HTTP_502_BAD_GATEWAY
+            )
+        
+        stacks = PortainerStack.objects.select_related('tenant')
+        return Response({
+            'message': f'{len(stacks)} stacks sincronizados',
+            'summary': summary,
+            'stacks': PortainerStackSerializer(stacks, many=True).data
+        })
+
+class RolloutListCreateView(APIView):
+    """GET lista los últimos rollouts; POST crea uno (lo ejecuta provisioning_worker)"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        rollouts = Rollout.objects.select_related('product')[:20]
+        return Response([serialize_rollout(rollout, include_targets=False) for rollout in rollouts])
+    
+    def post(self, request):
+        try:
+            product = Product.objects.get(name=request.data.get('product'))
+        except Product.DoesNotExist:
+            return Response(
+                {'error': 'Producto no encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        image = request.data.get('image')
+        if not image and request.data.get('version'):
+            image = ProductImageBuilder(product.name, '').image_name(request.data['version'])
+        if not image:
+            return Response(
+                {'error': 'Indica version o image'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        try:
+            rollout = create_rollout(
+                product,
+                image,
+                user=request.user,
+                concurrency=request.data.get('concurrency'),
+                per_host=request.data.get('per_host'),
+                canary_count=request.data.get('canary_count'),
+                max_error_rate=request.data.get('max_error_rate'),
+            )
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ActivityLog.objects.create(
+            user=request.user,
+            action='deploy',
+            description=f'Rollout {rollout.id} de {product.name} a {image}'
+        )
+        
+        return Response(serialize_rollout(rollout), status=status.HTTP_202_ACCEPTED)
+
+class RolloutDetailView(APIView):
+    """Progreso por tenant del rollout"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, pk):
+        try:
+            rollout = Rollout.objects.select_related('product').get(pk=pk)
+        except Rollout.DoesNotExist:
+            return Response(
+                {'error': 'Rollout no encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(serialize_rollout(rollout))
+
+class RolloutRetryView(APIView):
+    """Reencola un rollout detenido o con fallos; los tenants ya actualizados no se repiten"""
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request, pk):
+        try:
+            rollout = Rollout.objects.select_related('product').get(pk=pk)
+        except Rollout.DoesNotExist:
+            return Response(
+                {'error': 'Rollout no encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Uno 'running' sin latido quedó de un worker caído y se puede reencolar
+        if rollout.status == 'pending' or (rollout.status == 'running' and not is_stale(rollout)):
+            return Response(
+                {'error': 'El rollout aún está en curso'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        try:
+            retry_rollout(rollout)
+        except RolloutError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(serialize_rollout(rollout), status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,274 @@
+"""
+Pool de bases de datos pre-migradas por producto
+
+Por cada producto y versión de su esquema se mantiene una BD plantilla
+(tmpl_{producto}_{version}) ya migrada y DATABASE_POOL_SIZE copias listas
+(pool_{producto}_{version}_{token}). Aprovisionar un tenant es renombrar una
+copia y transferir la propiedad, en lugar de CREATE DATABASE + migrate.
+
+La plantilla se migra dentro de la imagen del producto (docker run), con su
+versión de Django y sus dependencias; DATABASE_POOL_MIGRATE_COMMAND permite
+reemplazarlo por un comando propio. Al cambiar la versión, las plantillas y
+copias de versiones anteriores se borran en el siguiente refill.
+"""
+
+import hashlib
+import os
+import re
+import secrets
+import subprocess
+
+import psycopg2
+from psycopg2 import sql
+from django.conf import settings
+
+from .db_admin import admin_cursor, database_exists
+from .deployment import ProductImageBuilder
+
+
+def product_code_path(product):
+    """Carpeta con el manage.py del producto"""
+    base = product.template_path or f"/opt/proyectos/{product.name}-system"
+    backend = os.path.join(base, 'backend')
+    if os.path.exists(os.path.join(backend, 'manage.py')):
+        return backend
+    return base
+
+
+def schema_file(dirpath, filename):
+    """Archivos que definen el esquema: migraciones y modelos (apps sin migraciones usan syncdb)"""
+    if not filename.endswith('.py'):
+        return False
+    return filename == 'models.py' or os.path.basename(dirpath) in ('migrations', 'models')
+
+
+def migrations_version(product):
+    """Hash de las migraciones y los modelos del producto: cambia sólo si cambia el esquema"""
+    digest = hashlib.sha1()
+    root = product_code_path(product)
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in ('.git', '__pycache__', 'venv', 'node_modules'))
+        for filename in sorted(filenames):
+            if not schema_file(dirpath, filename):
+                continue
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, root).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+
+    return digest.hexdigest()[:12]
+
+
+def template_db_name(product_name, version):
+    return f"tmpl_{product_name}_{version}"
+
+
+def pool_prefix(product_name, version):
+    return f"pool_{product_name}_{version}_"
+
+
+def product_image(product):
+    """Imagen del producto para el código actual (la construye si falta)"""
+    base = product.template_path or f"/opt/proyectos/{product.name}-system"
+    builder = ProductImageBuilder(product.name, base, product.build_context)
+    if not builder.available():
+        raise Exception(
+            f"Sin docker o Dockerfile para {product.name}: no se pueden aplicar sus migraciones "
+            "(configurar DATABASE_POOL_MIGRATE_COMMAND)"
+        )
+    return builder.ensure_image(builder.content_tag())
+
+
+def run_product_migrate(product, db, image=None):
+    """
+    Ejecuta el `manage.py migrate` del producto contra la BD `db` (entrada de
+    DATABASES). `image` evita recalcular la imagen en cada llamada. Retorna la
+    salida; lanza Exception si el comando falla
+    """
+    db_env = {
+        'DB_NAME': db['NAME'],
+        'DB_USER': db['USER'],
+        'DB_PASSWORD': db['PASSWORD'],
+        'DB_HOST': db['HOST'],
+        'DB_PORT': str(db['PORT']),
+    }
+
+    if settings.DATABASE_POOL_MIGRATE_COMMAND:
+        command = settings.DATABASE_POOL_MIGRATE_COMMAND
+        cwd = product_code_path(product)
+        env = {**os.environ, **db_env}
+    else:
+        # En la imagen del producto: el intérprete del panel no tiene sus dependencias
+        command = ['docker', 'run', '--rm', '--network', settings.DATABASE_POOL_MIGRATE_NETWORK, '--entrypoint', 'python']
+        for key, value in db_env.items():
+            command += ['-e', f'{key}={value}']
+        command += [image or product_image(product), 'manage.py', 'migrate', '--noinput']
+        cwd = None
+        env = None
+
+    result = subprocess.run(
+        command,
+        shell=isinstance(command, str),
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=600
+    )
+    if result.returncode != 0:
+        raise Exception(f"Error migrando {db['NAME']}: {result.stderr or result.stdout}")
+    return result.stdout
+
+
+def _migrate(product, db_name):
+    """Ejecuta las migraciones del producto contra db_name"""
+    run_product_migrate(product, {**settings.DATABASES['default'], 'NAME': db_name})
+
+
+def ensure_template(product, version=None):
+    """Crea y migra la BD plantilla de la versión actual si no existe"""
+    version = version or migrations_version(product)
+    template = template_db_name(product.name, version)
+
+    with admin_cursor() as cursor:
+        if database_exists(cursor, template):
+            return template
+
+        building = f"{template}_build"
+        cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(building)))
+        cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(building)))
+
+    _migrate(product, building)
+
+    with admin_cursor() as cursor:
+        # Renombrar al final: una plantilla a medio migrar nunca es visible
+        cursor.execute(sql.SQL("ALTER DATABASE {} RENAME TO {}").format(
+            sql.Identifier(building), sql.Identifier(template)
+        ))
+        cursor.execute(sql.SQL("ALTER DATABASE {} WITH IS_TEMPLATE true ALLOW_CONNECTIONS false").format(
+            sql.Identifier(template)
+        ))
+
+    return template
+
+
+def drop_stale_databases(cursor, product_name, version):
+    """Borra las plantillas y copias del pool de versiones anteriores. Retorna los nombres borrados"""
+    pattern = re.compile(
+        rf"^(tmpl_{re.escape(product_name)}_(?P<t>[0-9a-f]{{12}})(_build)?"
+        rf"|pool_{re.escape(product_name)}_(?P<p>[0-9a-f]{{12}})_[0-9a-f]{{8}})$"
+    )
+    cursor.execute(
+        "SELECT datname FROM pg_database WHERE starts_with(datname, %s) OR starts_with(datname, %s)",
+        [f"tmpl_{product_name}_", f"pool_{product_name}_"]
+    )
+
+    dropped = []
+    for (name,) in cursor.fetchall():
+        match = pattern.match(name)
+        if not match or (match.group('t') or match.group('p')) == version:
+            continue
+        if name.startswith('tmpl_'):
+            cursor.execute(sql.SQL("ALTER DATABASE {} WITH IS_TEMPLATE false").format(sql.Identifier(name)))
+        cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+        dropped.append(name)
+    return dropped
+
+
+def ready_databases(cursor, product_name, version):
+    cursor.execute(
+        "SELECT datname FROM pg_database WHERE starts_with(datname, %s) ORDER BY datname",
+        [pool_prefix(product_name, version)]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def refill_pool(product, size=None):
+    """Completa el pool del producto hasta `size` copias. Retorna cuántas creó"""
+    size = settings.DATABASE_POOL_SIZE if size is None else size
+    if size <= 0 or not os.path.exists(os.path.join(product_code_path(product), 'manage.py')):
+        return 0
+
+    version = migrations_version(product)
+    template = ensure_template(product, version)
+
+    created = 0
+    with admin_cursor() as cursor:
+        drop_stale_databases(cursor, product.name, version)
+        missing = size - len(ready_databases(cursor, product.name, version))
+        for _ in range(missing):
+            db_name = pool_prefix(product.name, version) + secrets.token_hex(4)
+            cursor.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                sql.Identifier(db_name), sql.Identifier(template)
+            ))
+            created += 1
+
+    return created
+
+
+def _transfer_ownership(db_name, db_user):
+    """Pasa al usuario del tenant la propiedad de los objetos creados por la migración"""
+    with admin_cursor(db_name) as cursor:
+        cursor.execute(sql.SQL("ALTER SCHEMA public OWNER TO {}").format(sql.Identifier(db_user)))
+        cursor.execute("""
+            SELECT c.relname, c.relkind
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p', 'v', 'm', 'S')
+        """)
+        statements = {
+            'r': "ALTER TABLE {} OWNER TO {}",
+            'p': "ALTER TABLE {} OWNER TO {}",
+            'v': "ALTER VIEW {} OWNER TO {}",
+            'm': "ALTER MATERIALIZED VIEW {} OWNER TO {}",
+            'S': "ALTER SEQUENCE {} OWNER TO {}",
+        }
+        for relname, relkind in cursor.fetchall():
+            cursor.execute(sql.SQL(statements[relkind]).format(
+                sql.Identifier('public', relname), sql.Identifier(db_user)
+            ))
+
+
+def claim_database(product, db_name, db_user):
+    """
+    Renombra una BD del pool a db_name y se la asigna a db_user.
+    Retorna False si el pool está vacío (el llamador debe crear la BD normalmente).
+    """
+    if settings.DATABASE_POOL_SIZE <= 0:
+        return False
+
+    version = migrations_version(product)
+
+    with admin_cursor() as cursor:
+        for candidate in ready_databases(cursor, product.name, version):
+            try:
+                # RENAME es atómico: si otro worker tomó la misma BD, esto falla y se prueba la siguiente
+                cursor.execute(sql.SQL("ALTER DATABASE {} RENAME TO {}").format(
+                    sql.Identifier(candidate), sql.Identifier(db_name)
+                ))
+            except psycopg2.Error:
+                continue
+
+            cursor.execute(sql.SQL("ALTER DATABASE {} OWNER TO {}").format(
+                sql.Identifier(db_name), sql.Identifier(db_user)
+            ))
+            break
+        else:
+            return False
+
+    _transfer_ownership(db_name, db_user)
+    return True
+
+
+def refill_all_pools():
+    """Completa el pool de todos los productos activos"""
+    from .models import Product
+
+    results = {}
+    for product in Product.objects.filter(is_active=True):
+        try:
+            results[product.name] = refill_pool(product)
+        except Exception as e:
+            results[product.name] = str(e)
+    return results
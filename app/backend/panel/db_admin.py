@@ -0,0 +1,193 @@
+"""
+Pool de conexiones administrativas (autocommit) a la BD de mantenimiento
+
+Todo el DDL de aprovisionamiento y baja de tenants (CREATE/DROP DATABASE,
+roles, GRANT) pasa por `admin_cursor()`, que reutiliza conexiones en lugar de
+abrir y autenticar una nueva por operación. Los identificadores se citan con
+psycopg2.sql y los valores van como parámetros.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.pool import ThreadedConnectionPool
+from django.conf import settings
+
+MAINTENANCE_DB = 'postgres'
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = None
+_last_checked = {}
+
+
+def _connection_kwargs(database):
+    db = settings.DATABASES['default']
+    return {
+        'host': db['HOST'],
+        'port': db['PORT'],
+        'user': db['USER'],
+        'password': db['PASSWORD'],
+        'database': database,
+        'connect_timeout': 10,
+    }
+
+
+def get_admin_pool():
+    """Pool del proceso actual (se recrea tras un fork sin tocar las conexiones heredadas)"""
+    global _pool, _pool_pid, _slots
+
+    if _pool is None or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadedConnectionPool(
+                    0,
+                    settings.ADMIN_DB_POOL_SIZE,
+                    **_connection_kwargs(MAINTENANCE_DB)
+                )
+                # ThreadedConnectionPool falla si se agota; el semáforo hace esperar al hilo
+                _slots = threading.BoundedSemaphore(settings.ADMIN_DB_POOL_SIZE)
+                _pool_pid = os.getpid()
+                _last_checked.clear()
+    return _pool
+
+
+def _is_healthy(conn):
+    """Chequeo local y, si la conexión estuvo ociosa, un SELECT 1"""
+    if conn.closed or conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+        return False
+
+    now = time.monotonic()
+    if now - _last_checked.get(id(conn), 0) < settings.ADMIN_DB_HEALTH_CHECK_INTERVAL:
+        return True
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except psycopg2.Error:
+        return False
+
+    _last_checked[id(conn)] = now
+    return True
+
+
+def _checkout(pool):
+    for _ in range(settings.ADMIN_DB_POOL_SIZE + 1):
+        conn = pool.getconn()
+        if not conn.closed:
+            conn.autocommit = True
+        if _is_healthy(conn):
+            return conn
+        _last_checked.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+
+    raise psycopg2.OperationalError("No hay conexiones administrativas sanas disponibles")
+
+
+@contextmanager
+def admin_cursor(database=MAINTENANCE_DB):
+    """
+    Cursor autocommit con privilegios de administrador.
+    Para `postgres` usa el pool; otras BDs (p.ej. la de un tenant) abren una conexión puntual.
+    """
+    if database != MAINTENANCE_DB:
+        conn = psycopg2.connect(**_connection_kwargs(database))
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                yield cursor
+        finally:
+            conn.close()
+        return
+
+    pool = get_admin_pool()
+    slots = _slots
+    if not slots.acquire(timeout=settings.ADMIN_DB_POOL_TIMEOUT):
+        raise psycopg2.OperationalError("Timeout esperando una conexión administrativa")
+
+    try:
+        conn = _checkout(pool)
+        broken = False
+        try:
+            with conn.cursor() as cursor:
+                yield cursor
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if broken:
+                _last_checked.pop(id(conn), None)
+            pool.putconn(conn, close=broken)
+    finally:
+        slots.release()
+
+
+def database_exists(cursor, db_name):
+    cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", [db_name])
+    return cursor.fetchone() is not None
+
+
+def role_exists(cursor, role):
+    cursor.execute("SELECT 1 FROM pg_roles WHERE rolname = %s", [role])
+    return cursor.fetchone() is not None
+
+
+def ensure_role(cursor, role, password):
+    if not role_exists(cursor, role):
+        cursor.execute(sql.SQL("CREATE USER {} WITH PASSWORD {}").format(
+            sql.Identifier(role), sql.Literal(password)
+        ))
+
+
+def create_tenant_database(db_name, db_user=None, db_password=None, product=None):
+    """
+    Crea el rol (si se indica) y la BD del tenant. Con `product` intenta primero
+    tomar una BD pre-migrada del pool (ver database_pool.claim_database).
+    Retorna True si la BD no existía.
+    """
+    from .database_pool import claim_database
+
+    with admin_cursor() as cursor:
+        if db_user:
+            ensure_role(cursor, db_user, db_password)
+        exists = database_exists(cursor, db_name)
+
+    # Fuera del bloque anterior: claim_database toma su propia conexión del pool
+    claimed = not exists and bool(product and db_user) and claim_database(product, db_name, db_user)
+
+    with admin_cursor() as cursor:
+        if not exists and not claimed:
+            if db_user:
+                cursor.execute(sql.SQL("CREATE DATABASE {} OWNER {}").format(
+                    sql.Identifier(db_name), sql.Identifier(db_user)
+                ))
+            else:
+                cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
+
+        if db_user:
+            cursor.execute(sql.SQL("GRANT ALL PRIVILEGES ON DATABASE {} TO {}").format(
+                sql.Identifier(db_name), sql.Identifier(db_user)
+            ))
+
+    return not exists
+
+
+def drop_tenant_database(db_name, db_user=None):
+    """Termina las conexiones activas y elimina la BD y el rol del tenant"""
+    with admin_cursor() as cursor:
+        cursor.execute("""
+            SELECT pg_terminate_backend(pid)
+            FROM pg_stat_activity
+            WHERE datname = %s AND pid <> pg_backend_pid()
+        """, [db_name])
+
+        cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(db_name)))
+
+        if db_user:
+            cursor.execute(sql.SQL("DROP USER IF EXISTS {}").format(sql.Identifier(db_user)))
@@ -0,0 +1,15 @@
+"""
+Motor de deployment en proceso
+
+Lo usan el worker de aprovisionamiento (vía panel.views) y los scripts de
+infra/scripts, que quedan como envoltorios de línea de comandos.
+"""
+
+from .base import DeploymentResult
+from .github import GitHubClient, GitHubError
+from .images import ProductImageBuilder
+from .materialize import TreeMaterializer
+from .product_repo import ProductRepoInitializer
+from .workspace import WorkspaceDeployer
+
+__all__ = ['DeploymentResult', 'GitHubClient', 'GitHubError', 'ProductImageBuilder', 'TreeMaterializer', 'ProductRepoInitializer', 'WorkspaceDeployer']
@@ -0,0 +1,147 @@
+"""
+Piezas comunes del motor de deployment: resultado estructurado, callbacks de
+progreso y ejecución de comandos
+"""
+
+import os
+import subprocess
+from dataclasses import dataclass, field, asdict
+
+from .github import GitHubError, get_client as get_github_client
+
+
+GITIGNORE_CONTENT = """
+__pycache__/
+*.pyc
+*.pyo
+*.pyd
+.Python
+*.so
+*.egg
+*.egg-info/
+dist/
+build/
+.env
+.venv
+venv/
+ENV/
+db.sqlite3
+*.log
+.DS_Store
+node_modules/
+"""
+
+
+def write_file(path, content):
+    """Escribe reemplazando el archivo: nunca modifica un hardlink compartido con el código base"""
+    tmp_path = f"{path}.tmp-deploy"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class DeploymentResult:
+    success: bool
+    path: str = ''
+    repo_url: str = ''
+    compose_path: str = ''
+    image: str = ''
+    error: str = ''
+    # Pasos completados, en orden: [(paso, mensaje), ...]
+    steps: list = field(default_factory=list)
+
+    def to_dict(self):
+        data = asdict(self)
+        # Mismo formato que imprimían los scripts: sin claves vacías
+        return {key: value for key, value in data.items() if value or key == 'success'}
+
+
+class DeploymentRunner:
+    """
+    Base de los runners. `log(mensaje)` recibe cada línea de log y
+    `progress(paso, mensaje)` se llama al terminar cada paso.
+    """
+
+    log_prefix = ''
+
+    def __init__(self, repo_name, log=None, progress=None, github=None):
+        self._log = log
+        self._progress = progress
+        self.steps = []
+        
+        # Cliente compartido: las conexiones a GitHub se reutilizan entre deployments
+        self.github = github or get_github_client()
+        self.repo_name = repo_name
+
+    def log(self, message):
+        if self._log:
+            self._log(f"[{self.log_prefix}] {message}")
+
+    def step_done(self, step, message=''):
+        self.steps.append((step, message))
+        if self._progress:
+            self._progress(step, message)
+
+    def run_command(self, command, cwd=None):
+        """Ejecuta comando shell"""
+        try:
+            result = subprocess.run(
+                command,
+                shell=True,
+                cwd=cwd,
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            return result.stdout
+        except subprocess.CalledProcessError as e:
+            self.log(f"Error ejecutando: {command}")
+            self.log(f"Error: {e.stderr}")
+            raise
+
+    def has_commits(self, cwd):
+        return subprocess.run(
+            "git rev-parse --verify HEAD",
+            shell=True,
+            cwd=cwd,
+            capture_output=True
+        ).returncode == 0
+
+    def create_github_repo(self, description):
+        """Crea repositorio privado en GitHub"""
+        self.log(f"Creando repo privado en GitHub: {self.repo_name}")
+        
+        if not self.github.configured:
+            self.log("⚠️ GITHUB_TOKEN no configurado, saltando creación de repo")
+            return None
+        
+        try:
+            repo_url = self.github.create_repo(self.repo_name, description)
+            self.log(f"✅ Repo listo: {repo_url}")
+            return repo_url
+        except GitHubError as e:
+            self.log(f"❌ {e}")
+            return None
+    
+    def push_to_github(self, repo_url, cwd):
+        """Push código a GitHub"""
+        if not repo_url:
+            self.log("No hay repo URL, saltando push")
+            return
+        
+        self.log(f"Haciendo push a {repo_url}")
+        
+        # Configurar remote
+        try:
+            self.run_command(f"git remote add origin {repo_url}", cwd=cwd)
+        except subprocess.CalledProcessError:
+            self.run_command(f"git remote set-url origin {repo_url}", cwd=cwd)
+        
+        # Push
+        try:
+            self.run_command("git branch -M main", cwd=cwd)
+            self.run_command("git push -u origin main --force", cwd=cwd)
+            self.log("✅ Push exitoso")
+        except Exception as e:
+            self.log(f"⚠️ Error en push: {e}")
@@ -0,0 +1,190 @@
+"""
+Cliente de la API de GitHub para crear repositorios
+
+Una sesión HTTP por proceso (conexiones reutilizadas), timeouts en todas las
+llamadas y reintentos que respetan Retry-After y X-RateLimit-Reset. Las
+escrituras se espacian al menos GITHUB_WRITE_INTERVAL segundos para no
+disparar el límite secundario de GitHub en altas masivas; antes de un alta
+masiva se listan los repos de la cuenta para no repetir POSTs de repos que ya
+existen.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class GitHubError(Exception):
+    pass
+
+
+class GitHubClient:
+    def __init__(self, token=None, username=None, base_url=None, timeout=10, max_retries=5, write_interval=None, log=None):
+        self.token = token if token is not None else os.getenv('GITHUB_TOKEN')
+        self.username = username or os.getenv('GITHUB_USERNAME', 'kritaar')
+        self.base_url = (base_url or os.getenv('GITHUB_API_URL', 'https://api.github.com')).rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.write_interval = float(os.getenv('GITHUB_WRITE_INTERVAL', '1')) if write_interval is None else write_interval
+        self.log = log or (lambda message: None)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'token {self.token}',
+            'Accept': 'application/vnd.github.v3+json',
+        })
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=16)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._write_lock = threading.Lock()
+        self._last_write = 0.0
+
+    @property
+    def configured(self):
+        return bool(self.token)
+
+    def _throttle_write(self):
+        with self._write_lock:
+            wait = self._last_write + self.write_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_write = time.monotonic()
+
+    @staticmethod
+    def retry_delay(response, attempt):
+        """Segundos a esperar antes de reintentar, o None si la respuesta no es reintentable"""
+        if response.status_code in (403, 429):
+            if response.headers.get('Retry-After'):
+                return float(response.headers['Retry-After'])
+            if response.headers.get('X-RateLimit-Remaining') == '0' and response.headers.get('X-RateLimit-Reset'):
+                return max(float(response.headers['X-RateLimit-Reset']) - time.time(), 0) + 1
+            if 'rate limit' in response.text.lower():
+                # Límite secundario sin cabeceras: backoff exponencial
+                return min(60, 2 ** attempt * 5)
+            return None
+        if response.status_code in (502, 503, 504):
+            return 2 ** attempt
+        return None
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        # Los enlaces de paginación llegan como URL absolutas
+        url = path if path.startswith('http') else f"{self.base_url}{path}"
+
+        for attempt in range(self.max_retries + 1):
+            if method != 'GET':
+                self._throttle_write()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise GitHubError(f"Error conectando a GitHub: {e}") from e
+                time.sleep(2 ** attempt)
+                continue
+
+            delay = self.retry_delay(response, attempt)
+            if delay is None or attempt == self.max_retries:
+                return response
+
+            self.log(f"GitHub respondió {response.status_code}, reintentando en {delay:.0f}s")
+            if method == 'GET':
+                time.sleep(delay)
+            else:
+                # La espera aplica a todas las escrituras del cliente, no sólo a este hilo
+                with self._write_lock:
+                    self._last_write = max(self._last_write, time.monotonic() + delay - self.write_interval)
+
+        return response
+
+    def paginate(self, path, params=None):
+        """Recorre un listado siguiendo los enlaces `next` de la cabecera Link"""
+        response = self.request('GET', path, params={'per_page': 100, **(params or {})})
+        while True:
+            if response.status_code != 200:
+                raise GitHubError(f"Error listando {path}: {response.status_code} {response.text[:200]}")
+            yield from response.json()
+            next_url = response.links.get('next', {}).get('url')
+            if not next_url:
+                return
+            response = self.request('GET', next_url)
+
+    def list_repos(self):
+        """{nombre: clone_url} de los repos propios del usuario"""
+        return {
+            repo['name']: repo['clone_url']
+            for repo in self.paginate('/user/repos', {'affiliation': 'owner'})
+        }
+
+    def get_repo(self, name):
+        response = self.request('GET', f'/repos/{self.username}/{name}')
+        if response.status_code != 200:
+            raise GitHubError(f"No se pudo leer el repo {name}: {response.status_code}")
+        return response.json()
+
+    def create_repo(self, name, description='', private=True):
+        """Crea el repo (o retorna el existente). Retorna su clone_url"""
+        response = self.request('POST', '/user/repos', json={
+            'name': name,
+            'description': description,
+            'private': private,
+            'auto_init': False,
+        })
+
+        if response.status_code == 201:
+            return response.json()['clone_url']
+        if response.status_code == 422 and self.already_exists(response):
+            return f"https://github.com/{self.username}/{name}.git"
+        raise GitHubError(f"Error creando repo {name}: {response.status_code} {response.text[:200]}")
+
+    @staticmethod
+    def already_exists(response):
+        """Un 422 también puede ser un nombre inválido o un límite de la cuenta"""
+        try:
+            errors = response.json().get('errors') or []
+        except (ValueError, AttributeError):
+            return False
+        return any(isinstance(error, dict) and 'already exists' in str(error.get('message', '')) for error in errors)
+
+    def create_repos(self, repos, max_workers=4):
+        """
+        Crea varios repos reutilizando la sesión. `repos` es una lista de
+        (nombre, descripción). Retorna {nombre: clone_url o GitHubError}.
+        """
+        try:
+            existing = self.list_repos()
+        except GitHubError as e:
+            # Sin el listado se crean todos; los existentes responden 422
+            self.log(str(e))
+            existing = {}
+        results = {name: existing[name] for name, _ in repos if name in existing}
+        pending = [item for item in repos if item[0] not in existing]
+
+        def create(item):
+            name, description = item
+            try:
+                return name, self.create_repo(name, description)
+            except GitHubError as e:
+                return name, e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results.update(executor.map(create, pending))
+        return results
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Cliente compartido del proceso"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubClient()
+    return _client
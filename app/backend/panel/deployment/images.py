@@ -0,0 +1,126 @@
+"""
+Imágenes compartidas por producto
+
+La imagen de un producto se construye una vez por versión del código y se
+etiqueta con el hash del contexto de build (Product.build_context); todos los
+workspaces dedicados usan esa imagen y sólo difieren en env/labels.
+
+Requiere el CLI de docker y el socket del daemon montado en el contenedor del
+panel y del worker (ver docker-compose.yml).
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+
+from .materialize import TreeMaterializer
+
+# (dispositivo, inodo, tamaño, mtime) -> sha256, LRU acotado. Los archivos sin
+# cambios entre builds se leen una sola vez por proceso.
+FILE_DIGEST_CACHE_SIZE = 50000
+_file_digests = OrderedDict()
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    stat = os.stat(path)
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _file_digests_lock:
+        digest = _file_digests.get(key)
+        if digest is not None:
+            _file_digests.move_to_end(key)
+            return digest
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _file_digests_lock:
+        _file_digests[key] = digest
+        if len(_file_digests) > FILE_DIGEST_CACHE_SIZE:
+            _file_digests.popitem(last=False)
+    return digest
+
+
+def content_hash(root, exclude=()):
+    """Hash del árbol (rutas + contenido), con los mismos patrones ignorados que la materialización"""
+    h = hashlib.sha256()
+    exclude = set(exclude)
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not TreeMaterializer.ignored(d))
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(path, root)
+            if TreeMaterializer.ignored(name) or rel_path in exclude or os.path.islink(path):
+                continue
+            h.update(rel_path.encode())
+            h.update(file_digest(path).encode())
+
+    return h.hexdigest()[:16]
+
+
+class ProductImageBuilder:
+    """Construye (si falta) y resuelve la imagen de un producto para un árbol de código"""
+
+    def __init__(self, product_name, source_path, build_context='', log=None):
+        self.product_name = product_name
+        self.source_path = source_path
+        self.context_path = os.path.join(source_path, build_context) if build_context else source_path
+        self.registry = os.getenv('PRODUCT_IMAGE_REGISTRY', 'tenant-master')
+        self.push = os.getenv('PRODUCT_IMAGE_PUSH', 'False').lower() in ('1', 'true', 'yes')
+        self.log = log or (lambda message: None)
+
+    def available(self):
+        """Hace falta el CLI de docker y un Dockerfile en el contexto de build del producto"""
+        return bool(shutil.which('docker')) and os.path.exists(os.path.join(self.context_path, 'Dockerfile'))
+
+    def content_tag(self, exclude=()):
+        """Tag de la imagen: hash del contexto de build"""
+        return content_hash(self.context_path, exclude=exclude)
+
+    def image_name(self, tag, suffix=''):
+        name = f"{self.product_name}-{suffix}" if suffix else self.product_name
+        return f"{self.registry}/{name}:{tag}"
+
+    def image_exists(self, image):
+        return subprocess.run(
+            ['docker', 'image', 'inspect', image],
+            capture_output=True
+        ).returncode == 0
+
+    def ensure_image(self, tag):
+        """Construye la imagen compartida del producto si aún no existe. Retorna su nombre"""
+        image = self.image_name(tag)
+
+        # Un solo build por producto a la vez; los demás esperan y reutilizan la imagen
+        lock_path = f"{self.source_path}.image.lock"
+        with open(lock_path, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self.image_exists(image):
+                    self.log(f"Imagen compartida existente: {image}")
+                    return image
+
+                self.log(f"Construyendo imagen compartida {image}")
+                result = subprocess.run(
+                    ['docker', 'build', '-t', image, '.'],
+                    cwd=self.context_path,
+                    capture_output=True,
+                    text=True
+                )
+                if result.returncode != 0:
+                    raise Exception(f"Error construyendo {image}: {result.stderr[-2000:]}")
+
+                if self.push:
+                    subprocess.run(['docker', 'push', image], capture_output=True, text=True, check=True)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        return image
@@ -0,0 +1,138 @@
+"""
+Materialización del código base en la carpeta de un workspace
+"""
+
+import errno
+import fcntl
+import fnmatch
+import os
+import shutil
+
+
+IGNORE_PATTERNS = ('.git', '__pycache__', '*.pyc', 'venv', 'node_modules')
+
+# ioctl de Linux para clonar un archivo copy-on-write (btrfs, xfs con reflink)
+FICLONE = 0x40049409
+
+
+class TreeMaterializer:
+    """
+    Sincroniza dest con source compartiendo los archivos sin cambios.
+
+    Estrategias: 'reflink' (copy-on-write), 'hardlink' o 'copy'. 'auto' prueba
+    reflink y baja a copy si el filesystem no lo soporta.
+
+    'hardlink' sólo se usa si se pide explícitamente: dest y el código base
+    comparten el inodo, así que cualquier escritura en el lugar sobre un
+    archivo de dest (un editor, `git checkout`, `open(..., 'w')`) modifica
+    también el código base y los demás workspaces. Este módulo y write_file
+    reemplazan con os.replace, pero no protegen de escrituras de terceros.
+    """
+
+    STRATEGIES = ('reflink', 'hardlink', 'copy')
+    AUTO = ('reflink', 'copy')
+
+    def __init__(self, source, dest, strategy='auto', preserve=()):
+        self.source = source
+        self.dest = dest
+        self.preserve = set(preserve)
+        if strategy == 'auto':
+            self.strategies = list(self.AUTO)
+        elif strategy in self.STRATEGIES:
+            self.strategies = [strategy]
+        else:
+            raise ValueError(f"Estrategia de materialización desconocida: {strategy}")
+        self.stats = {'unchanged': 0, 'reflink': 0, 'hardlink': 0, 'copy': 0, 'removed': 0}
+
+    @staticmethod
+    def ignored(name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in IGNORE_PATTERNS)
+
+    @staticmethod
+    def unchanged(src, dst):
+        try:
+            src_stat = os.lstat(src)
+            dst_stat = os.lstat(dst)
+        except FileNotFoundError:
+            return False
+
+        if os.path.samestat(src_stat, dst_stat):
+            return True
+        return src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+    def _reflink(self, src, tmp):
+        with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, tmp)
+
+    def _hardlink(self, src, tmp):
+        os.link(src, tmp)
+
+    def _copy(self, src, tmp):
+        shutil.copy2(src, tmp)
+
+    def place(self, src, dst):
+        tmp = f"{dst}.tmp-materialize"
+
+        while self.strategies:
+            strategy = self.strategies[0]
+            try:
+                if os.path.lexists(tmp):
+                    os.remove(tmp)
+                getattr(self, f"_{strategy}")(src, tmp)
+                break
+            except OSError as e:
+                if strategy == 'copy' or e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EPERM, errno.EMLINK):
+                    raise
+                # El filesystem no soporta esta estrategia: bajar a la siguiente
+                self.strategies.pop(0)
+        else:
+            raise OSError(f"Ninguna estrategia disponible para {src}")
+
+        os.replace(tmp, dst)
+        self.stats[strategy] += 1
+
+    def materialize(self):
+        os.makedirs(self.dest, exist_ok=True)
+        seen = set()
+
+        for root, dirs, files in os.walk(self.source):
+            dirs[:] = [d for d in dirs if not self.ignored(d)]
+            rel_root = os.path.relpath(root, self.source)
+            target_root = os.path.normpath(os.path.join(self.dest, rel_root))
+            os.makedirs(target_root, exist_ok=True)
+
+            for name in files:
+                if self.ignored(name):
+                    continue
+
+                src = os.path.join(root, name)
+                dst = os.path.join(target_root, name)
+                seen.add(os.path.normpath(os.path.join(rel_root, name)))
+
+                if os.path.islink(src):
+                    link_target = os.readlink(src)
+                    if os.path.islink(dst) and os.readlink(dst) == link_target:
+                        self.stats['unchanged'] += 1
+                        continue
+                    if os.path.lexists(dst):
+                        os.remove(dst)
+                    os.symlink(link_target, dst)
+                    self.stats['copy'] += 1
+                elif self.unchanged(src, dst):
+                    self.stats['unchanged'] += 1
+                else:
+                    self.place(src, dst)
+
+        # Eliminar archivos que ya no existen en el código base
+        for root, dirs, files in os.walk(self.dest):
+            dirs[:] = [d for d in dirs if not self.ignored(d)]
+            rel_root = os.path.relpath(root, self.dest)
+            for name in files:
+                rel_path = os.path.normpath(os.path.join(rel_root, name))
+                if self.ignored(name) or rel_path in seen or rel_path in self.preserve:
+                    continue
+                os.remove(os.path.join(root, name))
+                self.stats['removed'] += 1
+
+        return self.stats
@@ -0,0 +1,97 @@
+"""
+Inicialización del repositorio base de productos SHARED
+- Crea carpeta /opt/proyectos/{producto}-system/
+- Inicializa Git
+- Crea repo privado en GitHub
+- Push inicial
+"""
+
+import os
+
+from .base import DeploymentResult, DeploymentRunner, GITIGNORE_CONTENT, write_file
+
+
+class ProductRepoInitializer(DeploymentRunner):
+    log_prefix = 'INIT'
+    
+    def __init__(self, product_name, log=None, progress=None, github=None):
+        super().__init__(f"{product_name}-system", log=log, progress=progress, github=github)
+        self.product_name = product_name
+        self.project_path = f"/opt/proyectos/{product_name}-system"
+    
+    def create_project_folder(self):
+        """Crea carpeta del proyecto"""
+        self.log(f"Creando carpeta {self.project_path}")
+        os.makedirs(self.project_path, exist_ok=True)
+        
+        # Crear README.md básico
+        readme_content = f"""# {self.product_name.upper()} System
+
+Sistema base compartido para todos los workspaces de tipo {self.product_name}.
+
+## Estructura
+
+Agrega aquí tu código (Django, Flask, FastAPI, etc)
+
+## Deployment
+
+Este código es usado por todos los workspaces SHARED de {self.product_name}.
+Cualquier cambio aquí afecta a todos los clientes compartidos.
+"""
+        readme_path = os.path.join(self.project_path, 'README.md')
+        write_file(readme_path, readme_content)
+        
+        # Crear .gitignore
+        gitignore_path = os.path.join(self.project_path, '.gitignore')
+        write_file(gitignore_path, GITIGNORE_CONTENT)
+        
+        self.log("Carpeta creada con README.md y .gitignore")
+    
+    def initialize_git(self):
+        """Inicializa repositorio Git"""
+        self.log("Inicializando Git...")
+        
+        self.run_command("git init", cwd=self.project_path)
+        self.run_command("git config user.name 'Tenant Master'", cwd=self.project_path)
+        self.run_command("git config user.email 'deploy@surgir.online'", cwd=self.project_path)
+        self.run_command("git add .", cwd=self.project_path)
+        
+        if not self.has_commits(self.project_path):
+            self.run_command('git commit -m "Initial commit - Repositorio base"', cwd=self.project_path)
+        
+        self.log("Git inicializado")
+    
+    def initialize(self):
+        """Ejecuta todo el proceso de inicialización y retorna un DeploymentResult"""
+        try:
+            self.log(f"=== INICIALIZANDO REPOSITORIO: {self.product_name} ===")
+            
+            # 1. Crear carpeta
+            self.create_project_folder()
+            self.step_done('folder', f"Carpeta {self.project_path} creada")
+            
+            # 2. Git init
+            self.initialize_git()
+            self.step_done('git', 'Git inicializado')
+            
+            # 3. Crear repo en GitHub
+            repo_url = self.create_github_repo(f"Código base compartido para {self.product_name}")
+            self.step_done('github_repo', repo_url or 'Sin repo en GitHub')
+            
+            # 4. Push a GitHub
+            if repo_url:
+                self.push_to_github(repo_url, self.project_path)
+                self.step_done('push', f"Push a {repo_url}")
+            
+            self.log(f"=== INICIALIZACIÓN COMPLETADA ===")
+            
+            return DeploymentResult(
+                success=True,
+                path=self.project_path,
+                repo_url=repo_url or '',
+                steps=self.steps,
+            )
+            
+        except Exception as e:
+            self.log(f"❌ ERROR EN INICIALIZACIÓN: {e}")
+            return DeploymentResult(success=False, error=str(e), steps=self.steps)
@@ -0,0 +1,153 @@
+"""
+Migración en paralelo de las bases de datos de los tenants
+
+Cada tenant se migra con el `manage.py migrate` de su producto, en la imagen
+del producto (database_pool.run_product_migrate): el panel no tiene las apps ni
+las dependencias de los productos. La imagen se resuelve una vez por producto y
+los procesos del pool sólo lanzan el comando. El planificador limita los procesos totales y los simultáneos por
+host de BD, y devuelve un reporte por tenant que permite reintentar sólo los
+fallidos. Los tenants cuyo migration_fingerprint coincide con la versión del
+esquema de su producto (database_pool.migrations_version) se omiten sin
+conectarse a su BD.
+"""
+
+import json
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .database_pool import migrations_version, product_image, run_product_migrate
+from .models import Tenant
+from .tenant_databases import build_database_settings
+
+
+def migrate_tenant(tenant_id, fingerprint='', image=None):
+    """Aplica las migraciones pendientes a un tenant (se ejecuta en el proceso hijo)"""
+    started = time.monotonic()
+    result = {'tenant_id': tenant_id, 'success': False, 'error': ''}
+
+    try:
+        tenant = Tenant.objects.get(pk=tenant_id)
+        result.update({'subdomain': tenant.subdomain, 'db_name': tenant.db_name, 'db_host': tenant.db_host})
+
+        # Lanza Exception si el comando sale con error: el fingerprint no se actualiza
+        output = run_product_migrate(tenant.product, build_database_settings(tenant), image=image)
+
+        Tenant.objects.filter(pk=tenant_id).update(
+            migration_fingerprint=fingerprint,
+            migrated_at=timezone.now(),
+        )
+
+        result['success'] = True
+        result['output'] = output
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        connections.close_all()
+
+    result['duration'] = round(time.monotonic() - started, 3)
+    return result
+
+
+class FleetMigrator:
+    def __init__(self, workers=4, per_host=2, log=None):
+        self.workers = workers
+        self.per_host = per_host
+        self.log = log or (lambda message: None)
+
+    def run(self, tenants, force=False):
+        """Migra los tenants y retorna el reporte con un resultado por tenant"""
+        tenants = list(tenants)
+        started_at = timezone.now()
+        # Una versión por producto: el esquema es el del código de cada producto
+        fingerprints = {}
+        images = {}
+        results = []
+
+        queues = defaultdict(deque)
+        for tenant in tenants:
+            product = tenant.product
+            if product.name not in fingerprints:
+                fingerprints[product.name] = migrations_version(product)
+            fingerprint = fingerprints[product.name]
+
+            if not force and tenant.migration_fingerprint == fingerprint:
+                results.append({
+                    'tenant_id': tenant.id,
+                    'subdomain': tenant.subdomain,
+                    'db_name': tenant.db_name,
+                    'db_host': tenant.db_host,
+                    'success': True,
+                    'skipped': True,
+                    'error': '',
+                    'duration': 0,
+                })
+                continue
+            if product.name not in images:
+                try:
+                    # Con DATABASE_POOL_MIGRATE_COMMAND no hace falta imagen
+                    images[product.name] = None if settings.DATABASE_POOL_MIGRATE_COMMAND else product_image(product)
+                except Exception as e:
+                    images[product.name] = e
+            if isinstance(images[product.name], Exception):
+                results.append({
+                    'tenant_id': tenant.id,
+                    'subdomain': tenant.subdomain,
+                    'db_name': tenant.db_name,
+                    'db_host': tenant.db_host,
+                    'success': False,
+                    'error': str(images[product.name]),
+                    'duration': 0,
+                })
+                continue
+
+            queues[tenant.db_host].append((tenant.id, fingerprint, images[product.name]))
+
+        # Los hijos deben abrir sus propias conexiones, no heredar las del padre
+        connections.close_all()
+
+        in_flight = {}
+        host_load = defaultdict(int)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            def submit_ready():
+                for host, queue in queues.items():
+                    while queue and len(in_flight) < self.workers and host_load[host] < self.per_host:
+                        future = executor.submit(migrate_tenant, *queue.popleft())
+                        in_flight[future] = host
+                        host_load[host] += 1
+
+            submit_ready()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host = in_flight.pop(future)
+                    host_load[host] -= 1
+                    result = future.result()
+                    results.append(result)
+
+                    mark = '✓' if result['success'] else '✗'
+                    self.log(f"{mark} {result.get('subdomain', result['tenant_id'])} ({result['duration']}s) {result['error']}")
+                submit_ready()
+
+        return {
+            'started_at': started_at.isoformat(),
+            'finished_at': timezone.now().isoformat(),
+            'fingerprints': fingerprints,
+            'total': len(tenants),
+            'skipped': sum(1 for r in results if r.get('skipped')),
+            'success': sum(1 for r in results if r['success'] and not r.get('skipped')),
+            'failed': sum(1 for r in results if not r['success']),
+            'results': sorted(results, key=lambda r: r['tenant_id']),
+        }
+
+
+def failed_tenant_ids(report_path):
+    """IDs de los tenants que fallaron en un reporte anterior"""
+    with open(report_path) as f:
+        report = json.load(f)
+    return [r['tenant_id'] for r in report['results'] if not r['success']]
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from panel.deployment.github import GitHubError, get_client
+from panel.models import Tenant
+from panel.tenant_cache import tenant_cache
+
+
+class Command(BaseCommand):
+    help = 'Crea en lote los repos de GitHub de los workspaces dedicados que aún no tienen uno'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', help='Sólo los tenants de este producto')
+        parser.add_argument('--workers', type=int, default=4, help='Peticiones simultáneas a GitHub')
+
+    def handle(self, *args, **options):
+        client = get_client()
+        client.log = self.stdout.write
+        if not client.configured:
+            raise CommandError('GITHUB_TOKEN no configurado')
+
+        tenants = Tenant.objects.filter(type='dedicated', git_repo_url='').select_related('product')
+        if options['product']:
+            tenants = tenants.filter(product__name=options['product'])
+
+        # Mismo nombre de repo que usa WorkspaceDeployer
+        by_repo = {f"{t.product.name}-{t.subdomain}": t for t in tenants}
+        repos = [(name, f"Workspace dedicado para {t.subdomain}") for name, t in by_repo.items()]
+        self.stdout.write(f'Creando {len(repos)} repos')
+
+        linked = 0
+        for name, result in client.create_repos(repos, max_workers=options['workers']).items():
+            if isinstance(result, GitHubError):
+                self.stdout.write(self.style.ERROR(f'✗ {name}: {result}'))
+                continue
+
+            Tenant.objects.filter(pk=by_repo[name].pk).update(git_repo_url=result)
+            linked += 1
+            self.stdout.write(self.style.SUCCESS(f'✓ {name}: {result}'))
+
+        if linked:
+            # update() no emite post_save
+            tenant_cache.invalidate()
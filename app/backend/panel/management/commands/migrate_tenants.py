@@ -0,0 +1,51 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from panel.fleet_migrations import FleetMigrator, failed_tenant_ids
+from panel.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Aplica las migraciones a las bases de datos de los tenants en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.FLEET_MIGRATE_WORKERS, help='Procesos en paralelo')
+        parser.add_argument('--per-host', type=int, default=settings.FLEET_MIGRATE_PER_HOST, help='Máximo de migraciones simultáneas por host de BD')
+        parser.add_argument('--tenant', action='append', default=[], help='Subdominio a migrar (repetible)')
+        parser.add_argument('--report', help='Ruta donde guardar el reporte JSON')
+        parser.add_argument('--retry-failed', metavar='REPORT', help='Reintenta sólo los tenants fallidos de un reporte')
+        parser.add_argument('--force', action='store_true', help='Migra aunque el fingerprint indique que el tenant está al día')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(status='active').select_related('product')
+
+        if options['tenant']:
+            tenants = tenants.filter(subdomain__in=options['tenant'])
+        if options['retry_failed']:
+            tenants = tenants.filter(id__in=failed_tenant_ids(options['retry_failed']))
+
+        tenants = list(tenants.order_by('id'))
+        self.stdout.write(f"Starting migration for {len(tenants)} tenants...")
+
+        migrator = FleetMigrator(
+            workers=options['workers'],
+            per_host=options['per_host'],
+            log=self.stdout.write,
+        )
+        report = migrator.run(tenants, force=options['force'])
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Reporte guardado en {options['report']}")
+
+        self.stdout.write("\nMigration completed:")
+        self.stdout.write(f"  Up to date: {report['skipped']}")
+        self.stdout.write(f"  Success: {report['success']}")
+        self.stdout.write(f"  Failed: {report['failed']}")
+        self.stdout.write(f"  Total: {report['total']}")
+
+        if report['failed']:
+            raise SystemExit(1)
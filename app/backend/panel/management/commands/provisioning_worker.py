@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from panel.database_pool import refill_all_pools
+from panel.provisioning import claim_next_job, run_job
+from panel.rollout import claim_next_rollout, run_rollout
+
+
+def refill_in_background():
+    """Repone los pools en un hilo: migrar una plantilla puede tardar minutos"""
+    try:
+        refill_all_pools()
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de aprovisionamiento de workspaces y los rollouts pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesa los jobs pendientes y termina')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos entre consultas cuando la cola está vacía')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Worker de aprovisionamiento iniciado')
+        last_refill = 0.0
+        refill = None
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                rollout = claim_next_rollout()
+                if rollout is not None:
+                    self.stdout.write(f'Rollout {rollout.id}: {rollout.product.name} → {rollout.image}')
+                    run_rollout(rollout, log=self.stdout.write)
+                    self.stdout.write(f'Rollout {rollout.id}: {rollout.get_status_display()}')
+                    continue
+
+                if options['once']:
+                    break
+                
+                # Con la cola vacía, reponer el pool de BDs pre-migradas sin bloquear la cola
+                refilling = refill is not None and refill.is_alive()
+                if not refilling and time.monotonic() - last_refill >= settings.DATABASE_POOL_REFILL_INTERVAL:
+                    refill = threading.Thread(target=refill_in_background, name='database-pool-refill', daemon=True)
+                    refill.start()
+                    last_refill = time.monotonic()
+                
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Job {job.id}: aprovisionando {job.tenant.subdomain} (intento {job.attempts})')
+            run_job(job)
+
+            if job.status == 'success':
+                self.stdout.write(self.style.SUCCESS(f'✓ Job {job.id} completado'))
+            else:
+                self.stdout.write(self.style.ERROR(f'✗ Job {job.id} falló: {job.error}'))
+            
+            # Un pool recién consumido se repone en la próxima espera
+            last_refill = 0.0
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from panel.database_pool import refill_all_pools
+
+
+class Command(BaseCommand):
+    help = 'Completa el pool de bases de datos pre-migradas de cada producto'
+
+    def handle(self, *args, **options):
+        for product_name, result in refill_all_pools().items():
+            if isinstance(result, int):
+                self.stdout.write(self.style.SUCCESS(f'✓ {product_name}: {result} BDs creadas'))
+            else:
+                self.stdout.write(self.style.ERROR(f'✗ {product_name}: {result}'))
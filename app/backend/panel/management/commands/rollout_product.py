@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from panel.deployment import ProductImageBuilder
+from panel.models import Product, Rollout
+from panel.rollout import RolloutError, create_rollout, retry_rollout, run_rollout
+
+
+class Command(BaseCommand):
+    help = 'Actualiza la imagen de todos los workspaces dedicados de un producto vía Portainer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product', nargs='?', help='Nombre del producto')
+        parser.add_argument('--version', dest='tag', help='Tag de la imagen compartida del producto (hash de contenido)')
+        parser.add_argument('--image', help='Imagen completa (repositorio:tag); tiene prioridad sobre --version')
+        parser.add_argument('--concurrency', type=int, help='Stacks actualizados en paralelo')
+        parser.add_argument('--per-host', type=int, help='Máximo de stacks simultáneos por endpoint')
+        parser.add_argument('--canary', type=int, help='Cantidad de tenants canario')
+        parser.add_argument('--max-error-rate', type=float, help='Fracción de fallos que detiene el rollout')
+        parser.add_argument('--enqueue', action='store_true', help='Sólo crea el rollout; lo ejecuta provisioning_worker')
+        parser.add_argument('--resume', type=int, metavar='ROLLOUT_ID', help='Retoma un rollout (reintenta sus fallidos)')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                rollout = Rollout.objects.get(pk=options['resume'])
+            except Rollout.DoesNotExist:
+                raise CommandError(f"No existe el rollout {options['resume']}")
+            try:
+                retry_rollout(rollout, claim=not options['enqueue'])
+            except RolloutError as e:
+                raise CommandError(str(e))
+        else:
+            if not options['product'] or not (options['image'] or options['tag']):
+                raise CommandError('Indica el producto y --version o --image')
+            try:
+                product = Product.objects.get(name=options['product'])
+            except Product.DoesNotExist:
+                raise CommandError(f"No existe el producto {options['product']}")
+
+            image = options['image'] or ProductImageBuilder(product.name, '').image_name(options['tag'])
+            rollout = create_rollout(
+                product,
+                image,
+                concurrency=options['concurrency'],
+                per_host=options['per_host'],
+                canary_count=options['canary'],
+                max_error_rate=options['max_error_rate'],
+                # Sin --enqueue se ejecuta aquí: 'running' desde el inicio para que el worker no lo tome
+                claim=not options['enqueue'],
+            )
+
+        total = rollout.targets.count()
+        self.stdout.write(f'Rollout {rollout.id}: {rollout.product.name} → {rollout.image} ({total} tenants)')
+        if options['enqueue']:
+            return
+
+        run_rollout(rollout, log=self.stdout.write)
+
+        style = self.style.SUCCESS if rollout.status == 'completed' else self.style.ERROR
+        self.stdout.write(style(f'Rollout {rollout.id}: {rollout.get_status_display()} {rollout.error}'))
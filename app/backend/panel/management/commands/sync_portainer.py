@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from panel.portainer import PortainerError, is_configured, sync_stacks
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza los stacks de Portainer con la tabla local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Sincroniza cada PORTAINER_SYNC_INTERVAL segundos')
+        parser.add_argument('--force', action='store_true', help='Ignora el ETag guardado')
+
+    def handle(self, *args, **options):
+        if not is_configured():
+            self.stdout.write(self.style.WARNING('Portainer no configurado (PORTAINER_BASE, PORTAINER_API_KEY)'))
+            if options['loop']:
+                # Si el servicio del compose termina, Docker lo reinicia en bucle: queda en espera
+                self.stdout.write('Sin sincronización hasta reiniciar con Portainer configurado')
+                while True:
+                    time.sleep(3600)
+            return
+
+        force = options['force']
+        while True:
+            close_old_connections()
+            try:
+                summary = sync_stacks(force=force)
+                if summary['unchanged']:
+                    self.stdout.write('Stacks sin cambios')
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✓ {summary['created']} nuevos, {summary['updated']} actualizados, "
+                        f"{summary['deleted']} eliminados, {summary['linked']} vinculados"
+                    ))
+            except PortainerError as e:
+                self.stdout.write(self.style.ERROR(f'✗ {e}'))
+
+            if not options['loop']:
+                break
+
+            force = False
+            time.sleep(settings.PORTAINER_SYNC_INTERVAL)
@@ -1,5 +1,7 @@
 from django.conf import settings
 from .models import Tenant
+from .tenant_cache import tenant_cache
+from .tenant_context import set_current_tenant, reset_current_tenant
 
 class TenantMiddleware:
     def __init__(self, get_response):
@@ -12,12 +14,25 @@ class TenantMiddleware:
         
         if host != settings.PANEL_DOMAIN and not host.startswith('127.0.0.1') and not host.startswith('localhost'):
             subdomain = host.replace(f".{settings.BASE_DOMAIN}", "")
-            
-            try:
-                tenant = Tenant.objects.get(subdomain=subdomain, status='active')
-                request.tenant = tenant
-            except Tenant.DoesNotExist:
-                pass
+            request.tenant = self.resolve_tenant(subdomain)
         
-        response = self.get_response(request)
+        token = set_current_tenant(request.tenant)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_current_tenant(token)
         return response
+    
+    def resolve_tenant(self, subdomain):
+        """Resuelve el tenant activo del subdominio, cacheando también los fallos"""
+        found, tenant = tenant_cache.get(subdomain)
+        if found:
+            return tenant
+        
+        try:
+            tenant = Tenant.objects.get(subdomain=subdomain, status='active')
+        except Tenant.DoesNotExist:
+            tenant = None
+        
+        tenant_cache.set(subdomain, tenant)
+        return tenant
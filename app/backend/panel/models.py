@@ -9,6 +9,7 @@ class Product(models.Model):
     icon = models.CharField(max_length=10, default='📦')
     docker_image = models.CharField(max_length=200, blank=True)
     template_path = models.CharField(max_length=255, blank=True, help_text="Path en /opt/proyectos/")
+    build_context = models.CharField(max_length=255, blank=True, help_text="Carpeta del Dockerfile dentro del código (ej. backend); vacío = raíz")
     github_repo_url = models.CharField(max_length=500, blank=True, help_text="URL del repositorio GitHub del código base")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -59,6 +60,7 @@ class Tenant(models.Model):
     
     stack_name = models.CharField(max_length=100, blank=True)
     portainer_stack_id = models.IntegerField(null=True, blank=True)
+    image = models.CharField(max_length=300, blank=True, help_text="Imagen desplegada en el stack")
 
     owner = models.ForeignKey(User, on_delete=models.PROTECT, related_name='owned_tenants')
 
@@ -68,6 +70,9 @@ class Tenant(models.Model):
     is_deployed = models.BooleanField(default=False)
     deployed_at = models.DateTimeField(null=True, blank=True)
 
+    migration_fingerprint = models.CharField(max_length=64, blank=True, help_text="Versión del esquema del producto aplicada (migrations_version)")
+    migrated_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -131,3 +136,138 @@ class ActivityLog(models.Model):
 
     def __str__(self):
         return f"{self.action} - {self.created_at}"
+
+class ProvisioningJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('success', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='provisioning_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    steps = models.JSONField(default=list, help_text="[{name, label, status, message, started_at, finished_at}]")
+    current_step = models.CharField(max_length=50, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'panel_provisioning_job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} - {self.tenant.subdomain} ({self.status})"
+
+    @property
+    def progress(self):
+        if not self.steps:
+            return 0
+        done = sum(1 for step in self.steps if step['status'] == 'success')
+        return int(done * 100 / len(self.steps))
+
+
+class PortainerStack(models.Model):
+    """Copia local de los stacks de Portainer (ver panel/portainer.py)"""
+    STATUS_CHOICES = [
+        (1, 'Activo'),
+        (2, 'Detenido'),
+    ]
+
+    stack_id = models.IntegerField(unique=True)
+    name = models.CharField(max_length=200)
+    endpoint_id = models.IntegerField(null=True, blank=True)
+    stack_type = models.IntegerField(null=True, blank=True)
+    status = models.IntegerField(choices=STATUS_CHOICES, null=True, blank=True)
+    tenant = models.ForeignKey(Tenant, on_delete=models.SET_NULL, null=True, blank=True, related_name='portainer_stacks')
+    data = models.JSONField(default=dict, help_text="Payload de Portainer")
+    data_hash = models.CharField(max_length=40, help_text="Hash del payload para detectar cambios")
+    portainer_updated_at = models.DateTimeField(null=True, blank=True)
+
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'panel_portainer_stack'
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.stack_id})"
+
+
+class Rollout(models.Model):
+    """Actualización de la imagen de todos los workspaces dedicados de un producto (ver panel/rollout.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('completed', 'Completado'),
+        ('halted', 'Detenido por errores'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='rollouts')
+    image = models.CharField(max_length=300, help_text="Imagen destino (repositorio:tag)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    concurrency = models.IntegerField(default=5)
+    per_host = models.IntegerField(default=2, help_text="Máximo de stacks simultáneos por endpoint de Portainer")
+    canary_count = models.IntegerField(default=1)
+    max_error_rate = models.FloatField(default=0.2, help_text="Fracción de fallos que detiene el rollout")
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'panel_rollout'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Rollout {self.id} - {self.product.name} → {self.image} ({self.status})"
+
+    @property
+    def progress(self):
+        total = self.targets.count()
+        if not total:
+            return 100
+        done = self.targets.filter(status__in=['success', 'skipped', 'failed']).count()
+        return int(done * 100 / total)
+
+
+class RolloutTarget(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('success', 'Actualizado'),
+        ('skipped', 'Ya actualizado'),
+        ('failed', 'Fallido'),
+    ]
+
+    rollout = models.ForeignKey(Rollout, on_delete=models.CASCADE, related_name='targets')
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='rollout_targets')
+    position = models.IntegerField(help_text="Orden de ejecución; los canarios van primero")
+    is_canary = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    previous_image = models.CharField(max_length=300, blank=True)
+    error = models.TextField(blank=True)
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'panel_rollout_target'
+        ordering = ['rollout', 'position']
+        unique_together = ['rollout', 'tenant']
+
+    def __str__(self):
+        return f"{self.rollout_id}:{self.tenant.subdomain} ({self.status})"
@@ -0,0 +1,196 @@
+"""
+Cliente de Portainer y sincronización de stacks
+
+Las vistas leen la tabla local PortainerStack; sólo el comando
+`sync_portainer` (y el botón de sincronizar) consultan Portainer. El cliente
+reutiliza una sesión HTTP con timeouts, envía If-None-Match con el último ETag
+y sólo escribe las filas cuyo payload cambió.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PortainerStack, Tenant
+from .tenant_cache import tenant_cache
+
+STACKS_ETAG_KEY = 'panel:portainer:stacks_etag'
+LAST_SYNC_KEY = 'panel:portainer:last_sync'
+
+
+class PortainerError(Exception):
+    pass
+
+
+class PortainerClient:
+    def __init__(self, base_url=None, api_key=None, timeout=None):
+        self.base_url = (base_url or settings.PORTAINER_BASE).rstrip('/')
+        self.timeout = timeout or settings.PORTAINER_TIMEOUT
+
+        self.session = requests.Session()
+        self.session.headers['X-API-Key'] = api_key or settings.PORTAINER_API_KEY
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=['GET'])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException as e:
+            raise PortainerError(f"Error conectando a Portainer: {e}") from e
+
+    def list_stacks(self, etag=None):
+        """Retorna (stacks, etag). stacks es None si Portainer respondió 304"""
+        headers = {'If-None-Match': etag} if etag else {}
+        response = self.request('GET', '/api/stacks', headers=headers)
+
+        if response.status_code == 304:
+            return None, etag
+        if response.status_code != 200:
+            raise PortainerError(f"Portainer respondió {response.status_code} al listar stacks")
+
+        return response.json(), response.headers.get('ETag')
+
+    def _json(self, response, action):
+        if response.status_code != 200:
+            raise PortainerError(f"Portainer respondió {response.status_code} al {action}: {response.text[:200]}")
+        return response.json()
+
+    def get_stack(self, stack_id):
+        return self._json(self.request('GET', f'/api/stacks/{stack_id}'), f'leer el stack {stack_id}')
+
+    def get_stack_file(self, stack_id):
+        data = self._json(self.request('GET', f'/api/stacks/{stack_id}/file'), f'leer el compose del stack {stack_id}')
+        return data['StackFileContent']
+
+    def update_stack(self, stack_id, endpoint_id, content, env=None, pull_image=True):
+        """Redespliega el stack con el compose indicado"""
+        response = self.request(
+            'PUT',
+            f'/api/stacks/{stack_id}',
+            params={'endpointId': endpoint_id},
+            json={
+                'StackFileContent': content,
+                'Env': env or [],
+                'Prune': False,
+                'PullImage': pull_image,
+            },
+            # Un redeploy con pull de imagen tarda bastante más que una consulta
+            timeout=(self.timeout, self.timeout * 30),
+        )
+        return self._json(response, f'actualizar el stack {stack_id}')
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Cliente compartido del proceso (una sola sesión con su pool de conexiones)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PortainerClient()
+    return _client
+
+
+def is_configured():
+    return bool(settings.PORTAINER_BASE and settings.PORTAINER_API_KEY)
+
+
+def _payload_hash(stack):
+    return hashlib.sha1(json.dumps(stack, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _timestamp(value):
+    if not value:
+        return None
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+def sync_stacks(client=None, force=False):
+    """
+    Trae los stacks de Portainer y actualiza la tabla local.
+    Retorna un resumen {'unchanged', 'created', 'updated', 'deleted', 'linked'}.
+    """
+    client = client or get_client()
+    # Sin filas locales no tiene sentido un 304: se pide la lista completa
+    use_etag = not force and PortainerStack.objects.exists()
+    etag = cache.get(STACKS_ETAG_KEY) if use_etag else None
+
+    stacks, new_etag = client.list_stacks(etag)
+    summary = {'unchanged': stacks is None, 'created': 0, 'updated': 0, 'deleted': 0, 'linked': 0}
+
+    if stacks is not None:
+        existing = {s.stack_id: s for s in PortainerStack.objects.all()}
+        tenants_by_stack = dict(
+            Tenant.objects.filter(portainer_stack_id__isnull=False).values_list('portainer_stack_id', 'id')
+        )
+        tenants_by_name = dict(
+            Tenant.objects.filter(portainer_stack_id__isnull=True).exclude(stack_name='').values_list('stack_name', 'id')
+        )
+
+        to_create, to_update, seen = [], [], set()
+        with transaction.atomic():
+            for stack in stacks:
+                stack_id = stack['Id']
+                seen.add(stack_id)
+
+                # Tenants con stack_name pero sin portainer_stack_id quedan vinculados por nombre
+                tenant_id = tenants_by_stack.get(stack_id)
+                if tenant_id is None and stack.get('Name') in tenants_by_name:
+                    tenant_id = tenants_by_name[stack['Name']]
+                    Tenant.objects.filter(pk=tenant_id).update(portainer_stack_id=stack_id)
+                    summary['linked'] += 1
+
+                data_hash = _payload_hash(stack)
+                current = existing.get(stack_id)
+                if current and current.data_hash == data_hash and current.tenant_id == tenant_id:
+                    continue
+
+                obj = current or PortainerStack(stack_id=stack_id)
+                obj.name = stack.get('Name', '')
+                obj.endpoint_id = stack.get('EndpointId')
+                obj.stack_type = stack.get('Type')
+                obj.status = stack.get('Status')
+                obj.tenant_id = tenant_id
+                obj.data = stack
+                obj.data_hash = data_hash
+                obj.portainer_updated_at = _timestamp(stack.get('UpdateDate') or stack.get('CreationDate'))
+                obj.synced_at = timezone.now()
+                (to_update if current else to_create).append(obj)
+
+            PortainerStack.objects.bulk_create(to_create)
+            PortainerStack.objects.bulk_update(to_update, [
+                'name', 'endpoint_id', 'stack_type', 'status', 'tenant',
+                'data', 'data_hash', 'portainer_updated_at', 'synced_at',
+            ])
+            summary['deleted'], _ = PortainerStack.objects.exclude(stack_id__in=seen).delete()
+
+            if summary['linked']:
+                # update() no emite post_save: se invalida una vez por sincronización
+                transaction.on_commit(tenant_cache.invalidate)
+
+        summary['created'] = len(to_create)
+        summary['updated'] = len(to_update)
+
+    if new_etag:
+        cache.set(STACKS_ETAG_KEY, new_etag, None)
+    cache.set(LAST_SYNC_KEY, timezone.now(), None)
+    return summary
+
+
+def last_sync():
+    return cache.get(LAST_SYNC_KEY)
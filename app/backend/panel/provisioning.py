@@ -0,0 +1,227 @@
+"""
+Cola de aprovisionamiento de workspaces
+
+create_workspace sólo registra el Tenant y encola un ProvisioningJob; el
+comando `provisioning_worker` toma los jobs de la BD (SELECT ... FOR UPDATE
+SKIP LOCKED) y ejecuta los pasos guardando el estado de cada uno, de modo que
+un reintento continúa desde el paso que falló.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import views
+from .models import ProvisioningJob
+
+
+def step_reporter(job, name):
+    """Callback de progreso del motor de deployment: actualiza el mensaje del paso en curso"""
+    def report(step, message):
+        for item in job.steps:
+            if item['name'] == name:
+                item['message'] = message
+        _save_progress(job)
+    return report
+
+
+def step_create_database(job):
+    tenant = job.tenant
+    views.create_database(tenant.db_name, tenant.db_user, tenant.db_password, tenant.product)
+    return f'Base de datos {tenant.db_name} lista'
+
+
+def step_ensure_super_admin(job):
+    if job.requested_by:
+        views.ensure_super_admin_in_product(job.tenant.product.name, job.requested_by)
+    return 'Super admin verificado'
+
+
+def step_initialize_repo(job):
+    tenant = job.tenant
+    product = tenant.product
+
+    if product.github_repo_url:
+        tenant.git_repo_url = product.github_repo_url
+        tenant.save()
+        return f'Repositorio base existente: {product.github_repo_url}'
+
+    repo_result = views.initialize_product_repo(product.name, progress=step_reporter(job, 'initialize_repo'))
+    if not repo_result.get('success'):
+        raise Exception(repo_result.get('error', 'No se pudo inicializar repositorio'))
+
+    product.github_repo_url = repo_result.get('repo_url', '')
+    product.template_path = repo_result.get('path', '')
+    product.save()
+
+    tenant.git_repo_url = product.github_repo_url
+    tenant.save()
+    return f'Repositorio base inicializado: {product.github_repo_url}'
+
+
+def step_deploy_workspace(job):
+    tenant = job.tenant
+    deploy_result = views.deploy_dedicated_workspace(
+        tenant.product.name,
+        tenant.subdomain,
+        tenant.db_name,
+        tenant.db_user,
+        tenant.db_password,
+        build_context=tenant.product.build_context,
+        progress=step_reporter(job, 'deploy_workspace')
+    )
+
+    if not deploy_result.get('success'):
+        raise Exception(deploy_result.get('error', 'Deployment falló'))
+
+    tenant.git_repo_url = deploy_result.get('repo_url', '')
+    tenant.image = deploy_result.get('image', '')
+    tenant.is_deployed = True
+    tenant.deployed_at = timezone.now()
+    tenant.save()
+    return f'Workspace desplegado en {deploy_result.get("path", tenant.project_path)}'
+
+
+# nombre -> (etiqueta, función, obligatorio). Un paso no obligatorio que falla
+# queda registrado pero no detiene el job (igual que el flujo síncrono anterior).
+STEPS = {
+    'create_database': ('Crear base de datos', step_create_database, True),
+    'ensure_super_admin': ('Registrar super admin en el producto', step_ensure_super_admin, True),
+    'initialize_repo': ('Inicializar repositorio base', step_initialize_repo, False),
+    'deploy_workspace': ('Desplegar workspace dedicado', step_deploy_workspace, True),
+}
+
+
+def build_steps(tenant):
+    names = ['create_database', 'ensure_super_admin']
+    if tenant.type == 'dedicated':
+        names.append('deploy_workspace')
+    else:
+        names.append('initialize_repo')
+
+    return [
+        {
+            'name': name,
+            'label': STEPS[name][0],
+            'status': 'pending',
+            'message': '',
+            'started_at': None,
+            'finished_at': None,
+        }
+        for name in names
+    ]
+
+
+def enqueue_provisioning(tenant, user=None):
+    """Crea el job de aprovisionamiento. Si PROVISIONING_ASYNC está desactivado lo ejecuta en línea"""
+    job = ProvisioningJob.objects.create(
+        tenant=tenant,
+        requested_by=user,
+        steps=build_steps(tenant),
+    )
+
+    if not settings.PROVISIONING_ASYNC:
+        job.status = 'running'
+        job.attempts = 1
+        job.started_at = timezone.now()
+        job.save()
+        run_job(job)
+
+    return job
+
+
+def claim_next_job():
+    """Toma el siguiente job pendiente (o uno 'running' abandonado por un worker caído)"""
+    stale_before = timezone.now() - timedelta(seconds=settings.PROVISIONING_JOB_TIMEOUT)
+
+    with transaction.atomic():
+        job = (
+            ProvisioningJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', updated_at__lt=stale_before))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = 'running'
+        job.attempts += 1
+        job.started_at = job.started_at or timezone.now()
+        job.save(update_fields=['status', 'attempts', 'started_at', 'updated_at'])
+
+    return job
+
+
+def _save_progress(job):
+    job.save(update_fields=['steps', 'current_step', 'updated_at'])
+
+
+def run_job(job):
+    """Ejecuta los pasos pendientes del job en orden"""
+    for step in job.steps:
+        if step['status'] in ('success', 'skipped'):
+            continue
+
+        _, func, required = STEPS[step['name']]
+
+        step['status'] = 'running'
+        step['message'] = ''
+        step['started_at'] = timezone.now().isoformat()
+        job.current_step = step['name']
+        _save_progress(job)
+
+        try:
+            step['message'] = func(job) or ''
+            step['status'] = 'success'
+        except Exception as e:
+            step['message'] = str(e)
+            step['status'] = 'failed'
+
+        step['finished_at'] = timezone.now().isoformat()
+        _save_progress(job)
+
+        if step['status'] == 'failed' and required:
+            job.status = 'failed'
+            job.error = f"{step['label']}: {step['message']}"
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+            return job
+
+    job.status = 'success'
+    job.current_step = ''
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'current_step', 'error', 'finished_at', 'updated_at'])
+    return job
+
+
+def retry_job(job):
+    """Reencola un job fallido; los pasos completados no se repiten"""
+    for step in job.steps:
+        if step['status'] == 'failed':
+            step['status'] = 'pending'
+
+    job.status = 'pending'
+    job.error = ''
+    job.finished_at = None
+    job.save(update_fields=['steps', 'status', 'error', 'finished_at', 'updated_at'])
+    return job
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'tenant': job.tenant_id,
+        'status': job.status,
+        'progress': job.progress,
+        'current_step': job.current_step,
+        'steps': job.steps,
+        'error': job.error,
+        'attempts': job.attempts,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
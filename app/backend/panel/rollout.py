@@ -0,0 +1,346 @@
+"""
+Rollout de una imagen nueva a los workspaces dedicados de un producto
+
+Cada tenant dedicado con stack en Portainer es un RolloutTarget. Primero se
+actualizan los canarios (los de plan más bajo); si alguno falla el rollout se
+detiene. El resto se actualiza en paralelo con un máximo total y otro por
+endpoint de Portainer, y el rollout se detiene si la tasa de fallos supera
+max_error_rate. Los targets pendientes de un rollout detenido se retoman con
+`run_rollout` (o `rollout_product --resume`).
+
+Mientras corre, el rollout actualiza updated_at (latido); uno 'running' sin
+latido por ROLLOUT_TIMEOUT quedó de un worker caído y se vuelve a tomar. Quien
+lo ejecuta fuera del worker (rollout_product sin --enqueue) lo crea o retoma ya
+en 'running' (claim=True), así el worker nunca toma el mismo rollout.
+"""
+
+import re
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .deployment import ProductImageBuilder
+from .models import PortainerStack, Rollout, RolloutTarget, Tenant
+from .portainer import get_client
+from .tenant_cache import tenant_cache
+
+# Segundos entre latidos mientras se esperan los stacks en curso
+HEARTBEAT_INTERVAL = 30
+
+IMAGE_LINE = re.compile(r'^(\s*image:\s*)(\S+)[ \t]*$', re.MULTILINE)
+
+PLAN_ORDER = Case(
+    *[When(plan=plan, then=Value(rank)) for rank, (plan, _) in enumerate(Tenant.PLAN_CHOICES)],
+    default=Value(len(Tenant.PLAN_CHOICES)),
+    output_field=IntegerField(),
+)
+
+
+class RolloutError(Exception):
+    pass
+
+
+def image_repository(image):
+    """'registry:5000/erp:abc123' -> 'registry:5000/erp'"""
+    name, _, tag = image.rpartition(':')
+    if name and '/' not in tag:
+        return name
+    return image
+
+
+def replace_image(content, image):
+    """Cambia el tag de las líneas `image:` del repositorio de `image` en un compose"""
+    repository = image_repository(image)
+    replaced = 0
+
+    def substitute(match):
+        nonlocal replaced
+        if image_repository(match.group(2).strip('"\'')) != repository:
+            return match.group(0)
+        replaced += 1
+        return f"{match.group(1)}{image}"
+
+    content = IMAGE_LINE.sub(substitute, content)
+    if not replaced:
+        raise RolloutError(f"El compose del stack no usa una imagen de {repository}")
+    return content
+
+
+def create_rollout(product, image, user=None, concurrency=None, per_host=None, canary_count=None, max_error_rate=None, claim=False):
+    """
+    Crea el rollout con un target por workspace dedicado del producto, canarios
+    primero. Con claim=True queda 'running' para ejecutarlo en este proceso
+    """
+    rollout = Rollout(
+        product=product,
+        image=image,
+        status='running' if claim else 'pending',
+        started_at=timezone.now() if claim else None,
+        requested_by=user,
+        concurrency=concurrency or settings.ROLLOUT_CONCURRENCY,
+        per_host=per_host or settings.ROLLOUT_PER_HOST,
+        canary_count=settings.ROLLOUT_CANARY_COUNT if canary_count is None else canary_count,
+        max_error_rate=settings.ROLLOUT_MAX_ERROR_RATE if max_error_rate is None else max_error_rate,
+    )
+
+    tenants = (
+        Tenant.objects
+        .filter(product=product, type='dedicated', status='active', portainer_stack_id__isnull=False)
+        .annotate(plan_rank=PLAN_ORDER)
+        .order_by('plan_rank', 'created_at')
+    )
+
+    with transaction.atomic():
+        rollout.save()
+        RolloutTarget.objects.bulk_create([
+            RolloutTarget(
+                rollout=rollout,
+                tenant=tenant,
+                position=position,
+                is_canary=position < rollout.canary_count,
+                previous_image=tenant.image,
+            )
+            for position, tenant in enumerate(tenants)
+        ])
+
+    return rollout
+
+
+def stale_before():
+    return timezone.now() - timedelta(seconds=settings.ROLLOUT_TIMEOUT)
+
+
+def is_stale(rollout):
+    """'running' sin latido reciente: el worker que lo ejecutaba se cayó"""
+    return rollout.status == 'running' and rollout.updated_at < stale_before()
+
+
+def claim_next_rollout():
+    """Toma el siguiente rollout pendiente o abandonado (lo usa provisioning_worker)"""
+    with transaction.atomic():
+        rollout = (
+            Rollout.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', updated_at__lt=stale_before()))
+            .order_by('created_at')
+            .first()
+        )
+        if rollout is None:
+            return None
+
+        rollout.status = 'running'
+        rollout.save(update_fields=['status', 'updated_at'])
+
+    return rollout
+
+
+def update_target(target_id, image, client, pull_image=True):
+    """Actualiza el stack de un tenant (se ejecuta en un hilo del pool)"""
+    target = RolloutTarget.objects.select_related('tenant').get(pk=target_id)
+    tenant = target.tenant
+
+    try:
+        target.status = 'running'
+        target.started_at = timezone.now()
+        target.error = ''
+        target.save(update_fields=['status', 'started_at', 'error'])
+
+        if tenant.image == image:
+            target.status = 'skipped'
+            return target
+
+        stack = client.get_stack(tenant.portainer_stack_id)
+        content = replace_image(client.get_stack_file(tenant.portainer_stack_id), image)
+        client.update_stack(
+            tenant.portainer_stack_id, stack['EndpointId'], content, stack.get('Env'), pull_image=pull_image
+        )
+
+        Tenant.objects.filter(pk=tenant.pk).update(image=image)
+        target.status = 'success'
+    except Exception as e:
+        target.status = 'failed'
+        target.error = str(e)
+    finally:
+        target.finished_at = timezone.now()
+        target.save(update_fields=['status', 'error', 'finished_at'])
+        connections.close_all()
+
+    return target
+
+
+def should_halt(rollout, canary_phase):
+    counts = defaultdict(int)
+    for status in rollout.targets.filter(is_canary=canary_phase).values_list('status', flat=True):
+        counts[status] += 1
+
+    if canary_phase:
+        return counts['failed'] > 0
+
+    finished = counts['success'] + counts['failed']
+    # Se espera a tener una muestra del tamaño de una tanda antes de juzgar la tasa
+    if finished < min(rollout.concurrency, finished + counts['pending'] + counts['running']):
+        return False
+    return finished > 0 and counts['failed'] / finished > rollout.max_error_rate
+
+
+class RolloutRunner:
+    def __init__(self, rollout, client=None, log=None):
+        self.rollout = rollout
+        self.client = client or get_client()
+        self.log = log or (lambda message: None)
+        # Sin push las imágenes sólo existen en el host donde se construyeron: no hay nada que pullear
+        self.pull_image = ProductImageBuilder(rollout.product.name, '').push
+
+    def heartbeat(self):
+        Rollout.objects.filter(pk=self.rollout.pk).update(updated_at=timezone.now())
+
+    def endpoints(self, targets):
+        stack_ids = [target.tenant.portainer_stack_id for target in targets]
+        return dict(PortainerStack.objects.filter(stack_id__in=stack_ids).values_list('stack_id', 'endpoint_id'))
+
+    def run_phase(self, targets, canary_phase):
+        """Actualiza los targets respetando los límites. Retorna False si hubo que detenerse"""
+        rollout = self.rollout
+        endpoints = self.endpoints(targets)
+
+        queues = defaultdict(deque)
+        for target in targets:
+            host = endpoints.get(target.tenant.portainer_stack_id, settings.PORTAINER_ENDPOINT_ID)
+            queues[host].append(target.id)
+
+        in_flight = {}
+        host_load = defaultdict(int)
+        halted = False
+
+        with ThreadPoolExecutor(max_workers=rollout.concurrency) as executor:
+            def submit_ready():
+                for host, queue in queues.items():
+                    while queue and len(in_flight) < rollout.concurrency and host_load[host] < rollout.per_host:
+                        future = executor.submit(
+                            update_target, queue.popleft(), rollout.image, self.client, self.pull_image
+                        )
+                        in_flight[future] = host
+                        host_load[host] += 1
+
+            submit_ready()
+            while in_flight:
+                done, _ = wait(in_flight, timeout=HEARTBEAT_INTERVAL, return_when=FIRST_COMPLETED)
+                self.heartbeat()
+                updated = False
+                for future in done:
+                    host = in_flight.pop(future)
+                    host_load[host] -= 1
+                    target = future.result()
+                    updated = updated or target.status == 'success'
+
+                    mark = {'success': '✓', 'skipped': '=', 'failed': '✗'}.get(target.status, '?')
+                    canary = ' (canario)' if target.is_canary else ''
+                    self.log(f"{mark} {target.tenant.subdomain}{canary} {target.error}")
+
+                if updated:
+                    # update_target cambia Tenant.image con update(), sin post_save
+                    tenant_cache.invalidate()
+                if not halted and should_halt(rollout, canary_phase):
+                    # Lo que no se envió queda 'pending' para un --resume
+                    halted = True
+                    queues.clear()
+                submit_ready()
+
+        return not halted
+
+    def run(self):
+        rollout = self.rollout
+        rollout.status = 'running'
+        rollout.error = ''
+        rollout.started_at = rollout.started_at or timezone.now()
+        rollout.finished_at = None
+        rollout.save(update_fields=['status', 'error', 'started_at', 'finished_at', 'updated_at'])
+
+        # 'running' sólo puede quedar de una ejecución interrumpida: se reintenta
+        targets = list(
+            rollout.targets.select_related('tenant')
+            .filter(status__in=['pending', 'running'])
+            .order_by('position')
+        )
+
+        phases = [
+            (True, [t for t in targets if t.is_canary]),
+            (False, [t for t in targets if not t.is_canary]),
+        ]
+        for canary_phase, phase_targets in phases:
+            if phase_targets and not self.run_phase(phase_targets, canary_phase):
+                rollout.status = 'halted'
+                rollout.error = 'Falló un canario' if canary_phase else 'Tasa de errores sobre el límite'
+                break
+            if canary_phase and should_halt(rollout, True):
+                # Canarios fallidos de una ejecución anterior
+                rollout.status = 'halted'
+                rollout.error = 'Falló un canario'
+                break
+        else:
+            failed = rollout.targets.filter(status='failed').count()
+            rollout.status = 'completed'
+            rollout.error = f'{failed} tenants fallaron' if failed else ''
+
+        rollout.finished_at = timezone.now()
+        rollout.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+        return rollout
+
+
+def run_rollout(rollout, client=None, log=None):
+    return RolloutRunner(rollout, client=client, log=log).run()
+
+
+def retry_rollout(rollout, claim=False):
+    """
+    Reencola el rollout con sus targets fallidos en 'pending'; los actualizados
+    no se repiten. Con claim=True queda 'running' para ejecutarlo en este
+    proceso. Lanza RolloutError si otro proceso lo está ejecutando
+    """
+    with transaction.atomic():
+        # Con la fila bloqueada claim_next_rollout (skip_locked) no puede tomarlo a la vez
+        current = Rollout.objects.select_for_update().get(pk=rollout.pk)
+        if current.status == 'running' and not is_stale(current):
+            raise RolloutError(f"El rollout {rollout.pk} está en ejecución")
+
+        rollout.targets.filter(status='failed').update(status='pending', error='')
+        rollout.status = 'running' if claim else 'pending'
+        rollout.error = ''
+        rollout.save(update_fields=['status', 'error', 'updated_at'])
+    return rollout
+
+
+def serialize_rollout(rollout, include_targets=True):
+    data = {
+        'id': rollout.id,
+        'product': rollout.product.name,
+        'image': rollout.image,
+        'status': rollout.status,
+        'progress': rollout.progress,
+        'error': rollout.error,
+        'concurrency': rollout.concurrency,
+        'per_host': rollout.per_host,
+        'canary_count': rollout.canary_count,
+        'max_error_rate': rollout.max_error_rate,
+        'created_at': rollout.created_at.isoformat(),
+        'finished_at': rollout.finished_at.isoformat() if rollout.finished_at else None,
+    }
+    if include_targets:
+        data['targets'] = [
+            {
+                'tenant': target.tenant_id,
+                'subdomain': target.tenant.subdomain,
+                'is_canary': target.is_canary,
+                'status': target.status,
+                'previous_image': target.previous_image,
+                'error': target.error,
+                'finished_at': target.finished_at.isoformat() if target.finished_at else None,
+            }
+            for target in rollout.targets.select_related('tenant')
+        ]
+    return data
@@ -1,13 +1,23 @@
 from django.conf import settings
+from .tenant_context import get_current_tenant
+from .tenant_databases import register_tenant_database
 
 class TenantRouter:
+    def get_tenant(self, hints):
+        """Tenant del request en los hints o, en su defecto, el del contexto actual"""
+        request = hints.get('request')
+        if request and hasattr(request, 'tenant') and request.tenant:
+            return request.tenant
+        
+        return get_current_tenant()
+    
     def db_for_read(self, model, **hints):
         if model._meta.app_label == 'panel':
             return 'default'
         
-        request = hints.get('request')
-        if request and hasattr(request, 'tenant') and request.tenant:
-            return request.tenant.db_name
+        tenant = self.get_tenant(hints)
+        if tenant:
+            return register_tenant_database(tenant)
         
         return 'default'
     
@@ -15,9 +25,9 @@ class TenantRouter:
         if model._meta.app_label == 'panel':
             return 'default'
         
-        request = hints.get('request')
-        if request and hasattr(request, 'tenant') and request.tenant:
-            return request.tenant.db_name
+        tenant = self.get_tenant(hints)
+        if tenant:
+            return register_tenant_database(tenant)
         
         return 'default'
     
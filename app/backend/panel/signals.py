@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Tenant, ActivityLog
+from .stats import invalidate_dashboard_stats, push_recent_activity, reset_recent_activity
+from .tenant_cache import tenant_cache
+from .tenant_databases import unregister_tenant_database
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    """
+    Invalida la resolución de subdominios al crear, modificar o eliminar un
+    tenant, al confirmar la transacción: antes, otro worker podría recargar el
+    caché con el estado viejo
+    """
+    transaction.on_commit(tenant_cache.invalidate)
+
+
+@receiver(post_delete, sender=Tenant)
+def release_tenant_database(sender, instance, **kwargs):
+    """Libera la conexión registrada de un tenant eliminado"""
+    unregister_tenant_database(instance)
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def update_dashboard_stats(sender, instance, **kwargs):
+    """El snapshot del dashboard se recalcula en la próxima lectura"""
+    invalidate_dashboard_stats()
+
+
+@receiver(post_save, sender=ActivityLog)
+def update_recent_activity(sender, instance, created, **kwargs):
+    if created:
+        push_recent_activity(instance)
+
+
+@receiver(post_delete, sender=ActivityLog)
+def discard_recent_activity(sender, instance, **kwargs):
+    """También corre por cada registro borrado en cascada con su tenant"""
+    reset_recent_activity()
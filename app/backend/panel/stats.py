@@ -0,0 +1,151 @@
+"""
+Snapshot cacheado de las estadísticas del dashboard
+
+Los contadores se obtienen con una sola consulta de agregación condicional.
+Las señales de Tenant sólo borran el snapshot al confirmar la transacción; lo
+recalcula la siguiente lectura, una vez por ráfaga de cambios.
+
+La actividad reciente va aparte: cada registro nuevo toma un número con
+cache.incr (atómico en Redis) y se guarda en su propia clave, así dos workers
+que registran a la vez no se pisan la lista. La secuencia vence con
+DASHBOARD_ACTIVITY_TTL y se borra al eliminar registros (o tenants, que los
+borran en cascada): la siguiente lectura la recarga desde la base.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Tenant, ActivityLog
+
+DASHBOARD_STATS_KEY = 'panel:dashboard_stats'
+ACTIVITY_SEQUENCE_KEY = 'panel:dashboard_stats:activity'
+RECENT_LIMIT = 10
+# Las entradas viven algo más que la secuencia que las numera: nunca queda una secuencia sin su lista
+ACTIVITY_SLOT_GRACE = 60
+
+
+def compute_dashboard_stats():
+    """Calcula el snapshot completo del dashboard"""
+    counters = Tenant.objects.aggregate(
+        total_tenants=Count('id'),
+        active_tenants=Count('id', filter=Q(status='active')),
+        dedicated_count=Count('id', filter=Q(type='dedicated')),
+        shared_count=Count('id', filter=Q(type='shared')),
+    )
+    
+    return {
+        **counters,
+        'recent_tenants': list(
+            Tenant.objects.select_related('product', 'owner').order_by('-created_at')[:RECENT_LIMIT]
+        ),
+        'generated_at': timezone.now(),
+    }
+
+
+def refresh_dashboard_stats():
+    stats = compute_dashboard_stats()
+    cache.set(DASHBOARD_STATS_KEY, stats, settings.DASHBOARD_STATS_TTL)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    """Borra el snapshot cuando se confirma la transacción en curso"""
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_STATS_KEY))
+
+
+def get_dashboard_stats():
+    """Retorna el snapshot cacheado, calculándolo si expiró, con la actividad reciente"""
+    stats = cache.get(DASHBOARD_STATS_KEY)
+    if stats is None:
+        stats = refresh_dashboard_stats()
+    return {**stats, 'recent_activity': get_recent_activity()}
+
+
+def activity_key(sequence):
+    return f'{ACTIVITY_SEQUENCE_KEY}:{sequence % RECENT_LIMIT}'
+
+
+def activity_slot_ttl():
+    return settings.DASHBOARD_ACTIVITY_TTL + ACTIVITY_SLOT_GRACE
+
+
+def seed_recent_activity():
+    """Carga la actividad reciente desde la base e inicia la secuencia"""
+    logs = list(ActivityLog.objects.select_related('user', 'tenant').order_by('-created_at')[:RECENT_LIMIT])
+    sequence = len(logs)
+    cache.set_many(
+        {activity_key(sequence - position): (sequence - position, log) for position, log in enumerate(logs)},
+        activity_slot_ttl(),
+    )
+    # Si otro worker ya la inició (o registró algo) se respeta su secuencia
+    cache.add(ACTIVITY_SEQUENCE_KEY, sequence, settings.DASHBOARD_ACTIVITY_TTL)
+    return logs
+
+
+def get_recent_activity():
+    sequence = cache.get(ACTIVITY_SEQUENCE_KEY)
+    if sequence is None:
+        return seed_recent_activity()
+
+    sequences = range(sequence, max(sequence - RECENT_LIMIT, 0), -1)
+    slots = cache.get_many([activity_key(number) for number in sequences])
+    logs = []
+    for number in sequences:
+        # Una clave ocupada por otro número es una escritura aún en curso
+        entry = slots.get(activity_key(number))
+        if entry and entry[0] == number:
+            logs.append(entry[1])
+    return logs
+
+
+def push_recent_activity(log):
+    """Agrega un registro de actividad sin recalcular nada"""
+    def push():
+        try:
+            sequence = cache.incr(ACTIVITY_SEQUENCE_KEY)
+        except ValueError:
+            # Sin secuencia: la próxima lectura la inicia desde la base
+            return
+        cache.set(activity_key(sequence), (sequence, log), activity_slot_ttl())
+
+    transaction.on_commit(push)
+
+
+def reset_recent_activity():
+    """Descarta la actividad cacheada al confirmar la transacción: la próxima lectura la recarga"""
+    transaction.on_commit(lambda: cache.delete(ACTIVITY_SEQUENCE_KEY))
+
+
+def serialize_dashboard_stats(stats):
+    """Versión JSON del snapshot"""
+    return {
+        'total_tenants': stats['total_tenants'],
+        'active_tenants': stats['active_tenants'],
+        'dedicated_count': stats['dedicated_count'],
+        'shared_count': stats['shared_count'],
+        'recent_tenants': [
+            {
+                'id': tenant.id,
+                'company_name': tenant.company_name,
+                'subdomain': tenant.subdomain,
+                'type': tenant.type,
+                'status': tenant.status,
+                'product': tenant.product.display_name,
+                'created_at': tenant.created_at.isoformat(),
+            }
+            for tenant in stats['recent_tenants']
+        ],
+        'recent_activity': [
+            {
+                'id': log.id,
+                'action': log.action,
+                'description': log.description,
+                'user': log.user.username if log.user else None,
+                'created_at': log.created_at.isoformat(),
+            }
+            for log in stats['recent_activity']
+        ],
+        'generated_at': stats['generated_at'].isoformat(),
+    }
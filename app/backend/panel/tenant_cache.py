@@ -0,0 +1,95 @@
+"""
+Cache en proceso para la resolución subdominio -> Tenant
+
+Cada worker mantiene su propio LRU con TTL. Las escrituras sobre Tenant
+incrementan una generación compartida (cache de Django / Redis) y los demás
+workers vacían su copia local al detectar el cambio.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'panel:tenant_cache:generation'
+
+
+class TenantCache:
+    def __init__(self, ttl=60, max_entries=1000, sync_interval=2):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._last_sync = 0.0
+
+    def _sync_generation(self, now):
+        """Vacía el cache local si otro worker invalidó la generación"""
+        if now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        try:
+            generation = cache.get(GENERATION_KEY)
+        except Exception:
+            # Si el cache compartido no responde, el TTL acota la obsolescencia
+            return
+
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, subdomain):
+        """Retorna (encontrado, tenant). tenant puede ser None si se cacheó un fallo"""
+        now = time.monotonic()
+        with self._lock:
+            self._sync_generation(now)
+
+            entry = self._entries.get(subdomain)
+            if entry is None:
+                return False, None
+
+            expires_at, tenant = entry
+            if expires_at <= now:
+                del self._entries[subdomain]
+                return False, None
+
+            self._entries.move_to_end(subdomain)
+            return True, tenant
+
+    def set(self, subdomain, tenant):
+        """Guarda el tenant (o None para un subdominio inexistente)"""
+        with self._lock:
+            self._entries[subdomain] = (time.monotonic() + self.ttl, tenant)
+            self._entries.move_to_end(subdomain)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self):
+        """Invalida este worker y notifica al resto vía la generación compartida"""
+        self.clear()
+
+        try:
+            cache.add(GENERATION_KEY, 0, timeout=None)
+            generation = cache.incr(GENERATION_KEY)
+        except Exception:
+            return
+
+        with self._lock:
+            self._generation = generation
+            self._last_sync = time.monotonic()
+
+
+tenant_cache = TenantCache(
+    ttl=settings.TENANT_CACHE_TTL,
+    max_entries=settings.TENANT_CACHE_MAX_ENTRIES,
+    sync_interval=settings.TENANT_CACHE_SYNC_INTERVAL,
+)
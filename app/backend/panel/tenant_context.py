@@ -0,0 +1,40 @@
+"""
+Tenant activo del contexto de ejecución actual
+
+Se guarda en un ContextVar: cada hilo (gunicorn con threads) y cada tarea
+asyncio (ASGI) ve su propio valor, por lo que TenantRouter puede enrutar
+sin que Django le pase el request en los hints.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_tenant = ContextVar('current_tenant', default=None)
+
+
+def get_current_tenant():
+    return _current_tenant.get()
+
+
+def set_current_tenant(tenant):
+    """Activa el tenant y retorna el token para restaurar el valor anterior"""
+    return _current_tenant.set(tenant)
+
+
+def reset_current_tenant(token):
+    _current_tenant.reset(token)
+
+
+@contextmanager
+def using_tenant(tenant):
+    """
+    Ejecuta el bloque con el tenant activo (scripts, jobs en segundo plano)
+
+        with using_tenant(tenant):
+            Producto.objects.count()
+    """
+    token = set_current_tenant(tenant)
+    try:
+        yield tenant
+    finally:
+        reset_current_tenant(token)
@@ -0,0 +1,114 @@
+"""
+Registro dinámico de conexiones a las bases de datos de los tenants
+
+Las entradas de DATABASES se construyen en el primer uso a partir de la fila
+Tenant (db_host, db_port, db_user, db_password) heredando las opciones de
+'default'. Las conexiones son persistentes (CONN_MAX_AGE) y cada hilo mantiene
+como máximo TENANT_DB_MAX_CONNECTIONS abiertas: al superarlo se cierra la
+menos usada recientemente.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+_lock = threading.Lock()
+_local = threading.local()
+
+# alias -> credenciales con las que se registró la entrada
+_registered = {}
+
+
+def tenant_db_alias(tenant):
+    return tenant.db_name
+
+
+def _credentials(tenant):
+    return (tenant.db_name, tenant.db_user, tenant.db_password, tenant.db_host, tenant.db_port)
+
+
+def build_database_settings(tenant):
+    """Construye la entrada DATABASES del tenant a partir de 'default'"""
+    db = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+    db.update({
+        'NAME': tenant.db_name,
+        'USER': tenant.db_user or db['USER'],
+        'PASSWORD': tenant.db_password or db['PASSWORD'],
+        'HOST': tenant.db_host or db['HOST'],
+        'PORT': str(tenant.db_port or db['PORT']),
+        'CONN_MAX_AGE': settings.TENANT_DB_CONN_MAX_AGE,
+    })
+    return db
+
+
+def _open_aliases():
+    return {conn.alias for conn in connections.all(initialized_only=True)}
+
+
+def _close_connection(alias):
+    """Cierra y descarta la conexión del hilo actual. False si está en una transacción"""
+    if alias not in _open_aliases():
+        return True
+
+    conn = connections[alias]
+    if conn.in_atomic_block:
+        return False
+
+    conn.close()
+    del connections[alias]
+    return True
+
+
+def _touch(alias):
+    """Marca el alias como usado y aplica el presupuesto de conexiones del hilo"""
+    lru = getattr(_local, 'lru', None)
+    if lru is None:
+        lru = _local.lru = OrderedDict()
+
+    lru[alias] = None
+    lru.move_to_end(alias)
+
+    for candidate in list(lru):
+        if len(lru) <= settings.TENANT_DB_MAX_CONNECTIONS:
+            break
+        if candidate != alias and _close_connection(candidate):
+            del lru[candidate]
+
+
+def register_tenant_database(tenant):
+    """Registra (o actualiza) la conexión del tenant y retorna su alias"""
+    alias = tenant_db_alias(tenant)
+    credentials = _credentials(tenant)
+
+    if _registered.get(alias) != credentials:
+        with _lock:
+            if _registered.get(alias) != credentials:
+                if alias in _registered:
+                    _close_connection(alias)
+                config = build_database_settings(tenant)
+                connections.settings[alias] = config
+                settings.DATABASES[alias] = config
+                _registered[alias] = credentials
+
+    _touch(alias)
+    return alias
+
+
+def unregister_tenant_database(tenant):
+    """Cierra la conexión del hilo actual y elimina la entrada del tenant"""
+    alias = tenant_db_alias(tenant)
+
+    with _lock:
+        if alias not in _registered:
+            return
+        _close_connection(alias)
+        connections.settings.pop(alias, None)
+        settings.DATABASES.pop(alias, None)
+        del _registered[alias]
+
+    lru = getattr(_local, 'lru', None)
+    if lru is not None:
+        lru.pop(alias, None)
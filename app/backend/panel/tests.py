@@ -0,0 +1,283 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from .deployment.github import GitHubClient, GitHubError
+from .models import ActivityLog, PortainerStack, Product, Rollout, Tenant
+from .portainer import PortainerError
+from .rollout import RolloutError, claim_next_rollout, create_rollout, retry_rollout, run_rollout
+from .stats import get_recent_activity
+from .tenant_cache import tenant_cache
+
+
+class StubGitHub(BaseHTTPRequestHandler):
+    """
+    Responde con las respuestas encoladas en `server.responses` por
+    (método, ruta sin query): (status, cuerpo, cabeceras). La última se repite
+    """
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        path = urlsplit(self.path).path
+        self.server.calls.append((self.command, self.path, body))
+
+        queue = self.server.responses.get((self.command, path)) or [(404, {'message': 'Not Found'}, {})]
+        status, payload, headers = queue.pop(0) if len(queue) > 1 else queue[0]
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value.replace('{base}', self.server.base_url))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GitHubClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubGitHub)
+        self.server.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.server.responses = {}
+        self.server.calls = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.client = GitHubClient(
+            token='t', username='acme', base_url=self.server.base_url,
+            timeout=5, max_retries=2, write_interval=0,
+        )
+
+    def stub(self, method, path, *responses):
+        self.server.responses[(method, path)] = [
+            (status, payload, headers or {}) for status, payload, headers in responses
+        ]
+
+    def clone_url(self, name):
+        return f'https://github.com/acme/{name}.git'
+
+    def test_create_repo(self):
+        self.stub('POST', '/user/repos', (201, {'clone_url': self.clone_url('erp-demo')}, None))
+
+        self.assertEqual(self.client.create_repo('erp-demo', 'Demo'), self.clone_url('erp-demo'))
+        method, _, body = self.server.calls[0]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(body, {'name': 'erp-demo', 'description': 'Demo', 'private': True, 'auto_init': False})
+
+    def test_create_repo_existente(self):
+        self.stub('POST', '/user/repos', (422, {
+            'message': 'Repository creation failed.',
+            'errors': [{'resource': 'Repository', 'code': 'custom', 'field': 'name',
+                        'message': 'name already exists on this account'}],
+        }, None))
+
+        self.assertEqual(self.client.create_repo('erp-demo'), self.clone_url('erp-demo'))
+
+    def test_create_repo_422_de_otro_tipo(self):
+        self.stub('POST', '/user/repos', (422, {
+            'message': 'Validation Failed',
+            'errors': [{'resource': 'Repository', 'code': 'invalid', 'field': 'name'}],
+        }, None))
+
+        with self.assertRaises(GitHubError):
+            self.client.create_repo('nombre inválido')
+
+    def test_list_repos_sigue_la_paginacion(self):
+        self.stub('GET', '/user/repos', (200, [
+            {'name': 'erp-a', 'clone_url': self.clone_url('erp-a')},
+        ], {'Link': '<{base}/user/repos?page=2&per_page=100>; rel="next"'}), (200, [
+            {'name': 'erp-b', 'clone_url': self.clone_url('erp-b')},
+        ], None))
+
+        self.assertEqual(self.client.list_repos(), {
+            'erp-a': self.clone_url('erp-a'),
+            'erp-b': self.clone_url('erp-b'),
+        })
+        self.assertIn('page=2', self.server.calls[1][1])
+
+    def test_create_repos_omite_los_existentes(self):
+        self.stub('GET', '/user/repos', (200, [{'name': 'erp-a', 'clone_url': self.clone_url('erp-a')}], None))
+        self.stub('POST', '/user/repos', (201, {'clone_url': self.clone_url('erp-b')}, None))
+
+        results = self.client.create_repos([('erp-a', ''), ('erp-b', '')])
+
+        self.assertEqual(results, {'erp-a': self.clone_url('erp-a'), 'erp-b': self.clone_url('erp-b')})
+        posts = [body['name'] for method, _, body in self.server.calls if method == 'POST']
+        self.assertEqual(posts, ['erp-b'])
+
+    def test_reintenta_con_retry_after(self):
+        self.stub(
+            'POST', '/user/repos',
+            (403, {'message': 'You have exceeded a secondary rate limit'}, {'Retry-After': '0'}),
+            (201, {'clone_url': self.clone_url('erp-demo')}, None),
+        )
+
+        self.assertEqual(self.client.create_repo('erp-demo'), self.clone_url('erp-demo'))
+        self.assertEqual(len(self.server.calls), 2)
+
+    def test_reintenta_errores_del_servidor_en_lecturas(self):
+        self.client.max_retries = 1
+        self.stub('GET', '/repos/acme/erp-demo', (502, {}, None), (200, {'name': 'erp-demo'}, None))
+
+        self.assertEqual(self.client.get_repo('erp-demo'), {'name': 'erp-demo'})
+        self.assertEqual(len(self.server.calls), 2)
+
+    def test_agota_los_reintentos(self):
+        self.stub('POST', '/user/repos', (429, {'message': 'rate limit'}, {'Retry-After': '0'}))
+
+        with self.assertRaises(GitHubError):
+            self.client.create_repo('erp-demo')
+        self.assertEqual(len(self.server.calls), self.client.max_retries + 1)
+
+
+class FakePortainer:
+    """Cliente de Portainer en memoria: registra la concurrencia por endpoint y falla los stacks indicados"""
+    def __init__(self, endpoints, fail=(), delay=0.05):
+        self.endpoints = endpoints
+        self.fail = set(fail)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = defaultdict(int)
+        self.max_running = defaultdict(int)
+        self.max_total = 0
+        self.updated = []
+
+    def get_stack(self, stack_id):
+        return {'Id': stack_id, 'EndpointId': self.endpoints[stack_id], 'Env': []}
+
+    def get_stack_file(self, stack_id):
+        return 'services:\n  app:\n    image: registry:5000/erp:viejo\n'
+
+    def update_stack(self, stack_id, endpoint_id, content, env=None, pull_image=True):
+        with self.lock:
+            self.running[endpoint_id] += 1
+            self.max_running[endpoint_id] = max(self.max_running[endpoint_id], self.running[endpoint_id])
+            self.max_total = max(self.max_total, sum(self.running.values()))
+        time.sleep(self.delay)
+        with self.lock:
+            self.running[endpoint_id] -= 1
+            self.updated.append(stack_id)
+        if stack_id in self.fail:
+            raise PortainerError(f'stack {stack_id} no arrancó')
+        return {}
+
+
+class RolloutTests(TransactionTestCase):
+    """Los targets se actualizan en hilos: TransactionTestCase para que vean los datos"""
+    IMAGE = 'registry:5000/erp:nuevo'
+
+    def setUp(self):
+        owner = User.objects.create(username='admin')
+        self.product = Product.objects.create(name='erp', display_name='ERP')
+        self.endpoints = {}
+        for i in range(1, 9):
+            Tenant.objects.create(
+                name=f't{i}', subdomain=f't{i}', company_name=f'T{i}', product=self.product,
+                db_name=f'erp_t{i}', owner=owner, portainer_stack_id=i, image='registry:5000/erp:viejo',
+                # El primero es el de plan más bajo: el canario
+                plan='free' if i == 1 else 'professional',
+            )
+            # Dos endpoints de Portainer alternados
+            self.endpoints[i] = 1 + i % 2
+            PortainerStack.objects.create(stack_id=i, name=f'erp-t{i}', endpoint_id=self.endpoints[i], data_hash='x')
+
+    def rollout(self, **options):
+        return create_rollout(self.product, self.IMAGE, **{'concurrency': 4, 'per_host': 2, 'canary_count': 1, **options})
+
+    def test_actualiza_todos_respetando_los_limites(self):
+        client = FakePortainer(self.endpoints)
+        rollout = run_rollout(self.rollout(per_host=1), client=client)
+
+        self.assertEqual(rollout.status, 'completed')
+        self.assertEqual(sorted(client.updated), list(range(1, 9)))
+        self.assertEqual(set(Tenant.objects.values_list('image', flat=True)), {self.IMAGE})
+        self.assertEqual(max(client.max_running.values()), 1)
+        self.assertEqual(client.max_total, 2)
+
+    def test_canario_fallido_detiene_el_rollout(self):
+        client = FakePortainer(self.endpoints, fail={1})
+        rollout = run_rollout(self.rollout(), client=client)
+
+        self.assertEqual(rollout.status, 'halted')
+        self.assertEqual(client.updated, [1])
+        self.assertEqual(rollout.targets.filter(status='pending').count(), 7)
+
+    def test_tasa_de_errores_detiene_el_rollout(self):
+        client = FakePortainer(self.endpoints, fail={2, 3, 4, 5, 6, 7, 8})
+        rollout = run_rollout(self.rollout(concurrency=2, max_error_rate=0.2), client=client)
+
+        self.assertEqual(rollout.status, 'halted')
+        self.assertEqual(rollout.error, 'Tasa de errores sobre el límite')
+        self.assertGreater(rollout.targets.filter(status='pending').count(), 0)
+
+    def test_rollout_tomado_no_lo_toma_el_worker(self):
+        rollout = self.rollout(claim=True)
+
+        self.assertEqual(rollout.status, 'running')
+        self.assertIsNone(claim_next_rollout())
+        with self.assertRaises(RolloutError):
+            retry_rollout(rollout, claim=True)
+
+    def test_rollout_abandonado_se_puede_retomar(self):
+        rollout = self.rollout(claim=True)
+        Rollout.objects.filter(pk=rollout.pk).update(updated_at=rollout.updated_at - timedelta(days=1))
+        rollout.refresh_from_db()
+
+        retry_rollout(rollout, claim=True)
+        self.assertEqual(Rollout.objects.get(pk=rollout.pk).status, 'running')
+
+
+class TenantCacheSignalTests(TestCase):
+    def test_invalida_al_confirmar_la_transaccion(self):
+        owner = User.objects.create(username='admin')
+        product = Product.objects.create(name='erp', display_name='ERP')
+
+        with mock.patch.object(tenant_cache, 'invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                Tenant.objects.create(
+                    name='t', subdomain='t', company_name='T', product=product, db_name='erp_t', owner=owner,
+                )
+                # Otro worker recargaría el caché sin ver el tenant nuevo
+                invalidate.assert_not_called()
+            invalidate.assert_called_once()
+
+
+class RecentActivityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def log(self, description):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ActivityLog.objects.create(action='update', description=description)
+
+    def descriptions(self):
+        return [log.description for log in get_recent_activity()]
+
+    def test_registros_nuevos_y_borrados(self):
+        first, second = self.log('uno'), self.log('dos')
+        self.assertEqual(self.descriptions(), ['dos', 'uno'])
+
+        self.log('tres')
+        self.assertEqual(self.descriptions(), ['tres', 'dos', 'uno'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        # Sin la secuencia la lectura se recarga desde la base
+        self.assertEqual(self.descriptions(), ['tres', 'uno'])
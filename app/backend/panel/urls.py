@@ -10,6 +10,7 @@ urlpatterns = [
     
     # Dashboard
     path('dashboard/', views.dashboard, name='panel_dashboard'),
+    path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
     
     # Workspaces CRUD
     path('workspaces/', views.workspaces, name='workspaces'),
@@ -18,6 +19,7 @@ urlpatterns = [
     path('workspaces/<int:tenant_id>/edit/', views.edit_workspace, name='edit_workspace'),
     path('workspaces/<int:tenant_id>/action/', views.workspace_action, name='workspace_action'),
     path('workspaces/<int:tenant_id>/users/', views.manage_workspace_users, name='manage_workspace_users'),
+    path('workspaces/<int:tenant_id>/provisioning/', views.provisioning_status, name='provisioning_status'),
     
     # Otros módulos
     path('clients/', views.clients, name='clients'),
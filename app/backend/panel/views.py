@@ -12,17 +12,20 @@ from django.conf import settings
 from django.db.models import Count
 from django.db import connection
 from .models import Tenant, Product, TenantUser, ActivityLog
+from .stats import get_dashboard_stats, serialize_dashboard_stats
+from . import portainer, provisioning
+from .db_admin import create_tenant_database, drop_tenant_database
+from .deployment import WorkspaceDeployer, ProductRepoInitializer
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import secrets
 import string
-import subprocess
-import json
+import logging
 import shutil
 import os
 
+logger = logging.getLogger(__name__)
+
 
 def is_superuser(user):
     return user.is_superuser
@@ -54,22 +57,15 @@ def health_check(request):
 def dashboard(request):
     """Dashboard principal"""
     try:
-        total_tenants = Tenant.objects.count()
-        active_tenants = Tenant.objects.filter(status='active').count()
-        
-        dedicated_count = Tenant.objects.filter(type='dedicated').count()
-        shared_count = Tenant.objects.filter(type='shared').count()
-        
-        recent_tenants = Tenant.objects.select_related('product', 'owner').order_by('-created_at')[:10]
-        recent_activity = ActivityLog.objects.select_related('user', 'tenant').order_by('-created_at')[:10]
+        stats = get_dashboard_stats()
         
         context = {
-            'total_tenants': total_tenants,
-            'active_tenants': active_tenants,
-            'dedicated_count': dedicated_count,
-            'shared_count': shared_count,
-            'recent_tenants': recent_tenants,
-            'recent_activity': recent_activity,
+            'total_tenants': stats['total_tenants'],
+            'active_tenants': stats['active_tenants'],
+            'dedicated_count': stats['dedicated_count'],
+            'shared_count': stats['shared_count'],
+            'recent_tenants': stats['recent_tenants'],
+            'recent_activity': stats['recent_activity'],
         }
         return render(request, 'panel/dashboard.html', context)
     except Exception as e:
@@ -77,6 +73,16 @@ def dashboard(request):
         return render(request, 'panel/dashboard.html', {'error': str(e)})
 
 
+@login_required
+@user_passes_test(is_superuser)
+def dashboard_stats(request):
+    """Snapshot del dashboard en JSON"""
+    try:
+        return JsonResponse(serialize_dashboard_stats(get_dashboard_stats()))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
 @login_required
 @user_passes_test(is_superuser)
 def workspaces(request):
@@ -122,8 +128,6 @@ def create_workspace(request):
             db_user = f"user_{safe_subdomain}"
             db_password = generate_password()
             
-            create_database(db_name, db_user, db_password)
-            
             if workspace_type == 'dedicated':
                 project_path = f"/opt/proyectos/{product.name}-system-clients/{subdomain}"
                 stack_path = f"{project_path}/docker-compose.yml"
@@ -149,55 +153,8 @@ def create_workspace(request):
                 is_deployed=False
             )
             
-            # Crear usuario admin en la tabla master del producto
-            ensure_super_admin_in_product(product.name, request.user)
-            
-            # Si es SHARED, verificar/inicializar repositorio base del producto
-            if workspace_type == 'shared':
-                try:
-                    # Verificar si ya existe el repo
-                    if not product.github_repo_url:
-                        # Inicializar repo base del producto
-                        repo_result = initialize_product_repo(product.name)
-                        
-                        if repo_result.get('success'):
-                            # Actualizar producto con URL del repo
-                            product.github_repo_url = repo_result.get('repo_url', '')
-                            product.template_path = repo_result.get('path', '')
-                            product.save()
-                            
-                            # Actualizar tenant con info del repo
-                            tenant.git_repo_url = product.github_repo_url
-                            tenant.save()
-                            
-                            messages.success(request, f'Repositorio base inicializado: {product.github_repo_url}')
-                    else:
-                        # Repo ya existe, solo asignar
-                        tenant.git_repo_url = product.github_repo_url
-                        tenant.save()
-                except Exception as e:
-                    messages.warning(request, f'No se pudo inicializar repositorio: {str(e)}')
-            
-            # Si es dedicado, ejecutar deployment automático
-            if workspace_type == 'dedicated':
-                try:
-                    deploy_result = deploy_dedicated_workspace(
-                        product.name,
-                        subdomain,
-                        db_name,
-                        db_user,
-                        db_password
-                    )
-                    
-                    if deploy_result.get('success'):
-                        tenant.git_repo_url = deploy_result.get('repo_url', '')
-                        tenant.is_deployed = True
-                        tenant.save()
-                        messages.success(request, f'Workspace {company_name} desplegado exitosamente')
-                    else:
-                        messages.warning(request, f'Workspace creado pero deployment falló: {deploy_result.get("error")}')
-                except Exception as e:
-                    messages.warning(request, f'Workspace creado pero deployment falló: {str(e)}')
+            # Base de datos, super admin, repositorio y deployment se ejecutan en el worker
+            provisioning.enqueue_provisioning(tenant, request.user)
             
             ActivityLog.objects.create(
                 tenant=tenant,
@@ -207,7 +164,7 @@ def create_workspace(request):
                 ip_address=get_client_ip(request)
             )
             
-            messages.success(request, f'Workspace {company_name} creado exitosamente')
+            messages.success(request, f'Workspace {company_name} creado, aprovisionamiento en curso')
             return redirect('workspace_detail', tenant_id=tenant.id)
             
         except Exception as e:
@@ -275,6 +232,7 @@ def workspace_detail(request, tenant_id):
         tenant = get_object_or_404(Tenant, id=tenant_id)
         tenant_users = TenantUser.objects.filter(tenant=tenant).select_related('user')
         activity = ActivityLog.objects.filter(tenant=tenant).order_by('-created_at')[:20]
+        provisioning_job = tenant.provisioning_jobs.first()
         
         # Obtener usuarios del producto
         product_users = get_product_users(tenant.product.name, tenant.id)
@@ -284,6 +242,7 @@ def workspace_detail(request, tenant_id):
             'tenant_users': tenant_users,
             'activity': activity,
             'product_users': product_users,
+            'provisioning_job': provisioning_job,
         }
         return render(request, 'panel/workspace_detail.html', context)
     except Exception as e:
@@ -291,6 +250,19 @@ def workspace_detail(request, tenant_id):
         return redirect('workspaces')
 
 
+@login_required
+@user_passes_test(is_superuser)
+def provisioning_status(request, tenant_id):
+    """Estado del último job de aprovisionamiento (polling desde el detalle)"""
+    tenant = get_object_or_404(Tenant, id=tenant_id)
+    job = tenant.provisioning_jobs.first()
+    
+    if job is None:
+        return JsonResponse({'error': 'Sin jobs de aprovisionamiento'}, status=404)
+    
+    return JsonResponse(provisioning.serialize_job(job))
+
+
 @login_required
 @user_passes_test(is_superuser)
 def manage_workspace_users(request, tenant_id):
@@ -357,6 +329,14 @@ def workspace_action(request, tenant_id):
                 tenant.save()
                 messages.success(request, f'Workspace {tenant.company_name} marcado como inactivo')
                 
+            elif action == 'retry_provisioning':
+                job = tenant.provisioning_jobs.first()
+                if job and job.status == 'failed':
+                    provisioning.retry_job(job)
+                    messages.success(request, f'Aprovisionamiento de {tenant.company_name} reencolado')
+                else:
+                    messages.warning(request, 'No hay aprovisionamiento fallido para reintentar')
+                
             elif action == 'delete_permanent':
                 # Eliminar PERMANENTEMENTE
                 company_name = tenant.company_name
@@ -429,12 +409,14 @@ def clients(request):
 def deployments(request):
     """Lista de deployments"""
     try:
-        dedicated_tenants = Tenant.objects.filter(type='dedicated').select_related('product', 'owner')
+        # Estado de los stacks desde la tabla local (sincronizada por sync_portainer)
+        dedicated_tenants = Tenant.objects.filter(type='dedicated').select_related('product', 'owner').prefetch_related('portainer_stacks')
         shared_products = Product.objects.filter(is_active=True)
         
         context = {
             'dedicated_tenants': dedicated_tenants,
             'shared_products': shared_products,
+            'last_sync': portainer.last_sync(),
         }
         return render(request, 'panel/deployments.html', context)
     except Exception as e:
@@ -601,33 +583,10 @@ def ensure_super_admin_in_product(product_name, admin_user):
 # FUNCIONES AUXILIARES - BASE DE DATOS
 # ============================================
 
-def create_database(db_name, db_user, db_password):
-    """Crea una base de datos y usuario para el tenant"""
+def create_database(db_name, db_user, db_password, product=None):
+    """Crea una base de datos y usuario para el tenant (desde el pool pre-migrado si hay)"""
     try:
-        conn = psycopg2.connect(
-            host=settings.DATABASES['default']['HOST'],
-            port=settings.DATABASES['default']['PORT'],
-            user=settings.DATABASES['default']['USER'],
-            password=settings.DATABASES['default']['PASSWORD'],
-            database='postgres'
-        )
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(f"SELECT 1 FROM pg_roles WHERE rolname = '{db_user}'")
-            if not cursor.fetchone():
-                cursor.execute(f"CREATE USER {db_user} WITH PASSWORD '{db_password}'")
-            
-            cursor.execute(f"SELECT 1 FROM pg_database WHERE datname = '{db_name}'")
-            if not cursor.fetchone():
-                cursor.execute(f"CREATE DATABASE {db_name} OWNER {db_user}")
-            
-            cursor.execute(f"GRANT ALL PRIVILEGES ON DATABASE {db_name} TO {db_user}")
-            
-        finally:
-            cursor.close()
-            conn.close()
+        create_tenant_database(db_name, db_user, db_password, product)
     except Exception as e:
         raise Exception(f"Error al crear base de datos: {str(e)}")
 
@@ -635,34 +594,7 @@ def create_database(db_name, db_user, db_password):
 def delete_database(db_name, db_user):
     """Elimina una base de datos y usuario del tenant"""
     try:
-        conn = psycopg2.connect(
-            host=settings.DATABASES['default']['HOST'],
-            port=settings.DATABASES['default']['PORT'],
-            user=settings.DATABASES['default']['USER'],
-            password=settings.DATABASES['default']['PASSWORD'],
-            database='postgres'
-        )
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        cursor = conn.cursor()
-        
-        try:
-            # Terminar conexiones activas a la BD
-            cursor.execute(f"""
-                SELECT pg_terminate_backend(pg_stat_activity.pid)
-                FROM pg_stat_activity
-                WHERE pg_stat_activity.datname = '{db_name}'
-                AND pid <> pg_backend_pid()
-            """)
-            
-            # Eliminar BD
-            cursor.execute(f"DROP DATABASE IF EXISTS {db_name}")
-            
-            # Eliminar usuario
-            cursor.execute(f"DROP USER IF EXISTS {db_user}")
-            
-        finally:
-            cursor.close()
-            conn.close()
+        drop_tenant_database(db_name, db_user)
     except Exception as e:
         raise Exception(f"Error al eliminar base de datos: {str(e)}")
 
@@ -681,89 +613,18 @@ def get_client_ip(request):
 # FUNCIONES AUXILIARES - DEPLOYMENT
 # ============================================
 
-def deploy_dedicated_workspace(product_name, subdomain, db_name, db_user, db_password):
-    """Ejecuta el script de deployment automático para workspaces dedicados"""
-    try:
-        script_path = '/app/infra/scripts/deploy_dedicated_workspace.py'
-        
-        result = subprocess.run(
-            ['python3', script_path, product_name, subdomain, db_name, db_user, db_password],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutos timeout
-        )
-        
-        # Extraer JSON del output
-        output_lines = result.stdout.split('\n')
-        json_start = False
-        json_output = []
-        
-        for line in output_lines:
-            if '=== RESULT ===' in line:
-                json_start = True
-                continue
-            if json_start and line.strip():
-                json_output.append(line)
-        
-        if json_output:
-            return json.loads(''.join(json_output))
-        else:
-            return {
-                'success': False,
-                'error': 'No se pudo parsear el resultado del deployment'
-            }
-            
-    except subprocess.TimeoutExpired:
-        return {
-            'success': False,
-            'error': 'Deployment timeout (>5 min)'
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e)
-        }
-
-
-def initialize_product_repo(product_name):
-    """Inicializa repositorio base para productos SHARED"""
-    try:
-        script_path = '/app/infra/scripts/initialize_product_repo.py'
-        
-        result = subprocess.run(
-            ['python3', script_path, product_name],
-            capture_output=True,
-            text=True,
-            timeout=120  # 2 minutos timeout
-        )
-        
-        # Extraer JSON del output
-        output_lines = result.stdout.split('\n')
-        json_start = False
-        json_output = []
-        
-        for line in output_lines:
-            if '=== RESULT ===' in line:
-                json_start = True
-                continue
-            if json_start and line.strip():
-                json_output.append(line)
-        
-        if json_output:
-            return json.loads(''.join(json_output))
-        else:
-            return {
-                'success': False,
-                'error': 'No se pudo parsear el resultado'
-            }
-            
-    except subprocess.TimeoutExpired:
-        return {
-            'success': False,
-            'error': 'Timeout al inicializar repositorio'
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e)
-        }
+def deploy_dedicated_workspace(product_name, subdomain, db_name, db_user, db_password, build_context='', progress=None):
+    """Deployment automático de un workspace dedicado (en el proceso actual)"""
+    deployer = WorkspaceDeployer(
+        product_name, subdomain, db_name, db_user, db_password,
+        build_context=build_context,
+        log=logger.info,
+        progress=progress
+    )
+    return deployer.deploy().to_dict()
+
+
+def initialize_product_repo(product_name, progress=None):
+    """Inicializa repositorio base para productos SHARED (en el proceso actual)"""
+    initializer = ProductRepoInitializer(product_name, log=logger.info, progress=progress)
+    return initializer.initialize().to_dict()
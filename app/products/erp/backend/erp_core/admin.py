@@ -30,6 +30,23 @@ class VentaAdmin(admin.ModelAdmin):
     list_filter = ['tipo_comprobante', 'estado', 'fecha_venta']
     search_fields = ['numero_venta', 'numero_comprobante']
 
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'tipo_comprobante', 'estado', 'cantidad', 'total']
+    list_filter = ['tipo_comprobante', 'estado']
+    date_hierarchy = 'fecha'
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'producto', 'lote', 'cantidad', 'costo_promedio', 'valor']
+    list_select_related = ['producto', 'lote']
+    date_hierarchy = 'fecha'
+
+@admin.register(ArchivoMovimientos)
+class ArchivoMovimientosAdmin(admin.ModelAdmin):
+    list_display = ['antes_de', 'eliminadas', 'created_at']
+    readonly_fields = ['antes_de', 'particiones', 'eliminadas', 'created_at']
+
 admin.site.register(Lote)
 admin.site.register(Serie)
 admin.site.register(CatalogoProveedor)
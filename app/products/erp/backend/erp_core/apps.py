@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class ErpCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'erp_core'
     verbose_name = 'Sistema ERP'
+
+    def ready(self):
+        from .particiones import crear_particiones_pendientes
+        from .search import instalar_busqueda
+        post_migrate.connect(instalar_busqueda, sender=self)
+        post_migrate.connect(crear_particiones_pendientes, sender=self)
@@ -0,0 +1,201 @@
+"""
+Stock y valorización a una fecha con checkpoints (StockSnapshot)
+
+`tomar_snapshot(fecha)` guarda el stock al cierre del día por producto y por
+lote: el snapshot anterior más los movimientos desde entonces, así cada
+ejecución sólo lee los movimientos del periodo. Los productos y lotes sin
+historial no tienen fila (su stock es 0). El servicio `snapshots` del compose
+(snapshot_stock --loop) guarda el cierre de cada día.
+
+`stock_a_fecha(fecha)` parte del último snapshot hasta esa fecha y le aplica
+los movimientos posteriores: el costo depende de lo ocurrido desde el
+checkpoint, no del tamaño de la tabla de movimientos.
+
+La valorización es por promedio ponderado móvil, la misma del kardex
+(`aplicar`): cada entrada por compra recalcula el costo promedio con el valor
+del stock en ese momento y el resto de movimientos se valoriza al promedio
+vigente. Por eso los movimientos se recorren en orden y el snapshot guarda el
+valor del stock y el costo promedio, no acumulados históricos de compras.
+
+Después de archivar particiones de movimientos (ArchivoMovimientos) sólo se
+puede calcular desde el snapshot del cierre anterior al corte: las fechas
+previas lanzan HistorialArchivado en vez de devolver totales incompletos.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Max, OuterRef, Subquery, When
+
+from .exportar import CHUNK_SIZE
+from .models import ArchivoMovimientos, DetalleCompra, MovimientoInventario, StockSnapshot
+from .resumen import inicio_del_dia
+
+CAMPOS = ['cantidad', 'valor', 'costo_promedio']
+
+DECIMAL = DecimalField(max_digits=20, decimal_places=4)
+CUATRO_DECIMALES = Decimal('0.0001')
+
+
+class HistorialArchivado(Exception):
+    pass
+
+
+def inicio_historial():
+    """Primer día cuyos movimientos siguen en la tabla (None si no se archivó nada)"""
+    return ArchivoMovimientos.objects.aggregate(inicio=Max('antes_de'))['inicio']
+
+
+def verificar_cierre(fecha):
+    """El estado al cierre de `fecha` sólo es exacto desde el snapshot del día anterior al corte"""
+    inicio = inicio_historial()
+    if inicio and fecha < inicio - timedelta(days=1):
+        raise HistorialArchivado(
+            f'Los movimientos anteriores al {inicio} están archivados: '
+            f'no hay datos para el cierre del {fecha}'
+        )
+
+
+def movimientos_costeados(producto_id=None):
+    """Movimientos (de un producto o de todos) con la cantidad con signo y el costo unitario de las entradas por compra"""
+    costo = Subquery(
+        DetalleCompra.objects
+        .filter(compra=OuterRef('compra'), producto=OuterRef('producto'))
+        .values('precio_unitario')[:1]
+    )
+    movimientos = MovimientoInventario.objects.all()
+    if producto_id is not None:
+        movimientos = movimientos.filter(producto_id=producto_id)
+    return (
+        movimientos
+        .annotate(
+            cantidad_firmada=Case(
+                When(tipo_movimiento='SALIDA', then=-F('cantidad')),
+                default=F('cantidad'),
+                output_field=IntegerField(),
+            ),
+            # Sólo las entradas por compra mueven el costo promedio
+            costo_unitario=Case(
+                When(tipo_movimiento='ENTRADA', compra__isnull=False, then=costo),
+                output_field=DECIMAL,
+            ),
+        )
+    )
+
+
+def estado_vacio():
+    return [0, Decimal(0), None]
+
+
+def aplicar(estado, cantidad, costo=None):
+    """
+    Aplica un movimiento a [cantidad, valor, costo_promedio] (en el lugar).
+    Una entrada con `costo` recalcula el promedio: (valor + cantidad * costo) /
+    (stock + cantidad). Las salidas, ajustes y entradas sin compra se valorizan
+    al promedio vigente
+    """
+    saldo, valor, promedio = estado
+    if costo is not None and cantidad > 0:
+        if saldo > 0 and promedio is not None:
+            valor += costo * cantidad
+            promedio = (valor / (saldo + cantidad)).quantize(CUATRO_DECIMALES)
+        else:
+            # Sin stock valorizado (o en negativo) el costo de la compra es el nuevo promedio
+            promedio = Decimal(costo).quantize(CUATRO_DECIMALES)
+            valor = promedio * (saldo + cantidad)
+    elif promedio is not None:
+        valor += promedio * cantidad
+    saldo += cantidad
+    if saldo == 0:
+        # El redondeo del promedio no deja valor sin stock
+        valor = Decimal(0)
+    estado[:] = [saldo, valor, promedio]
+    return estado
+
+
+def ultimo_checkpoint(fecha, incluir_fecha=True):
+    filtro = {'fecha__lte' if incluir_fecha else 'fecha__lt': fecha}
+    return StockSnapshot.objects.filter(lote__isnull=True, **filtro).aggregate(ultimo=Max('fecha'))['ultimo']
+
+
+def stock_a_fecha(fecha, por_lote=False, productos=None):
+    """
+    Estado al cierre de `fecha`: {(producto_id[, lote_id]): [cantidad, valor, costo_promedio]}.
+    `productos` (queryset) limita el cálculo.
+    """
+    verificar_cierre(fecha)
+    return estado_desde(ultimo_checkpoint(fecha), fecha, por_lote, productos)
+
+
+def estado_desde(checkpoint, fecha, por_lote, productos=None):
+    """
+    Snapshot de `checkpoint` (o nada si es None) más los movimientos hasta el
+    cierre de `fecha`, aplicados en orden: {clave: [cantidad, valor, costo_promedio]}
+    """
+    estado = {}
+    if checkpoint:
+        snapshot = StockSnapshot.objects.filter(fecha=checkpoint, lote__isnull=not por_lote)
+        if productos is not None:
+            snapshot = snapshot.filter(producto__in=productos)
+        for producto_id, lote_id, cantidad, valor, promedio in snapshot.values_list('producto_id', 'lote_id', *CAMPOS).iterator():
+            clave = (producto_id, lote_id) if por_lote else (producto_id,)
+            estado[clave] = [cantidad, Decimal(valor), promedio]
+
+    movimientos = movimientos_costeados().filter(created_at__lt=inicio_del_dia(fecha, dias=1))
+    if checkpoint:
+        movimientos = movimientos.filter(created_at__gte=inicio_del_dia(checkpoint, dias=1))
+    if productos is not None:
+        movimientos = movimientos.filter(producto__in=productos)
+    if por_lote:
+        movimientos = movimientos.filter(lote__isnull=False)
+
+    filas = (
+        movimientos.order_by('created_at', 'id')
+        .values_list('producto_id', 'lote_id', 'cantidad_firmada', 'costo_unitario')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for producto_id, lote_id, cantidad, costo in filas:
+        clave = (producto_id, lote_id) if por_lote else (producto_id,)
+        if clave not in estado:
+            estado[clave] = estado_vacio()
+        aplicar(estado[clave], cantidad, costo)
+
+    return estado
+
+
+@transaction.atomic
+def tomar_snapshot(fecha):
+    """Guarda (o reemplaza) el snapshot de `fecha` a partir del anterior. Retorna las filas escritas"""
+    inicio = inicio_historial()
+    if inicio and fecha < inicio:
+        # Se recalcularía sin los movimientos archivados
+        raise HistorialArchivado(f'Los movimientos anteriores al {inicio} están archivados: no se rehace el snapshot del {fecha}')
+    previo = ultimo_checkpoint(fecha, incluir_fecha=False)
+    filas = []
+    for por_lote in (False, True):
+        for clave, (cantidad, valor, promedio) in estado_desde(previo, fecha, por_lote).items():
+            # Sin stock se guarda igual el promedio: valoriza las salidas en negativo
+            if not cantidad and promedio is None:
+                continue
+            filas.append(StockSnapshot(
+                fecha=fecha,
+                producto_id=clave[0],
+                lote_id=clave[1] if por_lote else None,
+                cantidad=cantidad,
+                valor=valor,
+                costo_promedio=promedio,
+            ))
+
+    StockSnapshot.objects.filter(fecha=fecha).delete()
+    StockSnapshot.objects.bulk_create(filas, batch_size=5000)
+    return len(filas)
+
+
+def podar_snapshots(hoy, conservar_dias):
+    """Borra los snapshots diarios más antiguos que `conservar_dias`; los de fin de mes se conservan"""
+    limite = hoy - timedelta(days=conservar_dias)
+    fechas = StockSnapshot.objects.filter(fecha__lt=limite).values_list('fecha', flat=True).distinct()
+    diarias = [fecha for fecha in fechas if (fecha + timedelta(days=1)).day != 1]
+    borradas, _ = StockSnapshot.objects.filter(fecha__in=diarias).delete()
+    return borradas
@@ -0,0 +1,193 @@
+"""
+Exportación en streaming a CSV y XLSX
+
+`ExportarMixin` agrega la acción `exportar` a un ViewSet: aplica los mismos
+filtros, búsqueda y ordenamiento que el listado, lee las columnas de
+`columnas_exportacion` con values_list (sin serializers) y recorre el queryset
+con .iterator(), que en Postgres usa un cursor del lado del servidor. Cada fila
+se escribe y se envía al cliente en cuanto llega, así la memoria no depende de
+la cantidad de filas exportadas.
+
+El XLSX se arma a mano (zip con hojas en XML y cadenas en línea) porque las
+librerías de Excel mantienen el libro en memoria o necesitan un archivo en
+disco; zipfile escribe sobre un destino sin seek y lo comprimido se retira
+después de cada fila.
+"""
+
+import csv
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+XLSX_ESTATICOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Datos" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Caracteres de control que XML 1.0 no admite
+NO_XML = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+class Eco:
+    """Archivo falso para csv.writer: retorna la línea en vez de guardarla"""
+    def write(self, value):
+        return value
+
+
+class Trozos:
+    """Archivo falso sin seek para zipfile: junta lo escrito hasta que se retira"""
+    def __init__(self):
+        self.trozos = []
+
+    def write(self, datos):
+        self.trozos.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self.trozos)
+        self.trozos = []
+        return datos
+
+
+def texto(valor):
+    """Valor de una celda como texto: fechas en hora local, vacío para None"""
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S')
+    return str(valor)
+
+
+def celda(valor):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if not isinstance(valor, (str, date)):
+        valor = str(valor)
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(texto(valor).translate(NO_XML))}</t></is></c>'
+
+
+def fila_xml(valores):
+    return '<row>' + ''.join(celda(valor) for valor in valores) + '</row>'
+
+
+def como_csv(encabezados, filas):
+    writer = csv.writer(Eco())
+    yield writer.writerow(encabezados)
+    for fila in filas:
+        yield writer.writerow([texto(valor) for valor in fila])
+
+
+def como_xlsx(encabezados, filas):
+    destino = Trozos()
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in XLSX_ESTATICOS.items():
+            libro.writestr(nombre, contenido)
+        yield destino.retirar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            hoja.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            hoja.write(fila_xml(encabezados).encode())
+            for fila in filas:
+                hoja.write(fila_xml(fila).encode())
+                datos = destino.retirar()
+                if datos:
+                    yield datos
+            hoja.write(b'</sheetData></worksheet>')
+    yield destino.retirar()
+
+
+FORMATOS = {
+    'csv': (como_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (como_xlsx, XLSX_CONTENT_TYPE),
+}
+
+
+def exportar_queryset(queryset, columnas, nombre, formato='csv'):
+    """StreamingHttpResponse con las `columnas` [(campo, encabezado)] del queryset"""
+    generar, content_type = FORMATOS[formato]
+    campos = [campo for campo, _ in columnas]
+    # values_list no admite prefetch_related; select_related tampoco hace falta
+    filas = (
+        queryset.prefetch_related(None).select_related(None)
+        .values_list(*campos).iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    response = StreamingHttpResponse(
+        generar([encabezado for _, encabezado in columnas], filas),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
+
+
+class ExportarMixin:
+    """Acción `exportar` (?formato=csv|xlsx) con los filtros del listado"""
+    columnas_exportacion = []
+    nombre_exportacion = None
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Exporta el listado filtrado en streaming: ?formato=csv|xlsx"""
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response(
+                {'error': f'Formato no soportado: {formato} (csv o xlsx)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        nombre = self.nombre_exportacion or queryset.model._meta.model_name
+        fecha = timezone.localdate().strftime('%Y%m%d')
+        return exportar_queryset(queryset, self.columnas_exportacion, f'{nombre}_{fecha}', formato)
@@ -0,0 +1,311 @@
+"""
+Importación masiva desde CSV (productos, clientes, catálogo de proveedores)
+
+El archivo se lee por lotes de LOTE filas. Cada lote se valida con los campos
+del modelo (tipos, choices, largos, emails) y resolviendo las referencias de
+todo el lote en una sola consulta; las filas con error quedan en el reporte
+(número de fila, campo y mensaje) y no se importan. Las válidas se cargan:
+
+- en Postgres con COPY a una tabla temporal y un
+  `INSERT ... SELECT ... ON CONFLICT (clave) DO UPDATE`, una sentencia por lote;
+- en otras bases (desarrollo) con bulk_create(update_conflicts=True).
+
+Las columnas presentes en el encabezado son las que se actualizan en los
+registros existentes; en los nuevos, las ausentes toman su default. El stock
+no se importa: sólo cambia con movimientos de inventario.
+
+Todo corre en una transacción: si la base rechaza un lote no queda nada a medias.
+"""
+
+import csv
+import io
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import CatalogoProveedor, Cliente, Producto, Proveedor
+
+LOTE = 5000
+MAX_ERRORES = 1000
+TEXTO = ('CharField', 'TextField', 'EmailField')
+
+IMPORTACIONES = {
+    'productos': {
+        'modelo': Producto,
+        'clave': ['codigo'],
+        'obligatorias': ['codigo', 'nombre', 'categoria', 'marca', 'precio_venta'],
+        'opcionales': ['tipo_control', 'stock_minimo', 'ubicacion', 'activo'],
+    },
+    'clientes': {
+        'modelo': Cliente,
+        'clave': ['numero_documento'],
+        'obligatorias': ['tipo_documento', 'numero_documento', 'nombre_completo', 'tipo_cliente'],
+        'opcionales': ['telefono', 'email', 'direccion', 'activo'],
+    },
+    'catalogo-proveedores': {
+        'modelo': CatalogoProveedor,
+        'clave': ['proveedor', 'codigo'],
+        'obligatorias': ['proveedor_ruc', 'codigo', 'nombre', 'marca', 'categoria'],
+        'opcionales': ['precio_referencial', 'activo'],
+        # columna del CSV: (campo, modelo referido, campo de búsqueda)
+        'referencias': {'proveedor_ruc': ('proveedor', Proveedor, 'ruc')},
+    },
+}
+
+BOOLEANOS = {
+    'si': True, 'sí': True, 's': True, 'x': True,
+    'no': False, 'n': False,
+}
+
+
+class ImportacionError(Exception):
+    pass
+
+
+class Importacion:
+    def __init__(self, tipo, fijos=None, max_errores=MAX_ERRORES):
+        """`fijos`: valores para columnas que no vienen en el archivo (ej. {'proveedor_ruc': ...})"""
+        if tipo not in IMPORTACIONES:
+            raise ImportacionError(f'Tipo de importación desconocido: {tipo}')
+        config = IMPORTACIONES[tipo]
+        self.modelo = config['modelo']
+        self.clave = config['clave']
+        self.obligatorias = config['obligatorias']
+        self.opcionales = config['opcionales']
+        self.referencias = config.get('referencias', {})
+        self.fijos = fijos or {}
+        self.max_errores = max_errores
+
+        self.tabla = self.modelo._meta.db_table
+        self.campos = {f.name: f for f in self.modelo._meta.concrete_fields if not f.primary_key}
+        self.vistos = {}
+        self.resultado = {'procesadas': 0, 'creadas': 0, 'actualizadas': 0, 'con_error': 0, 'errores': []}
+
+    # --- Encabezado ---
+
+    def preparar(self, encabezado):
+        encabezado = [col.strip().lower() for col in encabezado or []]
+        permitidas = set(self.obligatorias) | set(self.opcionales)
+        desconocidas = [col for col in encabezado if col and col not in permitidas]
+        faltantes = [col for col in self.obligatorias if col not in encabezado and col not in self.fijos]
+        if desconocidas:
+            raise ImportacionError(f"Columnas desconocidas: {', '.join(desconocidas)}")
+        if faltantes:
+            raise ImportacionError(f"Faltan columnas: {', '.join(faltantes)}")
+
+        self.encabezado = encabezado
+        columnas = [col for col in encabezado if col] + [col for col in self.fijos if col not in encabezado]
+        # Columnas del CSV -> campos del modelo
+        self.columnas = columnas
+        self.importados = [self.referencias[col][0] if col in self.referencias else col for col in columnas]
+
+        ahora = timezone.now()
+        self.automaticos = {}
+        for nombre, campo in self.campos.items():
+            if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False):
+                self.automaticos[nombre] = ahora
+        # Orden de las columnas al insertar: las importadas, luego defaults y fechas automáticas
+        self.insertados = self.importados + [
+            nombre for nombre in self.campos if nombre not in self.importados
+        ]
+        self.actualizados = [
+            nombre for nombre in self.importados if nombre not in self.clave
+        ] + [nombre for nombre, campo in self.campos.items() if getattr(campo, 'auto_now', False)]
+
+    # --- Validación ---
+
+    def error(self, fila, campo, mensaje):
+        if self.max_errores is None or len(self.resultado['errores']) < self.max_errores:
+            self.resultado['errores'].append({'fila': fila, 'campo': campo, 'error': mensaje})
+
+    def convertir(self, campo, valor):
+        valor = valor.strip()
+        if valor == '':
+            # Celda vacía: el default del campo, o NULL si no es de texto
+            if campo.has_default():
+                valor = campo.get_default()
+            elif campo.get_internal_type() not in TEXTO:
+                valor = None
+        elif campo.get_internal_type() == 'BooleanField':
+            valor = BOOLEANOS.get(valor.lower(), valor)
+        return campo.clean(valor, None)
+
+    def validar(self, filas):
+        """Filas del lote [(número, {columna: texto})] -> valores {campo: valor} de las válidas"""
+        referidos = {}
+        for col, (_, modelo, buscar) in self.referencias.items():
+            claves = {(fila.get(col) or self.fijos.get(col) or '').strip() for _, fila in filas}
+            referidos[col] = dict(
+                modelo.objects.filter(**{f'{buscar}__in': claves}).values_list(buscar, 'pk')
+            )
+
+        validas = []
+        for numero, fila in filas:
+            valores, errores = {}, []
+            for col in self.columnas:
+                crudo = fila.get(col)
+                if crudo is None or col not in self.encabezado:
+                    crudo = self.fijos.get(col, '')
+                if col in self.referencias:
+                    campo, modelo, buscar = self.referencias[col]
+                    pk = referidos[col].get(crudo.strip())
+                    if pk is None:
+                        errores.append((col, f'No existe {modelo._meta.verbose_name} con {buscar} "{crudo.strip()}"'))
+                    valores[campo] = pk
+                    continue
+                try:
+                    valores[col] = self.convertir(self.campos[col], crudo)
+                except ValidationError as e:
+                    errores.append((col, ' '.join(e.messages)))
+
+            if not errores:
+                clave = tuple(valores[campo] for campo in self.clave)
+                if clave in self.vistos:
+                    errores.append((self.clave[-1], f'Repetido: ya aparece en la fila {self.vistos[clave]}'))
+                else:
+                    self.vistos[clave] = numero
+
+            if errores:
+                self.resultado['con_error'] += 1
+                for col, mensaje in errores:
+                    self.error(numero, col, mensaje)
+            else:
+                validas.append(valores)
+        return validas
+
+    # --- Carga ---
+
+    def completar(self, valores):
+        """Fila con todas las columnas a insertar, en el orden de self.insertados"""
+        fila = []
+        for nombre in self.insertados:
+            if nombre in valores:
+                fila.append(valores[nombre])
+            elif nombre in self.automaticos:
+                fila.append(self.automaticos[nombre])
+            else:
+                fila.append(self.campos[nombre].get_default())
+        return fila
+
+    def cargar_copy(self, cursor, validas):
+        columnas = [self.campos[nombre].column for nombre in self.insertados]
+        textos = ', '.join(
+            f'"{self.campos[nombre].column}"' for nombre in self.insertados
+            if not self.campos[nombre].null and self.campos[nombre].get_internal_type() in TEXTO
+        )
+        lista = ', '.join(f'"{col}"' for col in columnas)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for valores in validas:
+            writer.writerow(['' if v is None else v for v in self.completar(valores)])
+        buffer.seek(0)
+
+        cursor.execute(f'TRUNCATE "{self.staging}"')
+        # En CSV el vacío sin comillas es NULL; en las columnas de texto es cadena vacía
+        opciones = f'FORMAT csv, FORCE_NOT_NULL ({textos})' if textos else 'FORMAT csv'
+        cursor.copy_expert(f'COPY "{self.staging}" ({lista}) FROM STDIN WITH ({opciones})', buffer)
+
+        conflicto = ', '.join(f'"{self.campos[nombre].column}"' for nombre in self.clave)
+        actualizar = ', '.join(
+            f'"{self.campos[nombre].column}" = EXCLUDED."{self.campos[nombre].column}"'
+            for nombre in self.actualizados
+        )
+        accion = f'DO UPDATE SET {actualizar}' if actualizar else 'DO NOTHING'
+        cursor.execute(
+            f'WITH cargadas AS ('
+            f'INSERT INTO "{self.tabla}" ({lista}) SELECT {lista} FROM "{self.staging}" '
+            f'ON CONFLICT ({conflicto}) {accion} RETURNING (xmax = 0) AS nueva'
+            f') SELECT count(*) FILTER (WHERE nueva), count(*) FILTER (WHERE NOT nueva) FROM cargadas'
+        )
+        creadas, actualizadas = cursor.fetchone()
+        self.resultado['creadas'] += creadas
+        self.resultado['actualizadas'] += actualizadas
+
+    def cargar_orm(self, validas):
+        claves = [tuple(valores[campo] for campo in self.clave) for valores in validas]
+        filtro = {f'{self.clave[0]}__in': {clave[0] for clave in claves}}
+        existentes = set(self.modelo.objects.filter(**filtro).values_list(*self.clave))
+        atributos = [self.campos[nombre].attname for nombre in self.insertados]
+        conflictos = (
+            {'update_conflicts': True, 'unique_fields': self.clave, 'update_fields': self.actualizados}
+            if self.actualizados else {'ignore_conflicts': True}
+        )
+        self.modelo.objects.bulk_create(
+            [self.modelo(**dict(zip(atributos, self.completar(valores)))) for valores in validas],
+            **conflictos,
+        )
+        nuevas = sum(1 for clave in claves if clave not in existentes)
+        self.resultado['creadas'] += nuevas
+        self.resultado['actualizadas'] += len(validas) - nuevas
+
+    # --- Ejecución ---
+
+    def ejecutar(self, archivo, solo_validar=False):
+        """Importa el CSV (texto) de `archivo`. Retorna el resultado con el reporte de errores"""
+        lector = csv.DictReader(archivo)
+        try:
+            self.preparar(lector.fieldnames)
+            lector.fieldnames = self.encabezado
+            with transaction.atomic(), connection.cursor() as cursor:
+                postgres = connection.vendor == 'postgresql' and not solo_validar
+                if postgres:
+                    self.staging = f'importar_{self.tabla}'
+                    columnas = ', '.join(f'"{self.campos[nombre].column}"' for nombre in self.insertados)
+                    cursor.execute(
+                        f'CREATE TEMP TABLE "{self.staging}" ON COMMIT DROP AS '
+                        f'SELECT {columnas} FROM "{self.tabla}" WITH NO DATA'
+                    )
+
+                filas = ((lector.line_num, fila) for fila in lector)
+                while lote := list(islice(filas, LOTE)):
+                    self.resultado['procesadas'] += len(lote)
+                    validas = self.validar(lote)
+                    if not validas or solo_validar:
+                        continue
+                    if postgres:
+                        self.cargar_copy(cursor, validas)
+                    else:
+                        self.cargar_orm(validas)
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ImportacionError(f'CSV inválido: {e}')
+        except DatabaseError as e:
+            raise ImportacionError(f'La base rechazó la importación: {e}')
+        return self.resultado
+
+
+def importar(tipo, archivo, solo_validar=False, fijos=None, max_errores=MAX_ERRORES):
+    return Importacion(tipo, fijos, max_errores).ejecutar(archivo, solo_validar)
+
+
+class ImportarMixin:
+    """Acción `importar`: POST multipart con `archivo` (CSV UTF-8); ?validar=1 sólo valida"""
+    tipo_importacion = None
+
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        """Importación masiva desde CSV con reporte de errores por fila"""
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': 'Falta el archivo CSV (campo "archivo")'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fijos = {
+            col: request.data[col]
+            for col in IMPORTACIONES[self.tipo_importacion].get('referencias', {})
+            if request.data.get(col)
+        }
+        try:
+            resultado = importar(
+                self.tipo_importacion,
+                io.TextIOWrapper(archivo, encoding='utf-8-sig', newline=''),
+                solo_validar=request.query_params.get('validar') in ('1', 'true'),
+                fijos=fijos,
+            )
+        except ImportacionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
@@ -0,0 +1,168 @@
+"""
+Operaciones de inventario de ventas y compras
+
+Cada operación corre en una sola transacción: bloquea el documento y luego los
+productos en orden de id (todas las terminales toman los bloqueos en el mismo
+orden, así no hay deadlocks), actualiza el stock con expresiones F() y crea los
+movimientos con bulk_create. El número de consultas no depende de la cantidad
+de líneas del documento.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Cliente, Compra, MovimientoInventario, Producto, Proveedor, Serie, Venta
+from .resumen import registrar_venta
+
+
+class OperacionInvalida(Exception):
+    pass
+
+
+def bloquear_productos(producto_ids):
+    """SELECT ... FOR UPDATE de los productos, siempre en orden de id"""
+    list(
+        Producto.objects
+        .select_for_update()
+        .filter(id__in=producto_ids)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+def ajustar_stock(cantidades):
+    """Suma a cada producto su cantidad (negativa para salidas) en un solo UPDATE"""
+    if not cantidades:
+        return
+    Producto.objects.filter(id__in=cantidades).update(
+        stock_actual=F('stock_actual') + Case(
+            *[When(id=producto_id, then=Value(cantidad)) for producto_id, cantidad in cantidades.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+@transaction.atomic
+def confirmar_venta(venta_id, user):
+    venta = Venta.objects.select_for_update().get(pk=venta_id)
+    if venta.estado != 'PENDIENTE':
+        raise OperacionInvalida('Solo se pueden confirmar ventas pendientes')
+
+    detalles = list(venta.detalles.values('producto_id', 'cantidad', 'lote_id', 'serie_id'))
+
+    cantidades = defaultdict(int)
+    for detalle in detalles:
+        cantidades[detalle['producto_id']] -= detalle['cantidad']
+
+    bloquear_productos(cantidades)
+    ajustar_stock(cantidades)
+
+    series = [d['serie_id'] for d in detalles if d['serie_id']]
+    if series:
+        Serie.objects.filter(id__in=series).update(estado='VENDIDO', fecha_venta=venta.fecha_venta)
+
+    MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(
+            producto_id=detalle['producto_id'],
+            tipo_movimiento='SALIDA',
+            cantidad=detalle['cantidad'],
+            motivo=f'Venta {venta.numero_venta}',
+            venta=venta,
+            lote_id=detalle['lote_id'],
+            serie_id=detalle['serie_id'],
+            created_by=user,
+        )
+        for detalle in detalles
+    ])
+
+    venta.estado = 'PAGADA'
+    venta.save(update_fields=['estado', 'updated_at'])
+
+    Cliente.objects.filter(pk=venta.cliente_id).update(total_comprado=F('total_comprado') + venta.total)
+    registrar_venta(venta, 'PAGADA')
+    return venta
+
+
+@transaction.atomic
+def anular_venta(venta_id, user):
+    """Anula la venta; si estaba pagada devuelve el stock y las series"""
+    venta = Venta.objects.select_for_update().get(pk=venta_id)
+    if venta.estado == 'ANULADA':
+        raise OperacionInvalida('La venta ya está anulada')
+
+    if venta.estado == 'PAGADA':
+        detalles = list(venta.detalles.values('producto_id', 'cantidad', 'lote_id', 'serie_id'))
+
+        cantidades = defaultdict(int)
+        for detalle in detalles:
+            cantidades[detalle['producto_id']] += detalle['cantidad']
+
+        bloquear_productos(cantidades)
+        ajustar_stock(cantidades)
+
+        series = [d['serie_id'] for d in detalles if d['serie_id']]
+        if series:
+            Serie.objects.filter(id__in=series).update(estado='DISPONIBLE', fecha_venta=None)
+
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(
+                producto_id=detalle['producto_id'],
+                tipo_movimiento='ENTRADA',
+                cantidad=detalle['cantidad'],
+                motivo=f'Anulación venta {venta.numero_venta}',
+                venta=venta,
+                lote_id=detalle['lote_id'],
+                serie_id=detalle['serie_id'],
+                created_by=user,
+            )
+            for detalle in detalles
+        ])
+
+        Cliente.objects.filter(pk=venta.cliente_id).update(total_comprado=F('total_comprado') - venta.total)
+        registrar_venta(venta, 'PAGADA', signo=-1)
+
+    venta.estado = 'ANULADA'
+    venta.save(update_fields=['estado', 'updated_at'])
+    registrar_venta(venta, 'ANULADA')
+    return venta
+
+
+@transaction.atomic
+def recibir_compra(compra_id, user):
+    compra = Compra.objects.select_for_update().get(pk=compra_id)
+    if compra.estado != 'PENDIENTE':
+        raise OperacionInvalida('Solo se pueden recibir compras pendientes')
+
+    detalles = list(compra.detalles.values('producto_id', 'cantidad', 'lote_id'))
+
+    cantidades = defaultdict(int)
+    for detalle in detalles:
+        cantidades[detalle['producto_id']] += detalle['cantidad']
+
+    bloquear_productos(cantidades)
+    ajustar_stock(cantidades)
+
+    MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(
+            producto_id=detalle['producto_id'],
+            tipo_movimiento='ENTRADA',
+            cantidad=detalle['cantidad'],
+            motivo=f'Compra {compra.numero_compra}',
+            compra=compra,
+            lote_id=detalle['lote_id'],
+            created_by=user,
+        )
+        for detalle in detalles
+    ])
+
+    compra.estado = 'RECIBIDA'
+    compra.fecha_recepcion = timezone.now()
+    compra.save(update_fields=['estado', 'fecha_recepcion', 'updated_at'])
+
+    Proveedor.objects.filter(pk=compra.proveedor_id).update(total_comprado=F('total_comprado') + compra.total)
+    return compra
@@ -0,0 +1,104 @@
+"""
+Kardex de un producto: movimientos con saldo y costo promedio ponderado móvil
+
+Se parte del estado al cierre del día anterior a `desde` (último
+StockSnapshot más los movimientos posteriores, ver existencias.py) y cada
+movimiento se aplica en orden con `aplicar`: las entradas por compra
+recalculan el promedio con el valor del stock en ese momento y las salidas se
+valorizan al promedio vigente. Sin `desde`, y si hay movimientos archivados,
+empieza en el corte de archivo. Las filas se leen con .iterator(), que en
+Postgres usa un cursor del lado del servidor, y se emiten como JSON o CSV a
+medida que llegan: el tamaño del historial no pasa por la memoria.
+"""
+
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .exportar import CHUNK_SIZE, Eco
+from .existencias import aplicar, estado_desde, estado_vacio, inicio_historial, movimientos_costeados, ultimo_checkpoint, verificar_cierre
+from .models import Producto
+from .resumen import inicio_del_dia
+
+COLUMNAS = [
+    'fecha', 'tipo_movimiento', 'cantidad', 'motivo', 'documento', 'lote',
+    'costo_unitario', 'saldo', 'costo_promedio', 'valor_saldo',
+]
+
+class Kardex:
+    def __init__(self, producto, desde=None, hasta=None):
+        """Lanza HistorialArchivado si `desde` es anterior al corte de archivo"""
+        if desde:
+            verificar_cierre(desde - timedelta(days=1))
+        self.producto = producto
+        self.desde = desde or inicio_historial()
+        self.hasta = hasta
+
+    def saldo_inicial(self):
+        """[saldo, valor, costo_promedio] al cierre del día anterior a `desde`: último snapshot más los movimientos posteriores"""
+        if not self.desde:
+            return estado_vacio()
+        cierre = self.desde - timedelta(days=1)
+        estado = estado_desde(
+            ultimo_checkpoint(cierre), cierre, por_lote=False,
+            productos=Producto.objects.filter(pk=self.producto.pk),
+        )
+        return estado.get((self.producto.pk,), estado_vacio())
+
+    def filas(self, inicial):
+        movimientos = movimientos_costeados(self.producto.pk)
+        if self.desde:
+            movimientos = movimientos.filter(created_at__gte=inicio_del_dia(self.desde))
+        if self.hasta:
+            movimientos = movimientos.filter(created_at__lt=inicio_del_dia(self.hasta, dias=1))
+
+        filas = movimientos.order_by('created_at', 'id').values_list(
+            'created_at', 'tipo_movimiento', 'cantidad_firmada', 'motivo',
+            'venta__numero_venta', 'compra__numero_compra', 'lote__numero_lote', 'costo_unitario',
+        )
+
+        estado = list(inicial)
+        for fecha, tipo, cantidad, motivo, venta, compra, lote, costo in filas.iterator(chunk_size=CHUNK_SIZE):
+            saldo, valor, promedio = aplicar(estado, cantidad, costo)
+            yield {
+                'fecha': timezone.localtime(fecha),
+                'tipo_movimiento': tipo,
+                'cantidad': cantidad,
+                'motivo': motivo,
+                'documento': venta or compra or '',
+                'lote': lote or '',
+                'costo_unitario': costo,
+                'saldo': saldo,
+                'costo_promedio': promedio,
+                'valor_saldo': valor.quantize(Decimal('0.01')) if promedio is not None else None,
+            }
+
+    def encabezado(self, inicial):
+        return {
+            'producto': {'id': self.producto.pk, 'codigo': self.producto.codigo, 'nombre': self.producto.nombre},
+            'desde': self.desde,
+            'hasta': self.hasta,
+            'saldo_inicial': inicial[0],
+            'costo_promedio_inicial': inicial[2],
+        }
+
+    def como_json(self):
+        """Documento JSON en trozos: encabezado, luego los movimientos uno por uno"""
+        inicial = self.saldo_inicial()
+        encabezado = json.dumps(self.encabezado(inicial), cls=DjangoJSONEncoder)
+        yield encabezado[:-1] + ', "movimientos": ['
+        for i, fila in enumerate(self.filas(inicial)):
+            yield (',' if i else '') + json.dumps(fila, cls=DjangoJSONEncoder)
+        yield ']}'
+
+    def como_csv(self):
+        inicial = self.saldo_inicial()
+        buffer = Eco()
+        writer = csv.DictWriter(buffer, fieldnames=COLUMNAS)
+        yield writer.writeheader()
+        for fila in self.filas(inicial):
+            yield writer.writerow(fila)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from erp_core.resumen import recalcular_ventas_diarias
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen VentaDiaria desde las ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial AAAA-MM-DD (por defecto todo el historial)')
+        parser.add_argument('--hasta', help='Fecha final AAAA-MM-DD, inclusive')
+
+    def handle(self, *args, **options):
+        fechas = {}
+        for opcion in ('desde', 'hasta'):
+            if options[opcion]:
+                fechas[opcion] = parse_date(options[opcion])
+                if fechas[opcion] is None:
+                    raise CommandError(f'Fecha inválida en --{opcion}: {options[opcion]}')
+
+        filas = recalcular_ventas_diarias(**fechas)
+        self.stdout.write(self.style.SUCCESS(f'✓ {filas} filas de resumen'))
@@ -0,0 +1,47 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from erp_core.importar import IMPORTACIONES, ImportacionError, importar
+
+
+class Command(BaseCommand):
+    help = 'Importa productos, clientes o catálogo de proveedores desde un CSV (UTF-8)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=list(IMPORTACIONES))
+        parser.add_argument('archivo', help='Ruta del CSV')
+        parser.add_argument('--proveedor-ruc', help='RUC del proveedor si el CSV no trae la columna proveedor_ruc')
+        parser.add_argument('--validar', action='store_true', help='Sólo valida, no guarda nada')
+        parser.add_argument('--reporte', help='Escribe todos los errores en este CSV')
+
+    def handle(self, *args, **options):
+        fijos = {'proveedor_ruc': options['proveedor_ruc']} if options['proveedor_ruc'] else None
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                resultado = importar(
+                    options['tipo'], archivo,
+                    solo_validar=options['validar'], fijos=fijos, max_errores=None,
+                )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+        except ImportacionError as e:
+            raise CommandError(str(e))
+
+        errores = resultado['errores']
+        if options['reporte']:
+            with open(options['reporte'], 'w', encoding='utf-8', newline='') as reporte:
+                writer = csv.DictWriter(reporte, fieldnames=['fila', 'campo', 'error'])
+                writer.writeheader()
+                writer.writerows(errores)
+        else:
+            for error in errores[:20]:
+                self.stdout.write(self.style.WARNING(f"Fila {error['fila']} ({error['campo']}): {error['error']}"))
+            if len(errores) > 20:
+                self.stdout.write(f'... {len(errores) - 20} errores más (usar --reporte)')
+
+        accion = 'validadas' if options['validar'] else 'procesadas'
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {resultado['procesadas']} filas {accion}: {resultado['creadas']} creadas, "
+            f"{resultado['actualizadas']} actualizadas, {resultado['con_error']} con error"
+        ))
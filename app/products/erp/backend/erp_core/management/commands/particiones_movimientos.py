@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+from django.utils.dateparse import parse_date
+
+from erp_core.particiones import MESES_ADELANTE, ParticionError, archivar, asegurar_particiones, convertir
+
+
+class Command(BaseCommand):
+    help = 'Particiones mensuales de MovimientoInventario: crea las próximas, convierte la tabla o archiva meses viejos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convertir', action='store_true', help='Convierte la tabla actual a particionada (una sola vez)')
+        parser.add_argument('--meses', type=int, default=MESES_ADELANTE, help='Meses a crear por adelantado')
+        parser.add_argument('--archivar-antes', metavar='AAAA-MM', help='Desengancha las particiones anteriores a ese mes')
+        parser.add_argument('--eliminar', action='store_true', help='Con --archivar-antes, borra en vez de mover al esquema archivo')
+        parser.add_argument('--loop', action='store_true', help='Crea las próximas particiones cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=int, default=3600)
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            return self.loop(options['meses'], options['intervalo'])
+
+        try:
+            if options['convertir']:
+                meses = convertir(options['meses'])
+                self.stdout.write(self.style.SUCCESS(f'✓ Tabla particionada: {len(meses)} meses'))
+            else:
+                creadas = asegurar_particiones(options['meses'])
+                self.stdout.write(self.style.SUCCESS(f"✓ {len(creadas)} particiones nuevas {' '.join(creadas)}".rstrip()))
+
+            if options['archivar_antes']:
+                antes_de = parse_date(f"{options['archivar_antes']}-01")
+                if antes_de is None:
+                    raise CommandError(f"Mes inválido: {options['archivar_antes']}")
+                archivadas = archivar(antes_de, eliminar=options['eliminar'])
+                accion = 'borradas' if options['eliminar'] else 'archivadas'
+                self.stdout.write(self.style.SUCCESS(f'✓ {len(archivadas)} particiones {accion}'))
+        except ParticionError as e:
+            raise CommandError(str(e))
+
+    def loop(self, meses, intervalo):
+        """Servicio `particiones` del compose: sin él los meses nuevos sólo se crean en un migrate"""
+        while True:
+            close_old_connections()
+            try:
+                creadas = asegurar_particiones(meses)
+                if creadas:
+                    self.stdout.write(self.style.SUCCESS(f"✓ {len(creadas)} particiones nuevas {' '.join(creadas)}"))
+            except (ParticionError, DatabaseError) as e:
+                # Base aún sin migrar o caída: se reintenta en la próxima vuelta
+                self.stdout.write(self.style.ERROR(f'✗ {e}'))
+            time.sleep(intervalo)
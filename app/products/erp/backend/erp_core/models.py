@@ -190,6 +190,10 @@ class Compra(models.Model):
     class Meta:
         ordering = ['-fecha_compra']
         verbose_name_plural = 'Compras'
+        indexes = [
+            # Paginación por cursor (ver pagination.py)
+            models.Index(fields=['fecha_compra', 'id'], name='compra_fecha_id_idx'),
+        ]
     
     def __str__(self):
         return f"Compra {self.numero_compra} - {self.proveedor.razon_social}"
@@ -243,6 +247,10 @@ class Venta(models.Model):
     class Meta:
         ordering = ['-fecha_venta']
         verbose_name_plural = 'Ventas'
+        indexes = [
+            # Paginación por cursor (ver pagination.py)
+            models.Index(fields=['fecha_venta', 'id'], name='venta_fecha_id_idx'),
+        ]
     
     def __str__(self):
         return f"Venta {self.numero_venta} - {self.cliente.nombre_completo}"
@@ -262,6 +270,28 @@ class DetalleVenta(models.Model):
         return f"{self.producto.nombre} x{self.cantidad}"
 
 
+class VentaDiaria(models.Model):
+    """Totales de ventas confirmadas y anuladas por día (ver resumen.py)"""
+    fecha = models.DateField()
+    tipo_comprobante = models.CharField(max_length=20, choices=Venta.TIPO_COMPROBANTE_CHOICES)
+    estado = models.CharField(max_length=20, choices=Venta.ESTADO_CHOICES)
+    cantidad = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    descuento = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    igv = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name_plural = 'Ventas Diarias'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'tipo_comprobante', 'estado'], name='venta_diaria_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.tipo_comprobante} {self.estado}: {self.total}"
+
+
 # ============================================
 # MOVIMIENTOS DE INVENTARIO
 # ============================================
@@ -287,6 +317,59 @@ class MovimientoInventario(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Movimientos de Inventario'
+        indexes = [
+            # Paginación por cursor, general y filtrada por producto (ver pagination.py)
+            models.Index(fields=['created_at', 'id'], name='movimiento_created_id_idx'),
+            models.Index(fields=['producto', 'created_at', 'id'], name='movimiento_prod_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tipo_movimiento} - {self.producto.codigo} - {self.cantidad}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Stock al cierre de `fecha` por producto (lote vacío) y por lote, según los
+    movimientos. Lo escribe el comando snapshot_stock (ver existencias.py)
+    """
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='snapshots')
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, null=True, blank=True, related_name='snapshots')
+    cantidad = models.IntegerField()
+    # Valor del stock y costo promedio ponderado móvil al cierre (null: sin compras costeadas)
+    valor = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+    costo_promedio = models.DecimalField(max_digits=20, decimal_places=4, null=True, blank=True)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name_plural = 'Snapshots de Stock'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'producto'], condition=models.Q(lote__isnull=True), name='snapshot_producto_unico',
+            ),
+            models.UniqueConstraint(
+                fields=['fecha', 'lote'], condition=models.Q(lote__isnull=False), name='snapshot_lote_unico',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.producto_id} {self.cantidad}"
+
+
+class ArchivoMovimientos(models.Model):
+    """
+    Corte de archivo de MovimientoInventario (particiones.archivar): los
+    movimientos anteriores a `antes_de` ya no están en la tabla. El stock a
+    fecha y el kardex parten del snapshot del día anterior al corte
+    """
+    antes_de = models.DateField()
+    particiones = models.TextField()
+    eliminadas = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-antes_de']
+        verbose_name_plural = 'Archivos de Movimientos'
+
+    def __str__(self):
+        return f"Movimientos antes de {self.antes_de}"
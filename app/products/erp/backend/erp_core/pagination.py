@@ -0,0 +1,144 @@
+"""
+Paginación por cursor (keyset) para tablas grandes
+
+Ordena por (campo, id) descendente y cada página filtra con
+`campo < valor OR (campo = valor AND id < id_cursor)` sobre el índice
+compuesto, sin COUNT(*) ni OFFSET: la página 1000 cuesta lo mismo que la
+primera. El total es opcional:
+`?count=estimate` lo toma de las estadísticas del planner y `?count=exact`
+hace el COUNT.
+
+Con `?page=` u `?ordering=` se usa la paginación por número de página de
+siempre, para los clientes que la necesitan.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimated_count(queryset):
+    """Filas estimadas por el planner de Postgres para el queryset (sin recorrer la tabla)"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(raw.encode()).decode())
+            return data['v'], int(data['id']), bool(data.get('r'))
+        except (ValueError, KeyError, TypeError):
+            raise NotFound('Cursor inválido')
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.field.attname)
+        value = value.isoformat() if hasattr(value, 'isoformat') else value
+        raw = json.dumps({'v': value, 'id': obj.pk, 'r': reverse}, default=str)
+        token = base64.urlsafe_b64encode(raw.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def use_page_numbers(self, request):
+        return 'page' in request.query_params or 'ordering' in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if self.use_page_numbers(request):
+            self.fallback = PageNumberPagination()
+            self.fallback.page_size_query_param = self.page_size_query_param
+            self.fallback.max_page_size = self.max_page_size
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        model = queryset.model
+        self.field = model._meta.get_field(getattr(view, 'keyset_field', 'created_at'))
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        self.count = None
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'estimate':
+            self.count = estimated_count(queryset)
+        elif count_mode == 'exact':
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+        name = self.field.name
+
+        if reverse:
+            queryset = queryset.order_by(name, 'pk')
+        else:
+            queryset = queryset.order_by(f'-{name}', '-pk')
+
+        if cursor:
+            value, pk, _ = cursor
+            value = self.field.to_python(value)
+            lookup = 'gt' if reverse else 'lt'
+            # Con el mismo valor del campo desempata el id
+            queryset = queryset.filter(
+                Q(**{f'{name}__{lookup}': value}) | Q(**{name: value, f'pk__{lookup}': pk})
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # En reversa (botón "anterior"), has_more indica que hay páginas anteriores
+        has_next = has_more if not reverse else True
+        has_previous = bool(cursor) if not reverse else has_more
+
+        self.next_link = self.previous_link = None
+        if rows and has_next:
+            self.next_link = self.encode_cursor(rows[-1], False)
+        if rows and has_previous:
+            self.previous_link = self.encode_cursor(rows[0], True)
+
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+
+        response = {
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        }
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
@@ -0,0 +1,233 @@
+"""
+Particionado mensual de MovimientoInventario (Postgres)
+
+`convertir()` pasa la tabla existente a una tabla particionada por rango de
+created_at, en una sola transacción:
+- una partición por mes, más una DEFAULT de respaldo para que ningún INSERT
+  falle si falta el mes;
+- PK (id, created_at), porque Postgres exige la clave de partición en la PK
+  (para Django `id` sigue siendo la clave primaria);
+- un índice BRIN sobre created_at para los recorridos por rango de fechas
+  (snapshots, kardex). Los índices btree de Meta se recrean tal cual: el de
+  (created_at, id) sigue haciendo falta para ordenar la paginación por cursor.
+
+`asegurar_particiones()` crea las particiones del mes actual y los siguientes;
+corre en cada migrate, con el comando particiones_movimientos y cada hora en el
+servicio `particiones` del compose (particiones_movimientos --loop). `archivar()`
+desengancha las particiones viejas y las mueve al esquema `archivo` (o las
+borra), siempre que exista el snapshot de stock del cierre del último mes
+archivado, y registra el corte en ArchivoMovimientos: desde entonces el stock a
+fecha y el kardex parten de ese snapshot y rechazan fechas anteriores.
+"""
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import ArchivoMovimientos, MovimientoInventario, StockSnapshot
+
+TABLA = MovimientoInventario._meta.db_table
+DEFAULT = f'{TABLA}_default'
+ESQUEMA_ARCHIVO = 'archivo'
+MESES_ADELANTE = 3
+
+
+class ParticionError(Exception):
+    pass
+
+
+def inicio_mes(fecha):
+    return date(fecha.year, fecha.month, 1)
+
+
+def mes_siguiente(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def instante(mes):
+    """Los límites de las particiones son medianoche UTC del día 1"""
+    return datetime(mes.year, mes.month, 1, tzinfo=dt_timezone.utc)
+
+
+def nombre_particion(mes):
+    return f'{TABLA}_p{mes:%Y%m}'
+
+
+def esta_particionada(cursor):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLA])
+    fila = cursor.fetchone()
+    return bool(fila) and fila[0] == 'p'
+
+
+def particiones(cursor):
+    """Meses con partición, según el nombre de cada partición"""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s)",
+        [TABLA],
+    )
+    meses = []
+    for (nombre,) in cursor.fetchall():
+        sufijo = nombre[len(TABLA) + 2:]
+        if nombre.startswith(f'{TABLA}_p') and len(sufijo) == 6 and sufijo.isdigit():
+            meses.append(date(int(sufijo[:4]), int(sufijo[4:]), 1))
+    return sorted(meses)
+
+
+def crear_particion(cursor, mes):
+    desde, hasta = instante(mes), instante(mes_siguiente(mes))
+    crear = (
+        f'CREATE TABLE "{nombre_particion(mes)}" PARTITION OF "{TABLA}" '
+        f"FOR VALUES FROM ('{desde.isoformat()}') TO ('{hasta.isoformat()}')"
+    )
+
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT}" WHERE created_at >= %s AND created_at < %s)',
+        [desde, hasta],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(crear)
+        return
+
+    # Hay filas del mes en DEFAULT: se desengancha, se crea el mes y se mueven
+    cursor.execute(f'ALTER TABLE "{TABLA}" DETACH PARTITION "{DEFAULT}"')
+    cursor.execute(crear)
+    cursor.execute(
+        f'WITH movidas AS (DELETE FROM "{DEFAULT}" WHERE created_at >= %s AND created_at < %s RETURNING *) '
+        f'INSERT INTO "{TABLA}" SELECT * FROM movidas',
+        [desde, hasta],
+    )
+    cursor.execute(f'ALTER TABLE "{TABLA}" ATTACH PARTITION "{DEFAULT}" DEFAULT')
+
+
+def asegurar_particiones(meses_adelante=MESES_ADELANTE, using='default'):
+    """Crea las particiones que falten del mes actual y los `meses_adelante` siguientes"""
+    conexion = connections[using]
+    if conexion.vendor != 'postgresql':
+        return []
+
+    creadas = []
+    with transaction.atomic(using=using), conexion.cursor() as cursor:
+        if not esta_particionada(cursor):
+            return []
+        existentes = set(particiones(cursor))
+        mes = inicio_mes(timezone.now().astimezone(dt_timezone.utc))
+        for _ in range(meses_adelante + 1):
+            if mes not in existentes:
+                crear_particion(cursor, mes)
+                creadas.append(nombre_particion(mes))
+            mes = mes_siguiente(mes)
+    return creadas
+
+
+def crear_particiones_pendientes(sender, using, **kwargs):
+    """post_migrate"""
+    asegurar_particiones(using=using)
+
+
+@transaction.atomic
+def convertir(meses_adelante=MESES_ADELANTE):
+    """Convierte la tabla a particionada copiando las filas. Bloquea la tabla mientras dura"""
+    if connection.vendor != 'postgresql':
+        raise ParticionError('El particionado requiere Postgres')
+
+    with connection.cursor() as cursor:
+        if esta_particionada(cursor):
+            raise ParticionError('La tabla ya está particionada')
+
+        cursor.execute(f'LOCK TABLE "{TABLA}" IN ACCESS EXCLUSIVE MODE')
+        # Índices (salvo la PK) y claves foráneas actuales, para recrearlos en la tabla nueva
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p')",
+            [TABLA, TABLA],
+        )
+        indices = [definicion for (definicion,) in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLA],
+        )
+        claves = cursor.fetchall()
+        cursor.execute(f'SELECT min(created_at), max(created_at) FROM "{TABLA}"')
+        primero, ultimo = cursor.fetchone()
+
+        antigua = f'{TABLA}_sin_particionar'
+        cursor.execute(f'ALTER TABLE "{TABLA}" RENAME TO "{antigua}"')
+        cursor.execute(f'CREATE TABLE "{TABLA}" (LIKE "{antigua}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+        cursor.execute(f'CREATE TABLE "{DEFAULT}" PARTITION OF "{TABLA}" DEFAULT')
+
+        ahora = timezone.now()
+        mes = inicio_mes((primero or ahora).astimezone(dt_timezone.utc))
+        fin = inicio_mes(max(ultimo or ahora, ahora).astimezone(dt_timezone.utc))
+        for _ in range(meses_adelante):
+            fin = mes_siguiente(fin)
+        while mes <= fin:
+            crear_particion(cursor, mes)
+            mes = mes_siguiente(mes)
+
+        cursor.execute(f'INSERT INTO "{TABLA}" SELECT * FROM "{antigua}"')
+        cursor.execute(f'DROP TABLE "{antigua}"')
+        # Después del DROP: el nombre de la PK y de los índices quedan libres
+        cursor.execute(f'ALTER TABLE "{TABLA}" ADD PRIMARY KEY (id, created_at)')
+
+        # La secuencia de identidad se fue con la tabla antigua
+        secuencia = f'{TABLA}_id_seq'
+        cursor.execute(f'CREATE SEQUENCE "{secuencia}" OWNED BY "{TABLA}".id')
+        cursor.execute(f"SELECT setval('\"{secuencia}\"', COALESCE((SELECT max(id) FROM \"{TABLA}\"), 0) + 1, false)")
+        cursor.execute(f'ALTER TABLE "{TABLA}" ALTER COLUMN id SET DEFAULT nextval(\'"{secuencia}"\')')
+
+        for definicion in indices:
+            cursor.execute(definicion)
+        for nombre, definicion in claves:
+            cursor.execute(f'ALTER TABLE "{TABLA}" ADD CONSTRAINT "{nombre}" {definicion}')
+        cursor.execute(f'CREATE INDEX "{TABLA}_created_brin" ON "{TABLA}" USING brin (created_at)')
+
+        return particiones(cursor)
+
+
+@transaction.atomic
+def archivar(antes_de, eliminar=False):
+    """
+    Desengancha las particiones de los meses anteriores a `antes_de` (día 1 de
+    un mes). Retorna los nombres archivados (o borrados)
+    """
+    cierre = antes_de - timedelta(days=1)
+    if not StockSnapshot.objects.filter(fecha=cierre, lote__isnull=True).exists():
+        raise ParticionError(
+            f'Falta el snapshot de stock del {cierre} (snapshot_stock --fecha {cierre}): '
+            'sin él el stock a fecha y el kardex necesitarían los movimientos archivados'
+        )
+
+    archivadas = []
+    with connection.cursor() as cursor:
+        if not esta_particionada(cursor):
+            raise ParticionError('La tabla no está particionada (particiones_movimientos --convertir)')
+
+        if not eliminar:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{ESQUEMA_ARCHIVO}"')
+
+        for mes in particiones(cursor):
+            if mes >= antes_de:
+                break
+            nombre = nombre_particion(mes)
+            cursor.execute(f'ALTER TABLE "{TABLA}" DETACH PARTITION "{nombre}"')
+            if eliminar:
+                cursor.execute(f'DROP TABLE "{nombre}"')
+            else:
+                # Sin claves foráneas: lo archivado no debe impedir borrar productos o ventas
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+                    [nombre],
+                )
+                for (clave,) in cursor.fetchall():
+                    cursor.execute(f'ALTER TABLE "{nombre}" DROP CONSTRAINT "{clave}"')
+                cursor.execute(f'ALTER TABLE "{nombre}" SET SCHEMA "{ESQUEMA_ARCHIVO}"')
+            archivadas.append(nombre)
+
+    if archivadas:
+        ArchivoMovimientos.objects.create(
+            antes_de=antes_de, particiones=' '.join(archivadas), eliminadas=eliminar,
+        )
+    return archivadas
@@ -0,0 +1,102 @@
+"""
+Resumen diario de ventas (VentaDiaria)
+
+Una fila por (día, tipo de comprobante, estado) con la cantidad y los montos de
+las ventas PAGADAS y ANULADAS. `confirmar_venta` y `anular_venta` la actualizan
+dentro de su transacción con un INSERT ... ON CONFLICT que suma sobre la fila,
+así dos cajas que confirman a la vez no se pisan. Las estadísticas de un
+periodo leen una fila por día en lugar de recorrer las ventas.
+
+`recalcular_ventas_diarias` (comando `backfill_ventas_diarias`) reconstruye el
+resumen desde Venta para cargarlo por primera vez o corregir diferencias.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Venta, VentaDiaria
+
+ESTADOS_RESUMIDOS = ['PAGADA', 'ANULADA']
+MONTOS = ['subtotal', 'descuento', 'igv', 'total']
+
+
+def registrar_venta(venta, estado, signo=1):
+    """Suma la venta (o la resta con signo=-1) a su fila del resumen"""
+    tabla = VentaDiaria._meta.db_table
+    columnas = ['cantidad', *MONTOS]
+    actualizar = ', '.join(f'{col} = {tabla}.{col} + EXCLUDED.{col}' for col in columnas)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (fecha, tipo_comprobante, estado, {', '.join(columnas)}) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+            f"ON CONFLICT (fecha, tipo_comprobante, estado) DO UPDATE SET {actualizar}",
+            [
+                timezone.localdate(venta.fecha_venta),
+                venta.tipo_comprobante,
+                estado,
+                signo,
+                *[signo * getattr(venta, monto) for monto in MONTOS],
+            ],
+        )
+
+
+def inicio_del_dia(fecha, dias=0):
+    """Medianoche local de la fecha (más `dias`), para filtrar fecha_venta por rango sin castear"""
+    return timezone.make_aware(datetime.combine(fecha + timedelta(days=dias), time.min))
+
+
+@transaction.atomic
+def recalcular_ventas_diarias(desde=None, hasta=None):
+    """Reconstruye el resumen del rango de fechas (todo si no se indica). Retorna las filas creadas"""
+    ventas = Venta.objects.filter(estado__in=ESTADOS_RESUMIDOS)
+    resumen = VentaDiaria.objects.all()
+    if desde:
+        ventas = ventas.filter(fecha_venta__gte=inicio_del_dia(desde))
+        resumen = resumen.filter(fecha__gte=desde)
+    if hasta:
+        ventas = ventas.filter(fecha_venta__lt=inicio_del_dia(hasta, dias=1))
+        resumen = resumen.filter(fecha__lte=hasta)
+
+    filas = (
+        ventas
+        .annotate(fecha=TruncDate('fecha_venta', tzinfo=timezone.get_current_timezone()))
+        .values('fecha', 'tipo_comprobante', 'estado')
+        .annotate(n=Count('id'), **{f'suma_{monto}': Sum(monto) for monto in MONTOS})
+        .order_by()
+    )
+
+    resumen.delete()
+    return len(VentaDiaria.objects.bulk_create([
+        VentaDiaria(
+            fecha=fila['fecha'],
+            tipo_comprobante=fila['tipo_comprobante'],
+            estado=fila['estado'],
+            cantidad=fila['n'],
+            **{monto: fila[f'suma_{monto}'] for monto in MONTOS},
+        )
+        for fila in filas
+    ]))
+
+
+def totales(desde, hasta=None, estado='PAGADA'):
+    """Cantidad y montos del periodo, en total y por tipo de comprobante"""
+    filas = VentaDiaria.objects.filter(fecha__gte=desde, estado=estado)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+
+    campos = ['cantidad', *MONTOS]
+    por_comprobante = {
+        fila['tipo_comprobante']: {campo: fila[f'suma_{campo}'] for campo in campos}
+        for fila in filas.values('tipo_comprobante').annotate(
+            **{f'suma_{campo}': Sum(campo) for campo in campos}
+        ).order_by()
+    }
+
+    resultado = {campo: sum(fila[campo] for fila in por_comprobante.values()) for campo in campos}
+    resultado['por_comprobante'] = por_comprobante
+    return resultado
@@ -0,0 +1,139 @@
+"""
+Búsqueda de la API sobre índices de Postgres
+
+`BusquedaFilter` reemplaza a SearchFilter con los mismos `search_fields`:
+- Los campos con '^' (códigos, documentos) se buscan por prefijo con
+  `UPPER(campo) LIKE 'ABC%'`, que usa un índice btree text_pattern_ops.
+- El resto se compara sin tildes ni mayúsculas con
+  `erp_unaccent(lower(campo)) LIKE '%term%'`, que usa un índice GIN pg_trgm
+  sobre esa misma expresión. Los resultados se ordenan por similitud salvo que
+  se pida `?ordering=`.
+
+Las extensiones, la función erp_unaccent y los índices se crean al final de
+`migrate` (el ERP no tiene migraciones). En otras bases de datos se usa el
+SearchFilter de DRF tal cual.
+"""
+
+import operator
+import unicodedata
+from functools import reduce
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Func, Q, TextField, Value, When
+from django.db.models.functions import Greatest, Lower
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+# Campos indexados por modelo: los de prefijo en btree, el resto en GIN pg_trgm
+INDICES_PREFIJO = {
+    'Producto': ['codigo'],
+    'Cliente': ['numero_documento'],
+    'Proveedor': ['ruc'],
+    'CatalogoProveedor': ['codigo'],
+}
+INDICES_TRIGRAMA = {
+    'Producto': ['nombre', 'marca', 'categoria'],
+    'Cliente': ['nombre_completo', 'telefono', 'email'],
+    'Proveedor': ['razon_social', 'nombre_comercial'],
+    'CatalogoProveedor': ['nombre', 'marca'],
+}
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, igual que erp_unaccent(lower(...)) en Postgres"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def sin_tildes(campo):
+    """Expresión erp_unaccent(lower(campo)), la misma de los índices GIN"""
+    return Func(Lower(F(campo)), function='erp_unaccent', output_field=TextField())
+
+
+class BusquedaFilter(filters.SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        texto = [campo for campo in search_fields if campo[0] not in self.lookup_prefixes]
+        prefijo = [campo for campo in search_fields if campo[0] in self.lookup_prefixes]
+        expresiones = {f'busqueda_{i}': sin_tildes(campo) for i, campo in enumerate(texto)}
+        if expresiones:
+            queryset = queryset.alias(**expresiones)
+
+        # Como en SearchFilter: cada término debe aparecer en alguno de los campos
+        for termino in search_terms:
+            condiciones = [Q(**{f'{nombre}__contains': normalizar(termino)}) for nombre in expresiones]
+            condiciones += [
+                Q(**{f'{campo[1:]}__{self.lookup_prefixes[campo[0]]}': termino})
+                for campo in prefijo
+            ]
+            queryset = queryset.filter(reduce(operator.or_, condiciones))
+
+        if self.must_call_distinct(queryset, search_fields):
+            return queryset.distinct()
+        if api_settings.ORDERING_PARAM in request.query_params:
+            return queryset
+
+        busqueda = ' '.join(search_terms)
+        puntajes = [TrigramSimilarity(sin_tildes(campo), normalizar(busqueda)) for campo in texto]
+        # Un código escrito (o escaneado) completo va primero
+        puntajes += [
+            Case(When(**{f'{campo[1:]}__iexact': busqueda}, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+            for campo in prefijo
+        ]
+        relevancia = Greatest(*puntajes) if len(puntajes) > 1 else puntajes[0]
+        orden = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.annotate(relevancia=relevancia).order_by('-relevancia', *orden)
+
+
+def instalar_busqueda(sender, using, **kwargs):
+    """post_migrate: extensiones, erp_unaccent e índices de búsqueda (sólo Postgres)"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+
+    # Con migrate de otra app (o --run-syncdb a medias) las tablas pueden no existir aún
+    tablas = set(connection.introspection.table_names())
+    indices = []
+
+    for modelo, campos in INDICES_PREFIJO.items():
+        opts = sender.get_model(modelo)._meta
+        if opts.db_table not in tablas:
+            continue
+        for campo in campos:
+            columna = opts.get_field(campo).column
+            indices.append(
+                f'CREATE INDEX IF NOT EXISTS "{opts.db_table}_{columna}_prefijo" '
+                f'ON "{opts.db_table}" (UPPER("{columna}"::text) text_pattern_ops)'
+            )
+
+    for modelo, campos in INDICES_TRIGRAMA.items():
+        opts = sender.get_model(modelo)._meta
+        if opts.db_table not in tablas:
+            continue
+        for campo in campos:
+            columna = opts.get_field(campo).column
+            indices.append(
+                f'CREATE INDEX IF NOT EXISTS "{opts.db_table}_{columna}_trgm" '
+                f'ON "{opts.db_table}" USING gin (erp_unaccent(lower("{columna}")) gin_trgm_ops)'
+            )
+
+    if not indices:
+        return
+
+    sentencias = [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE EXTENSION IF NOT EXISTS unaccent',
+        # unaccent() es STABLE y un índice de expresión necesita una función IMMUTABLE
+        "CREATE OR REPLACE FUNCTION erp_unaccent(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+    ]
+
+    with connection.cursor() as cursor:
+        for sentencia in sentencias + indices:
+            cursor.execute(sentencia)
@@ -80,6 +80,8 @@ class VentaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Venta
         fields = '__all__'
+        # El estado sólo cambia con confirmar/anular, que mueven stock y resumen
+        read_only_fields = ['estado']
 
 
 class MovimientoInventarioSerializer(serializers.ModelSerializer):
@@ -0,0 +1,473 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+from xml.etree import ElementTree
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .existencias import HistorialArchivado, estado_desde, podar_snapshots, stock_a_fecha, tomar_snapshot
+from .models import (
+    ArchivoMovimientos, CatalogoProveedor, Cliente, Compra, DetalleCompra, DetalleVenta, Lote,
+    MovimientoInventario, Producto, Proveedor, Serie, StockSnapshot, Venta,
+)
+from .particiones import DEFAULT, ParticionError, archivar, convertir, crear_particion, nombre_particion
+from .resumen import inicio_del_dia
+
+XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+class ConsultasListadoTests(TestCase):
+    """
+    Los listados hacen las mismas consultas con 5 que con 50 filas: una
+    relación que el serializer lee sin select_related/prefetch_related
+    agregaría una consulta por fila (N+1)
+    """
+    # Páginas numeradas: COUNT + página. Keyset: página (+ prefetch de detalles)
+    ENDPOINTS = {
+        '/api/productos/': 2,
+        '/api/lotes/': 2,
+        '/api/series/': 2,
+        '/api/clientes/': 2,
+        '/api/proveedores/': 2,
+        '/api/catalogo-proveedores/': 2,
+        '/api/compras/': 2,
+        '/api/ventas/': 2,
+        '/api/movimientos/': 1,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('vendedor', password='x')
+        cls.filas = 0
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def poblar(self, hasta):
+        """Completa `hasta` filas de cada listado, con dos detalles por compra y venta"""
+        ahora = timezone.now()
+        nuevas = range(self.filas, hasta)
+        self.filas = hasta
+
+        productos = Producto.objects.bulk_create([
+            Producto(codigo=f'P{i:03d}', nombre=f'Producto {i}', categoria='Filtros', marca='Marca', precio_venta=10)
+            for i in nuevas
+        ])
+        lotes = Lote.objects.bulk_create([
+            Lote(producto=producto, numero_lote=f'L{i:03d}', cantidad_inicial=10)
+            for i, producto in zip(nuevas, productos)
+        ])
+        Serie.objects.bulk_create([
+            Serie(producto=producto, lote=lote, numero_serie=f'S{i:03d}')
+            for i, producto, lote in zip(nuevas, productos, lotes)
+        ])
+        clientes = Cliente.objects.bulk_create([
+            Cliente(tipo_documento='DNI', numero_documento=f'{i:08d}', nombre_completo=f'Cliente {i}', tipo_cliente='PARTICULAR')
+            for i in nuevas
+        ])
+        proveedores = Proveedor.objects.bulk_create([
+            Proveedor(ruc=f'20{i:09d}', razon_social=f'Proveedor {i}') for i in nuevas
+        ])
+        CatalogoProveedor.objects.bulk_create([
+            CatalogoProveedor(proveedor=proveedor, codigo=f'C{i:03d}', nombre=f'Item {i}', marca='Marca', categoria='Filtros')
+            for i, proveedor in zip(nuevas, proveedores)
+        ])
+
+        compras = Compra.objects.bulk_create([
+            Compra(
+                numero_compra=f'C{i:03d}', proveedor=proveedor, fecha_compra=ahora,
+                subtotal=Decimal(100), igv=Decimal(18), total=Decimal(118), created_by=self.usuario,
+            )
+            for i, proveedor in zip(nuevas, proveedores)
+        ])
+        DetalleCompra.objects.bulk_create([
+            DetalleCompra(compra=compra, producto=producto, cantidad=5, precio_unitario=10, subtotal=50)
+            for compra, producto in zip(compras, productos)
+            for _ in range(2)
+        ])
+        ventas = Venta.objects.bulk_create([
+            Venta(
+                numero_venta=f'V{i:03d}', tipo_comprobante='BOLETA', serie_comprobante='B001',
+                numero_comprobante=str(i), cliente=cliente, fecha_venta=ahora,
+                subtotal=Decimal(100), igv=Decimal(18), total=Decimal(118), created_by=self.usuario,
+            )
+            for i, cliente in zip(nuevas, clientes)
+        ])
+        DetalleVenta.objects.bulk_create([
+            DetalleVenta(venta=venta, producto=producto, cantidad=1, precio_unitario=10, subtotal=10)
+            for venta, producto in zip(ventas, productos)
+            for _ in range(2)
+        ])
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(
+                producto=producto, tipo_movimiento='SALIDA', cantidad=1, motivo='Venta',
+                venta=venta, lote=lote, created_by=self.usuario,
+            )
+            for producto, venta, lote in zip(productos, ventas, lotes)
+        ])
+
+    def test_consultas_no_dependen_del_tamano_de_pagina(self):
+        for filas in (5, 50):
+            self.poblar(filas)
+            for url, consultas in self.ENDPOINTS.items():
+                with self.subTest(url=url, filas=filas), self.assertNumQueries(consultas):
+                    response = self.client.get(url, {'page_size': filas})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.data['results']), filas)
+
+
+class InventarioTestCase(TestCase):
+    """Movimientos de un producto con fecha controlada (created_at es auto_now_add)"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('almacen', password='x')
+        cls.producto = Producto.objects.create(codigo='P001', nombre='Filtro', categoria='Filtros', marca='Marca', precio_venta=30)
+        cls.proveedor = Proveedor.objects.create(ruc='20000000001', razon_social='Proveedor')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def mover(self, dia, tipo, cantidad, costo=None):
+        """Movimiento al mediodía de `dia`, en orden de creación; con `costo` es una entrada por compra"""
+        compra = None
+        if costo is not None:
+            compra = Compra.objects.create(
+                numero_compra=f'C{Compra.objects.count() + 1:03d}', proveedor=self.proveedor, fecha_compra=timezone.now(),
+                subtotal=costo * cantidad, igv=0, total=costo * cantidad, created_by=self.usuario,
+            )
+            DetalleCompra.objects.create(compra=compra, producto=self.producto, cantidad=cantidad, precio_unitario=costo, subtotal=costo * cantidad)
+        movimiento = MovimientoInventario.objects.create(
+            producto=self.producto, tipo_movimiento=tipo, cantidad=cantidad, motivo='Prueba',
+            compra=compra, created_by=self.usuario,
+        )
+        MovimientoInventario.objects.filter(pk=movimiento.pk).update(
+            created_at=inicio_del_dia(dia) + timedelta(hours=12, seconds=movimiento.pk),
+        )
+
+    def kardex(self, **params):
+        response = self.client.get(f'/api/productos/{self.producto.pk}/kardex/', params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+
+class KardexTests(InventarioTestCase):
+    DIA = date(2024, 3, 1)
+
+    def test_promedio_ponderado_movil(self):
+        self.mover(self.DIA, 'ENTRADA', 10, costo=Decimal(10))
+        self.mover(self.DIA, 'SALIDA', 10)
+        self.mover(self.DIA, 'ENTRADA', 10, costo=Decimal(20))
+        self.mover(self.DIA, 'ENTRADA', 10, costo=Decimal(30))
+        self.mover(self.DIA, 'SALIDA', 5)
+
+        filas = [
+            (fila['saldo'], Decimal(fila['costo_promedio']), Decimal(fila['valor_saldo']))
+            for fila in self.kardex()['movimientos']
+        ]
+        self.assertEqual(filas, [
+            (10, 10, 100),
+            (0, 10, 0),
+            # Sin stock la compra fija el promedio: no se mezcla con la de 10
+            (10, 20, 200),
+            (20, 25, 500),
+            # Las salidas salen al promedio vigente
+            (15, 25, 375),
+        ])
+
+    def test_desde_parte_del_saldo_anterior(self):
+        self.mover(self.DIA, 'ENTRADA', 10, costo=Decimal(10))
+        self.mover(self.DIA, 'SALIDA', 4)
+        self.mover(self.DIA + timedelta(days=1), 'ENTRADA', 6, costo=Decimal(20))
+
+        kardex = self.kardex(desde=str(self.DIA + timedelta(days=1)))
+
+        self.assertEqual(kardex['saldo_inicial'], 6)
+        self.assertEqual(Decimal(kardex['costo_promedio_inicial']), 10)
+        fila, = kardex['movimientos']
+        self.assertEqual((fila['saldo'], Decimal(fila['costo_promedio']), Decimal(fila['valor_saldo'])), (12, 15, 180))
+
+    def test_fechas_invalidas(self):
+        for url, params in [
+            (f'/api/productos/{self.producto.pk}/kardex/', {'desde': '2024-02-30'}),
+            (f'/api/productos/{self.producto.pk}/kardex/', {'hasta': 'ayer'}),
+            ('/api/productos/existencias/', {'fecha': '2024-13-01'}),
+        ]:
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Fecha inválida', response.data['error'])
+
+
+class ExistenciasTests(InventarioTestCase):
+    DIA = date(2024, 3, 1)
+
+    def test_snapshot_mas_movimientos_posteriores(self):
+        self.mover(self.DIA, 'ENTRADA', 10, costo=Decimal(10))
+        self.mover(self.DIA, 'SALIDA', 4)
+        self.mover(self.DIA + timedelta(days=1), 'ENTRADA', 6, costo=Decimal(20))
+        tomar_snapshot(self.DIA + timedelta(days=1))
+        self.mover(self.DIA + timedelta(days=2), 'SALIDA', 3)
+        self.mover(self.DIA + timedelta(days=2), 'ENTRADA', 3, costo=Decimal(30))
+
+        snapshot = StockSnapshot.objects.get(lote__isnull=True)
+        self.assertEqual((snapshot.cantidad, snapshot.valor, snapshot.costo_promedio), (12, 180, 15))
+
+        fecha = self.DIA + timedelta(days=2)
+        esperado = [12, Decimal(225), Decimal('18.7500')]
+        self.assertEqual(estado_desde(None, fecha, por_lote=False), {(self.producto.pk,): esperado})
+        # Sin los movimientos ya incluidos en el snapshot el resultado es el mismo
+        MovimientoInventario.objects.filter(created_at__lt=inicio_del_dia(self.DIA, dias=2)).delete()
+        self.assertEqual(stock_a_fecha(fecha), {(self.producto.pk,): esperado})
+
+        response = self.client.get('/api/productos/existencias/', {'fecha': str(fecha)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['checkpoint'], self.DIA + timedelta(days=1))
+        self.assertEqual(response.data['valor_total'], Decimal('225.00'))
+
+    def test_podar_conserva_los_fines_de_mes(self):
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(fecha=date(2024, 1, 25) + timedelta(days=i), producto=self.producto, cantidad=1)
+            for i in range(12)
+        ])
+
+        podar_snapshots(date(2024, 2, 5), conservar_dias=2)
+
+        self.assertEqual(
+            sorted(StockSnapshot.objects.values_list('fecha', flat=True)),
+            [date(2024, 1, 31), date(2024, 2, 3), date(2024, 2, 4), date(2024, 2, 5)],
+        )
+
+    def test_limite_del_historial_archivado(self):
+        corte = date(2024, 3, 10)
+        ArchivoMovimientos.objects.create(antes_de=corte, particiones='erp_core_movimientoinventario_p2024_03_01')
+        StockSnapshot.objects.create(fecha=corte - timedelta(days=1), producto=self.producto, cantidad=5, valor=50, costo_promedio=10)
+        self.mover(corte, 'SALIDA', 2)
+
+        # El cierre del día anterior al corte es el último que se puede calcular
+        self.assertEqual(stock_a_fecha(corte), {(self.producto.pk,): [3, Decimal(30), Decimal(10)]})
+        self.assertEqual(stock_a_fecha(corte - timedelta(days=1)), {(self.producto.pk,): [5, Decimal(50), Decimal(10)]})
+        with self.assertRaises(HistorialArchivado):
+            stock_a_fecha(corte - timedelta(days=2))
+        with self.assertRaises(HistorialArchivado):
+            tomar_snapshot(corte - timedelta(days=1))
+
+        response = self.client.get('/api/productos/existencias/', {'fecha': str(corte - timedelta(days=2))})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f'/api/productos/{self.producto.pk}/kardex/', {'desde': str(corte - timedelta(days=1))})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.kardex(desde=str(corte))['saldo_inicial'], 5)
+
+
+class PaginacionKeysetTests(InventarioTestCase):
+    URL = '/api/movimientos/'
+    DIA = date(2024, 3, 1)
+
+    def setUp(self):
+        super().setUp()
+        for _ in range(7):
+            self.mover(self.DIA, 'ENTRADA', 1)
+        # Cuatro movimientos con la misma fecha: el cursor desempata por id
+        ids = sorted(MovimientoInventario.objects.values_list('pk', flat=True))
+        MovimientoInventario.objects.filter(pk__in=ids[1:5]).update(created_at=inicio_del_dia(self.DIA))
+        orden = list(MovimientoInventario.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.paginas = [orden[0:3], orden[3:6], orden[6:]]
+
+    def recorrer(self, response, enlace):
+        paginas = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            paginas.append([fila['id'] for fila in response.data['results']])
+            if not response.data[enlace]:
+                return paginas, response
+            response = self.client.get(response.data[enlace])
+
+    def test_ida_y_vuelta_con_empates(self):
+        paginas, ultima = self.recorrer(self.client.get(self.URL, {'page_size': 3}), 'next')
+        self.assertEqual(paginas, self.paginas)
+
+        anteriores, _ = self.recorrer(ultima, 'previous')
+        self.assertEqual(anteriores, self.paginas[::-1])
+
+    def test_cursor_invalido(self):
+        response = self.client.get(self.URL, {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_usa_la_paginacion_numerada(self):
+        response = self.client.get(self.URL, {'page': 2, 'page_size': 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIn('page=3', response.data['next'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'El particionado requiere Postgres')
+class ParticionesTests(InventarioTestCase):
+    def setUp(self):
+        super().setUp()
+        # El DDL falla con chequeos de claves foráneas diferidos pendientes en la transacción del test
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    def filas(self, tabla):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{tabla}"')
+            return cursor.fetchone()[0]
+
+    def test_crear_particion_saca_las_filas_de_default(self):
+        convertir()
+        mes = date(2099, 1, 1)
+        self.mover(date(2099, 1, 15), 'ENTRADA', 3)
+        self.mover(date(2099, 2, 15), 'ENTRADA', 2)
+        self.assertEqual(self.filas(DEFAULT), 2)
+
+        with connection.cursor() as cursor:
+            crear_particion(cursor, mes)
+
+        self.assertEqual(self.filas(nombre_particion(mes)), 1)
+        self.assertEqual(self.filas(DEFAULT), 1)
+        self.assertEqual(MovimientoInventario.objects.count(), 2)
+
+    def test_archivar_exige_el_snapshot_del_cierre(self):
+        self.mover(date(2023, 1, 15), 'ENTRADA', 5, costo=Decimal(10))
+        self.mover(date(2023, 2, 15), 'SALIDA', 1)
+        convertir()
+
+        with self.assertRaises(ParticionError):
+            archivar(date(2023, 2, 1))
+        self.assertFalse(ArchivoMovimientos.objects.exists())
+
+        tomar_snapshot(date(2023, 1, 31))
+        self.assertEqual(archivar(date(2023, 2, 1)), [nombre_particion(date(2023, 1, 1))])
+
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+        self.assertEqual(stock_a_fecha(date(2023, 2, 28)), {(self.producto.pk,): [4, Decimal(40), Decimal(10)]})
+        with self.assertRaises(HistorialArchivado):
+            stock_a_fecha(date(2023, 1, 15))
+
+
+class ExportarTests(TestCase):
+    URL = '/api/clientes/exportar/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('ventas', password='x')
+        Cliente.objects.bulk_create([
+            Cliente(tipo_documento='DNI', numero_documento='10000001', nombre_completo='Ana Pérez', tipo_cliente='PARTICULAR'),
+            Cliente(tipo_documento='RUC', numero_documento='20100000001', nombre_completo='Taller Ñandú, S.A.C.', tipo_cliente='EMPRESA'),
+            Cliente(tipo_documento='RUC', numero_documento='20100000002', nombre_completo='Repuestos Lima', tipo_cliente='EMPRESA', activo=False),
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def exportar(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_respeta_los_filtros(self):
+        response, contenido = self.exportar(formato='csv', tipo_cliente='EMPRESA', activo='true')
+
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment; filename="cliente_', response['Content-Disposition'])
+        encabezado, *filas = list(csv.reader(io.StringIO(contenido.decode())))
+        self.assertEqual(encabezado[:3], ['Tipo documento', 'Número documento', 'Nombre'])
+        self.assertEqual([fila[:3] for fila in filas], [['RUC', '20100000001', 'Taller Ñandú, S.A.C.']])
+
+    def test_csv_respeta_la_busqueda(self):
+        _, contenido = self.exportar(search='201')
+
+        numeros = [fila[1] for fila in list(csv.reader(io.StringIO(contenido.decode())))[1:]]
+        self.assertEqual(sorted(numeros), ['20100000001', '20100000002'])
+
+    def test_xlsx(self):
+        response, contenido = self.exportar(formato='xlsx', tipo_cliente='EMPRESA')
+
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            self.assertIsNone(libro.testzip())
+            hoja = ElementTree.fromstring(libro.read('xl/worksheets/sheet1.xml'))
+        filas = [
+            [''.join(celda.itertext()) for celda in fila]
+            for fila in hoja.iter(f'{XLSX_NS}row')
+        ]
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0][0], 'Tipo documento')
+        self.assertEqual(sorted(fila[1] for fila in filas[1:]), ['20100000001', '20100000002'])
+
+    def test_formato_desconocido(self):
+        response = self.client.get(self.URL, {'formato': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportarTests(TestCase):
+    URL = '/api/productos/importar/'
+    CSV = (
+        'codigo,nombre,categoria,marca,precio_venta\n'
+        'P001,Filtro de aceite,Filtros,Bosch,35\n'
+        'P002,Bujía,Encendido,NGK,12.50\n'
+        'P003,Faja,Motor,Gates,abc\n'
+        'P002,Bujía repetida,Encendido,NGK,13\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('almacen', password='x')
+        Producto.objects.create(
+            codigo='P001', nombre='Filtro', categoria='Filtros', marca='Marca', precio_venta=30, stock_actual=7,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def importar(self, contenido, validar=False):
+        url = self.URL + ('?validar=1' if validar else '')
+        archivo = SimpleUploadedFile('productos.csv', contenido.encode(), content_type='text/csv')
+        return self.client.post(url, {'archivo': archivo}, format='multipart')
+
+    def test_crea_actualiza_y_reporta_errores(self):
+        response = self.importar(self.CSV)
+
+        self.assertEqual(response.status_code, 200)
+        resultado = response.data
+        self.assertEqual(
+            {campo: resultado[campo] for campo in ('procesadas', 'creadas', 'actualizadas', 'con_error')},
+            {'procesadas': 4, 'creadas': 1, 'actualizadas': 1, 'con_error': 2},
+        )
+        self.assertEqual([(error['fila'], error['campo']) for error in resultado['errores']], [(4, 'precio_venta'), (5, 'codigo')])
+        self.assertIn('fila 3', resultado['errores'][1]['error'])
+
+        actualizado = Producto.objects.get(codigo='P001')
+        self.assertEqual((actualizado.nombre, actualizado.marca, actualizado.precio_venta), ('Filtro de aceite', 'Bosch', 35))
+        # El stock sólo cambia con movimientos
+        self.assertEqual(actualizado.stock_actual, 7)
+        self.assertEqual(Producto.objects.get(codigo='P002').nombre, 'Bujía')
+        self.assertFalse(Producto.objects.filter(codigo='P003').exists())
+
+    def test_validar_no_escribe(self):
+        response = self.importar(self.CSV, validar=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['creadas'], response.data['actualizadas'], response.data['con_error']), (0, 0, 2))
+        self.assertEqual(list(Producto.objects.values_list('codigo', 'nombre')), [('P001', 'Filtro')])
+
+    def test_columnas_desconocidas(self):
+        response = self.importar('codigo,nombre,stock_actual\nP009,Aceite,5\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('stock_actual', response.data['error'])
+        self.assertEqual(Producto.objects.count(), 1)
@@ -2,19 +2,56 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Count, Q
+from django.db import transaction
+from django.db.models import Sum, Count, Q, Prefetch
+from copy import copy
 from datetime import datetime, timedelta
+from decimal import Decimal
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import *
 from .serializers import *
+from .existencias import HistorialArchivado, stock_a_fecha, ultimo_checkpoint
+from .exportar import ExportarMixin
+from .importar import ImportarMixin
+from .inventario import OperacionInvalida, anular_venta, confirmar_venta, recibir_compra
+from .kardex import Kardex
+from .pagination import KeysetPagination
+from .resumen import ESTADOS_RESUMIDOS, registrar_venta, totales
+from .search import BusquedaFilter
 
 
-class ProductoViewSet(viewsets.ModelViewSet):
+def fecha_param(request, nombre):
+    """Fecha AAAA-MM-DD de ?nombre= (None si no viene). ValueError si no es una fecha válida"""
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    try:
+        # parse_date lanza ValueError con fechas bien formadas pero inexistentes (2024-02-30)
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValueError(f'Fecha inválida en "{nombre}": {valor} (formato AAAA-MM-DD)')
+    return fecha
+
+
+def ventas_con_detalles():
+    """Ventas con lo que lee VentaSerializer: cliente y detalles con su producto"""
+    return Venta.objects.select_related('cliente').prefetch_related(
+        Prefetch('detalles', queryset=DetalleVenta.objects.select_related('producto'))
+    )
+
+
+class ProductoViewSet(ImportarMixin, viewsets.ModelViewSet):
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
-    search_fields = ['codigo', 'nombre', 'marca', 'categoria']
+    filter_backends = [BusquedaFilter, filters.OrderingFilter, DjangoFilterBackend]
+    search_fields = ['^codigo', 'nombre', 'marca', 'categoria']
     ordering_fields = ['codigo', 'nombre', 'stock_actual', 'precio_venta']
     filterset_fields = ['categoria', 'marca', 'tipo_control', 'activo']
+    tipo_importacion = 'productos'
     
     @action(detail=False, methods=['get'])
     def stock_bajo(self, request):
@@ -23,6 +60,71 @@ class ProductoViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(productos, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def kardex(self, request, pk=None):
+        """Kardex del producto en streaming: ?desde=&hasta=AAAA-MM-DD&formato=json|csv"""
+        producto = self.get_object()
+        try:
+            kardex = Kardex(
+                producto,
+                desde=fecha_param(request, 'desde'),
+                hasta=fecha_param(request, 'hasta'),
+            )
+        except (ValueError, HistorialArchivado) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.query_params.get('formato') == 'csv':
+            response = StreamingHttpResponse(kardex.como_csv(), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="kardex_{producto.codigo}.csv"'
+            return response
+        return StreamingHttpResponse(kardex.como_json(), content_type='application/json')
+    
+    @action(detail=False, methods=['get'])
+    def existencias(self, request):
+        """Stock y valorización al cierre de ?fecha=AAAA-MM-DD (hoy por defecto); ?por_lote=1 detalla lotes"""
+        try:
+            fecha = fecha_param(request, 'fecha') or timezone.localdate()
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        por_lote = request.query_params.get('por_lote') in ('1', 'true')
+        productos = self.filter_queryset(self.get_queryset())
+        
+        try:
+            estado = stock_a_fecha(fecha, por_lote=por_lote, productos=productos)
+        except HistorialArchivado as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        datos = {pk: (codigo, nombre) for pk, codigo, nombre in productos.values_list('id', 'codigo', 'nombre').order_by()}
+        lotes = {}
+        if por_lote:
+            lotes = dict(Lote.objects.filter(producto__in=productos).values_list('id', 'numero_lote'))
+        
+        filas = []
+        total = Decimal(0)
+        for clave, (cantidad, valor, costo) in sorted(estado.items()):
+            if not cantidad or clave[0] not in datos:
+                continue
+            valor = valor.quantize(Decimal('0.01')) if costo is not None else None
+            total += valor or 0
+            fila = {
+                'producto': clave[0],
+                'codigo': datos[clave[0]][0],
+                'nombre': datos[clave[0]][1],
+                'cantidad': cantidad,
+                'costo_promedio': costo,
+                'valor': valor,
+            }
+            if por_lote:
+                fila['lote'] = clave[1]
+                fila['numero_lote'] = lotes.get(clave[1], '')
+            filas.append(fila)
+        
+        return Response({
+            'fecha': fecha,
+            'checkpoint': ultimo_checkpoint(fecha),
+            'valor_total': total,
+            'productos': filas,
+        })
+    
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
         """Estadísticas de productos"""
@@ -42,10 +144,10 @@ class ProductoViewSet(viewsets.ModelViewSet):
 
 
 class LoteViewSet(viewsets.ModelViewSet):
-    queryset = Lote.objects.all()
+    queryset = Lote.objects.select_related('producto')
     serializer_class = LoteSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['numero_lote', 'producto__codigo', 'producto__nombre']
+    filter_backends = [BusquedaFilter, DjangoFilterBackend]
+    search_fields = ['numero_lote', '^producto__codigo', 'producto__nombre']
     filterset_fields = ['producto']
     
     @action(detail=False, methods=['get'])
@@ -61,20 +163,33 @@ class LoteViewSet(viewsets.ModelViewSet):
 
 
 class SerieViewSet(viewsets.ModelViewSet):
-    queryset = Serie.objects.all()
+    queryset = Serie.objects.select_related('producto')
     serializer_class = SerieSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['numero_serie', 'producto__codigo', 'producto__nombre']
+    filter_backends = [BusquedaFilter, DjangoFilterBackend]
+    search_fields = ['numero_serie', '^producto__codigo', 'producto__nombre']
     filterset_fields = ['producto', 'estado', 'lote']
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(ImportarMixin, ExportarMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
-    search_fields = ['numero_documento', 'nombre_completo', 'telefono', 'email']
+    filter_backends = [BusquedaFilter, filters.OrderingFilter, DjangoFilterBackend]
+    search_fields = ['^numero_documento', 'nombre_completo', 'telefono', 'email']
     ordering_fields = ['nombre_completo', 'total_comprado', 'created_at']
     filterset_fields = ['tipo_documento', 'tipo_cliente', 'activo']
+    tipo_importacion = 'clientes'
+    columnas_exportacion = [
+        ('tipo_documento', 'Tipo documento'),
+        ('numero_documento', 'Número documento'),
+        ('nombre_completo', 'Nombre'),
+        ('telefono', 'Teléfono'),
+        ('email', 'Email'),
+        ('direccion', 'Dirección'),
+        ('tipo_cliente', 'Tipo cliente'),
+        ('total_comprado', 'Total comprado'),
+        ('activo', 'Activo'),
+        ('created_at', 'Registrado'),
+    ]
     
     @action(detail=False, methods=['get'])
     def top_clientes(self, request):
@@ -87,7 +202,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
     def historial_compras(self, request, pk=None):
         """Historial de compras del cliente"""
         cliente = self.get_object()
-        ventas = Venta.objects.filter(cliente=cliente).order_by('-fecha_venta')
+        ventas = ventas_con_detalles().filter(cliente=cliente).order_by('-fecha_venta')
         serializer = VentaSerializer(ventas, many=True)
         return Response(serializer.data)
 
@@ -95,8 +210,8 @@ class ClienteViewSet(viewsets.ModelViewSet):
 class ProveedorViewSet(viewsets.ModelViewSet):
     queryset = Proveedor.objects.all()
     serializer_class = ProveedorSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
-    search_fields = ['ruc', 'razon_social', 'nombre_comercial']
+    filter_backends = [BusquedaFilter, filters.OrderingFilter, DjangoFilterBackend]
+    search_fields = ['^ruc', 'razon_social', 'nombre_comercial']
     ordering_fields = ['razon_social', 'total_comprado']
     filterset_fields = ['activo']
     
@@ -104,149 +219,187 @@ class ProveedorViewSet(viewsets.ModelViewSet):
     def catalogo(self, request, pk=None):
         """Catálogo de productos del proveedor"""
         proveedor = self.get_object()
-        catalogo = proveedor.catalogo.filter(activo=True)
+        catalogo = proveedor.catalogo.filter(activo=True).select_related('proveedor')
         serializer = CatalogoProveedorSerializer(catalogo, many=True)
         return Response(serializer.data)
 
 
-class CatalogoProveedorViewSet(viewsets.ModelViewSet):
-    queryset = CatalogoProveedor.objects.all()
+class CatalogoProveedorViewSet(ImportarMixin, viewsets.ModelViewSet):
+    queryset = CatalogoProveedor.objects.select_related('proveedor')
     serializer_class = CatalogoProveedorSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['codigo', 'nombre', 'marca']
+    filter_backends = [BusquedaFilter, DjangoFilterBackend]
+    search_fields = ['^codigo', 'nombre', 'marca']
     filterset_fields = ['proveedor', 'categoria', 'activo']
+    tipo_importacion = 'catalogo-proveedores'
 
 
-class CompraViewSet(viewsets.ModelViewSet):
-    queryset = Compra.objects.all()
+class CompraViewSet(ExportarMixin, viewsets.ModelViewSet):
+    queryset = Compra.objects.select_related('proveedor').prefetch_related(
+        Prefetch('detalles', queryset=DetalleCompra.objects.select_related('producto'))
+    )
     serializer_class = CompraSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
+    filter_backends = [BusquedaFilter, filters.OrderingFilter, DjangoFilterBackend]
     search_fields = ['numero_compra', 'proveedor__razon_social']
     ordering_fields = ['fecha_compra', 'total']
     filterset_fields = ['proveedor', 'estado']
+    pagination_class = KeysetPagination
+    keyset_field = 'fecha_compra'
+    columnas_exportacion = [
+        ('numero_compra', 'Número'),
+        ('fecha_compra', 'Fecha'),
+        ('fecha_recepcion', 'Recepción'),
+        ('proveedor__ruc', 'RUC'),
+        ('proveedor__razon_social', 'Proveedor'),
+        ('estado', 'Estado'),
+        ('subtotal', 'Subtotal'),
+        ('igv', 'IGV'),
+        ('total', 'Total'),
+    ]
     
     @action(detail=True, methods=['post'])
     def recibir(self, request, pk=None):
         """Marcar compra como recibida y actualizar inventario"""
         compra = self.get_object()
         
-        if compra.estado != 'PENDIENTE':
+        try:
+            recibir_compra(compra.pk, request.user)
+        except OperacionInvalida as e:
             return Response(
-                {'error': 'Solo se pueden recibir compras pendientes'},
+                {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Actualizar stock y crear movimientos
-        for detalle in compra.detalles.all():
-            producto = detalle.producto
-            producto.stock_actual += detalle.cantidad
-            producto.save()
-            
-            # Crear movimiento
-            MovimientoInventario.objects.create(
-                producto=producto,
-                tipo_movimiento='ENTRADA',
-                cantidad=detalle.cantidad,
-                motivo=f'Compra {compra.numero_compra}',
-                compra=compra,
-                lote=detalle.lote,
-                created_by=request.user
-            )
-        
-        # Actualizar estado
-        compra.estado = 'RECIBIDA'
-        compra.fecha_recepcion = datetime.now()
-        compra.save()
-        
-        # Actualizar total proveedor
-        proveedor = compra.proveedor
-        proveedor.total_comprado += compra.total
-        proveedor.save()
-        
         return Response({'status': 'Compra recibida exitosamente'})
 
 
-class VentaViewSet(viewsets.ModelViewSet):
-    queryset = Venta.objects.all()
+class VentaViewSet(ExportarMixin, viewsets.ModelViewSet):
+    queryset = ventas_con_detalles()
     serializer_class = VentaSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
+    filter_backends = [BusquedaFilter, filters.OrderingFilter, DjangoFilterBackend]
     search_fields = ['numero_venta', 'numero_comprobante', 'cliente__nombre_completo']
     ordering_fields = ['fecha_venta', 'total']
     filterset_fields = ['cliente', 'tipo_comprobante', 'estado']
+    pagination_class = KeysetPagination
+    keyset_field = 'fecha_venta'
+    columnas_exportacion = [
+        ('numero_venta', 'Número'),
+        ('fecha_venta', 'Fecha'),
+        ('tipo_comprobante', 'Comprobante'),
+        ('serie_comprobante', 'Serie'),
+        ('numero_comprobante', 'Número comprobante'),
+        ('cliente__numero_documento', 'Documento cliente'),
+        ('cliente__nombre_completo', 'Cliente'),
+        ('subtotal', 'Subtotal'),
+        ('descuento', 'Descuento'),
+        ('igv', 'IGV'),
+        ('total', 'Total'),
+        ('estado', 'Estado'),
+    ]
+    
+    def perform_update(self, serializer):
+        """Una venta ya resumida (PAGADA/ANULADA) sale de su fila de VentaDiaria y entra con los datos nuevos"""
+        with transaction.atomic():
+            # Con el estado de la base: un confirmar/anular concurrente no se pisa
+            serializer.instance = Venta.objects.select_for_update().get(pk=serializer.instance.pk)
+            anterior = copy(serializer.instance)
+            venta = serializer.save()
+            if venta.estado in ESTADOS_RESUMIDOS:
+                registrar_venta(anterior, venta.estado, signo=-1)
+                registrar_venta(venta, venta.estado)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            venta = Venta.objects.select_for_update().get(pk=instance.pk)
+            if venta.estado in ESTADOS_RESUMIDOS:
+                registrar_venta(venta, venta.estado, signo=-1)
+            venta.delete()
     
     @action(detail=True, methods=['post'])
     def confirmar(self, request, pk=None):
         """Confirmar venta y actualizar inventario"""
         venta = self.get_object()
         
-        if venta.estado != 'PENDIENTE':
+        try:
+            confirmar_venta(venta.pk, request.user)
+        except OperacionInvalida as e:
             return Response(
-                {'error': 'Solo se pueden confirmar ventas pendientes'},
+                {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Actualizar stock y crear movimientos
-        for detalle in venta.detalles.all():
-            producto = detalle.producto
-            producto.stock_actual -= detalle.cantidad
-            producto.save()
-            
-            # Actualizar serie si aplica
-            if detalle.serie:
-                serie = detalle.serie
-                serie.estado = 'VENDIDO'
-                serie.fecha_venta = venta.fecha_venta
-                serie.save()
-            
-            # Crear movimiento
-            MovimientoInventario.objects.create(
-                producto=producto,
-                tipo_movimiento='SALIDA',
-                cantidad=detalle.cantidad,
-                motivo=f'Venta {venta.numero_venta}',
-                venta=venta,
-                lote=detalle.lote,
-                serie=detalle.serie,
-                created_by=request.user
-            )
-        
-        # Actualizar estado
-        venta.estado = 'PAGADA'
-        venta.save()
+        return Response({'status': 'Venta confirmada exitosamente'})
+    
+    @action(detail=True, methods=['post'])
+    def anular(self, request, pk=None):
+        """Anular venta y devolver el inventario si estaba pagada"""
+        venta = self.get_object()
         
-        # Actualizar total cliente
-        cliente = venta.cliente
-        cliente.total_comprado += venta.total
-        cliente.save()
+        try:
+            anular_venta(venta.pk, request.user)
+        except OperacionInvalida as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response({'status': 'Venta confirmada exitosamente'})
+        return Response({'status': 'Venta anulada exitosamente'})
     
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
-        """Estadísticas de ventas"""
-        hoy = datetime.now().date()
+        """Estadísticas de ventas (del resumen VentaDiaria)"""
+        hoy = timezone.localdate()
         mes_actual = hoy.replace(day=1)
         
-        ventas_hoy = self.queryset.filter(
-            fecha_venta__date=hoy,
-            estado='PAGADA'
-        ).aggregate(total=Sum('total'))['total'] or 0
+        ventas_hoy = totales(hoy, hoy)
+        ventas_mes = totales(mes_actual, hoy)
+        data = {
+            'ventas_hoy': float(ventas_hoy['total']),
+            'ventas_mes': float(ventas_mes['total']),
+            'cantidad_hoy': ventas_hoy['cantidad'],
+            'cantidad_mes': ventas_mes['cantidad'],
+        }
         
-        ventas_mes = self.queryset.filter(
-            fecha_venta__date__gte=mes_actual,
-            estado='PAGADA'
-        ).aggregate(total=Sum('total'))['total'] or 0
+        # Periodo opcional: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD
+        try:
+            desde = fecha_param(request, 'desde')
+            hasta = fecha_param(request, 'hasta') or hoy
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if desde:
+            periodo = totales(desde, hasta)
+            data['periodo'] = {
+                'desde': desde,
+                'hasta': hasta,
+                'cantidad': periodo['cantidad'],
+                'total': float(periodo['total']),
+                'por_comprobante': {
+                    tipo: {'cantidad': fila['cantidad'], 'total': float(fila['total'])}
+                    for tipo, fila in periodo['por_comprobante'].items()
+                },
+            }
         
-        return Response({
-            'ventas_hoy': float(ventas_hoy),
-            'ventas_mes': float(ventas_mes),
-        })
+        return Response(data)
 
 
-class MovimientoInventarioViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = MovimientoInventario.objects.all()
+class MovimientoInventarioViewSet(ExportarMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = MovimientoInventario.objects.select_related('producto')
     serializer_class = MovimientoInventarioSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
-    search_fields = ['producto__codigo', 'producto__nombre', 'motivo']
+    filter_backends = [BusquedaFilter, filters.OrderingFilter, DjangoFilterBackend]
+    search_fields = ['^producto__codigo', 'producto__nombre', 'motivo']
     ordering_fields = ['created_at']
     filterset_fields = ['producto', 'tipo_movimiento']
+    pagination_class = KeysetPagination
+    keyset_field = 'created_at'
+    columnas_exportacion = [
+        ('created_at', 'Fecha'),
+        ('producto__codigo', 'Código'),
+        ('producto__nombre', 'Producto'),
+        ('tipo_movimiento', 'Tipo'),
+        ('cantidad', 'Cantidad'),
+        ('motivo', 'Motivo'),
+        ('venta__numero_venta', 'Venta'),
+        ('compra__numero_compra', 'Compra'),
+        ('lote__numero_lote', 'Lote'),
+        ('serie__numero_serie', 'Serie'),
+        ('created_by__username', 'Usuario'),
+    ]
@@ -1,32 +1,28 @@
 #!/usr/bin/env python3
 import os
 import sys
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import django
 import subprocess
 
-def create_tenant_database(tenant_name, db_name):
-    master_conn = psycopg2.connect(
-        host=os.getenv('POSTGRES_HOST', 'localhost'),
-        port=os.getenv('POSTGRES_PORT', '5432'),
-        user=os.getenv('POSTGRES_USER', 'tenant_admin'),
-        password=os.getenv('POSTGRES_PASSWORD'),
-        database='postgres'
-    )
-    master_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-    cursor = master_conn.cursor()
-    
-    cursor.execute(f"SELECT 1 FROM pg_database WHERE datname = '{db_name}'")
-    exists = cursor.fetchone()
-    
-    if not exists:
-        cursor.execute(f"CREATE DATABASE {db_name}")
-        print(f"Database {db_name} created successfully")
-    else:
-        print(f"Database {db_name} already exists")
-    
-    cursor.close()
-    master_conn.close()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from psycopg2 import sql
+from panel.db_admin import admin_cursor, database_exists
+
+def create_tenant_database(tenant_name, db_name, template_db=None):
+    with admin_cursor() as cursor:
+        if database_exists(cursor, db_name):
+            print(f"Database {db_name} already exists")
+        elif template_db:
+            # Copia de una BD ya migrada (ver panel/database_pool.py)
+            cursor.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                sql.Identifier(db_name), sql.Identifier(template_db)
+            ))
+            print(f"Database {db_name} created from template {template_db}")
+        else:
+            cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
+            print(f"Database {db_name} created successfully")
 
 def run_migrations(db_name):
     env = os.environ.copy()
@@ -47,17 +43,21 @@ def run_migrations(db_name):
 
 def main():
     if len(sys.argv) < 3:
-        print("Usage: provision_tenant.py <tenant_name> <db_name>")
+        print("Usage: provision_tenant.py <tenant_name> <db_name> [template_db]")
         sys.exit(1)
     
     tenant_name = sys.argv[1]
     db_name = sys.argv[2]
+    template_db = sys.argv[3] if len(sys.argv) > 3 else None
     
     print(f"Provisioning tenant: {tenant_name}")
     print(f"Database name: {db_name}")
     
-    create_tenant_database(tenant_name, db_name)
-    run_migrations(db_name)
+    create_tenant_database(tenant_name, db_name, template_db)
+    
+    # Una BD creada desde plantilla ya tiene las migraciones aplicadas
+    if not template_db:
+        run_migrations(db_name)
     
     print(f"Tenant {tenant_name} provisioned successfully!")
     print(f"Database: {db_name}")
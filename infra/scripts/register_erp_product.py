@@ -33,6 +33,7 @@ def register_erp_product():
             'description': 'Sistema completo de gestión empresarial con inventario, compras, ventas, clientes y proveedores',
             'icon': '📊',
             'template_path': 'TEMPLATE_ERP',
+            'build_context': 'backend',
             'backend_image': 'ghcr.io/tenant-master/erp-backend:latest',
             'frontend_image': 'ghcr.io/tenant-master/erp-frontend:latest',
             'requires_database': True,